@@ -1,17 +1,19 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from services.llm import analyze_text, normalize_data
-from services.notion import save_record
+from services.llm import analyze_text, normalize_data, apply_upgrade
+from services.notion_writer import get_notion_writer
+from services.local_store import local_store
+from services.notion_sync import start_background_sync, is_syncing
+from services.transcription import transcribe, sniff_format, get_transcription_cache_stats, preprocess_warning
+from services.dashboard_cache import get_dashboard_cache_stats
 from services.voice_input import get_voice_input
 from services.auth import check_password, validate_api_usage, log_activity, check_api_limit
 import re
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import base64
-from PIL import Image
+import functools
 import io
+# pandas / plotly는 무거워서 현황·잔금표 탭을 열 때만 import
 
 # 페이지 설정
 st.set_page_config(
@@ -38,6 +40,10 @@ with st.sidebar:
     st.caption(f"AI 분석: {usage['gpt_calls']}/{limits['gpt_calls']}")
     st.progress(usage['whisper_calls'] / limits['whisper_calls'] if limits['whisper_calls'] > 0 else 0)
     st.caption(f"음성인식: {usage['whisper_calls']}/{limits['whisper_calls']}")
+    voice_cache = get_transcription_cache_stats()
+    if voice_cache['hits'] + voice_cache['misses']:
+        st.caption(f"음성 캐시 적중: {voice_cache['hits']}/{voice_cache['hits'] + voice_cache['misses']} ({voice_cache['hit_rate']:.0%})")
+    dashboard_cache_slot = st.empty()  # 현황 캐시 적중 수 (탭을 다 그린 뒤 채움)
     st.progress(usage['notion_saves'] / limits['notion_saves'] if limits['notion_saves'] > 0 else 0)
     st.caption(f"저장: {usage['notion_saves']}/{limits['notion_saves']}")
         
@@ -48,6 +54,12 @@ if 'saved' not in st.session_state:
     st.session_state.saved = False
 if 'voice_input' not in st.session_state:
     st.session_state.voice_input = ""
+if 'pending_analysis' not in st.session_state:
+    st.session_state.pending_analysis = None
+if 'save_handles' not in st.session_state:
+    st.session_state.save_handles = []    # 백그라운드 저장 중인 요청
+if 'save_results' not in st.session_state:
+    st.session_state.save_results = []    # 끝난 저장 (최근 5건)
 
 # 헬퍼 함수들
 def extract_amount(text):
@@ -69,6 +81,70 @@ def extract_amount(text):
     
     return text
 
+def format_result_card(data):
+    """분석 결과 카드 내용 (스트리밍 중 부분 결과에도 사용, AI가 바꾼 필드는 ✨ 표시)"""
+    changed = data.get('changed', [])
+    mark = lambda key: " ✨" if key in changed else ""
+    return f"""
+    - **🏗️ 현장:** {data.get('who', '-')}{mark('who')}
+    - **📋 내용:** {data.get('what', '-')}{mark('what')}  
+    - **💰 금액:** {data.get('how', '-')}{mark('how')}
+    - **📅 언제:** {data.get('when', '-')}{mark('when')}
+    - **📍 위치:** {data.get('where', '-')}{mark('where')}
+    - **❓ 유형:** {data.get('why', '-')}{mark('why')}
+    """
+
+def poll_pending_analysis():
+    """백그라운드 LLM 결과가 오면 다른 필드만 교체하고 화면 갱신"""
+    future, baseline = st.session_state.pending_analysis
+    if not future.done():
+        st.caption("🤖 AI가 한 번 더 확인 중...")
+        return
+    
+    st.session_state.pending_analysis = None
+    data = st.session_state.get('analyzed_data')
+    if data and not st.session_state.saved:
+        upgraded = normalize_data(future.result())
+        data['changed'] = apply_upgrade(data, baseline, upgraded)
+    st.rerun(scope="app")
+
+def submit_save(record, action, details=None):
+    """Notion 저장을 백그라운드 대기열에 넣고 바로 반환 (결과는 사이드바에 표시)"""
+    label = record.get('who') or record.get('where') or ""
+    handle = get_notion_writer().submit(record, label, meta={"action": action, "details": details or {}})
+    st.session_state.save_handles.append(handle)
+    return handle
+
+def show_save_status():
+    """끝난 저장은 결과를 기록하고, 남은 저장이 있으면 끝날 때까지 주기적으로 확인"""
+    for handle in [h for h in st.session_state.save_handles if h.done()]:
+        st.session_state.save_handles.remove(handle)
+        st.session_state.save_results = (st.session_state.save_results + [handle])[-5:]
+        log_activity(handle.meta["action"], {**handle.meta["details"], "success": handle.ok, "stored": handle.stored})
+    
+    for handle in reversed(st.session_state.save_results):
+        if handle.stored:
+            st.caption(f"📮 Notion 미전송, 로컬 보관: {handle.label or '기록'} ({handle.result[1]})")
+        elif handle.ok:
+            st.caption(f"✅ 저장 완료: {handle.label or '기록'}")
+        else:
+            st.caption(f"❌ 저장 실패: {handle.label or '기록'} ({handle.result[1]})")
+    
+    if st.session_state.save_handles:
+        st.fragment(run_every=1)(poll_save_status)()
+    
+    outbox = get_notion_writer().outbox
+    waiting = outbox.stats()["pending"] if outbox else 0
+    if waiting:
+        st.caption(f"📮 Notion 전송 대기: {waiting}건")
+
+def poll_save_status():
+    """저장 대기 건수 표시, 모두 끝나면 전체 다시 그리기"""
+    if any(not h.done() for h in st.session_state.save_handles):
+        st.caption(f"💾 저장 중... ({len(st.session_state.save_handles)}건)")
+        return
+    st.rerun(scope="app")
+
 def process_ocr_image(image):
     """이미지에서 텍스트 추출 (간단한 시뮬레이션)"""
     # 실제로는 Google Vision API나 AWS Textract 사용
@@ -84,50 +160,118 @@ def process_ocr_image(image):
     """
     return demo_text
 
-def create_payment_chart(data):
-    """잔금 현황 차트 생성"""
-    fig = go.Figure()
+def format_manwon(amount):
+    """원 → '5,250만원'"""
+    return f"{amount / 10000:,.0f}만원"
+
+UPCOMING_SORTS = {"D-Day 빠른 순": "due", "금액 큰 순": "amount", "현장명 순": "site"}
+
+def reset_upcoming_page():
+    st.session_state.upcoming_page = 1
+
+def move_upcoming_page(step):
+    st.session_state.upcoming_page = st.session_state.get('upcoming_page', 1) + step
+
+def show_upcoming_receivables(today):
+    """
+    이번 주 받을 돈 목록 (한 페이지만 그림)
     
-    for index, row in data.iterrows():
-        # 전체 대비 받은 금액 비율
-        received_pct = (row['받은금액'] / row['계약금액']) * 100 if row['계약금액'] > 0 else 0
-        remaining_pct = 100 - received_pct
-        
-        fig.add_trace(go.Bar(
-            name='받은 돈',
-            x=[row['현장명']],
-            y=[row['받은금액']],
-            text=f"{row['받은금액']:,}원",
-            textposition='inside',
-            marker_color='#4CAF50'
-        ))
-        
-        fig.add_trace(go.Bar(
-            name='받을 돈',
-            x=[row['현장명']],
-            y=[row['잔금']],
-            text=f"{row['잔금']:,}원",
-            textposition='inside',
-            marker_color='#FF9800'
-        ))
-    
-    fig.update_layout(
-        barmode='stack',
-        height=400,
-        title="현장별 수금 현황",
-        yaxis_title="금액 (원)",
-        showlegend=True,
-        hovermode='x unified'
-    )
-    
-    return fig
+    필터/정렬/페이지는 로컬 저장소 쿼리가 처리하므로 받을 돈이 몇 건이든 위젯 수는 한 페이지 분량.
+    fragment로 실행되어 페이지를 넘겨도 이 목록만 다시 그린다.
+    """
+    from services.dashboard_cache import data_version, upcoming, upcoming_sites
+    from services.local_store import INCOME_TYPES
+    from services.receivables import UPCOMING_PAGE_SIZE
+    
+    version = data_version()
+    f1, f2, f3, f4 = st.columns([3, 2, 1, 2])
+    with f1:
+        sites = st.multiselect(
+            "현장", upcoming_sites(version, today, today + timedelta(days=7)),
+            key="upcoming_sites", placeholder="전체", on_change=reset_upcoming_page
+        )
+    with f2:
+        payment_types = st.multiselect(
+            "구분", INCOME_TYPES, key="upcoming_types", placeholder="전체", on_change=reset_upcoming_page
+        )
+    with f3:
+        days = st.selectbox(
+            "D-Day", [7, 3, 2, 1, 0], key="upcoming_days", on_change=reset_upcoming_page,
+            format_func=lambda d: f"D-{d} 이내" if d else "오늘"
+        )
+    with f4:
+        sort = st.selectbox("정렬", list(UPCOMING_SORTS), key="upcoming_sort", on_change=reset_upcoming_page)
+    
+    page = st.session_state.get('upcoming_page', 1)
+    query = (today, days, tuple(sites), tuple(payment_types), UPCOMING_SORTS[sort])
+    receivables_df, total = upcoming(version, *query, page)
+    pages = max(1, -(-total // UPCOMING_PAGE_SIZE))
+    if page > pages:
+        # 그 사이 받은 돈이 처리돼 페이지가 줄었으면 마지막 페이지로
+        page = st.session_state.upcoming_page = pages
+        receivables_df, total = upcoming(version, *query, page)
+    
+    if receivables_df.empty:
+        st.caption("이번 주 예정된 받을 돈이 없습니다.")
+    
+    for page_id, row in receivables_df.iterrows():
+        col_a, col_b, col_c, col_d, col_e = st.columns([3, 2, 2, 1, 1])
+    
+        with col_a:
+            st.write(f"**{row['현장']}**")
+        with col_b:
+            st.write(f"{row['구분']}")
+        with col_c:
+            st.write(f"{row['금액']:,}원")
+        with col_d:
+            if row['D-Day'] == 0:
+                st.write("🔴 오늘")
+            elif row['D-Day'] <= 2:
+                st.write(f"🟡 D-{row['D-Day']}")
+            else:
+                st.write(f"D-{row['D-Day']}")
+        with col_e:
+            if st.button("📞", key=f"call_{page_id}"):
+                st.info(f"{row['현장']} 담당자 연결")
+    
+    if pages > 1:
+        p1, p2, p3 = st.columns([1, 3, 1])
+        with p1:
+            st.button("◀ 이전", key="upcoming_prev", disabled=page <= 1,
+                      on_click=move_upcoming_page, args=(-1,), use_container_width=True)
+        with p2:
+            st.caption(f"{page} / {pages} 페이지 (총 {total:,}건)")
+        with p3:
+            st.button("다음 ▶", key="upcoming_next", disabled=page >= pages,
+                      on_click=move_upcoming_page, args=(1,), use_container_width=True)
+
+# 백그라운드 저장 상태
+if st.session_state.save_handles or st.session_state.save_results:
+    with st.sidebar:
+        st.markdown("### 💾 저장 상태")
+        show_save_status()
+
+# Notion → 로컬 동기화 (현황/잔금표는 로컬 저장소만 조회)
+with st.sidebar:
+    st.markdown("### 🔄 Notion 동기화")
+    if st.button("지금 동기화", use_container_width=True, disabled=is_syncing()):
+        start_background_sync(force=True)
+        st.toast("동기화를 시작했습니다.")
+    last_sync = local_store.get_state("last_sync_at")
+    if is_syncing():
+        st.caption("⏳ 동기화 중...")
+    elif last_sync:
+        st.caption(f"마지막 동기화: {datetime.fromtimestamp(float(last_sync)):%m/%d %H:%M} · {local_store.count():,}건")
+    else:
+        st.caption("아직 동기화하지 않았습니다.")
 
 # 타이틀
 st.title("🗏 마음다이렉트")
 st.caption("건설현장 사장님의 든든한 비즈니스 파트너")
 
 # 탭 구성
-tab1, tab2, tab3, tab4 = st.tabs(["💰 미수금", "📸 영수증", "📊 현황", "💳 잔금표"])
+# 현황/잔금표는 열려 있을 때만 그리도록 탭 전환 시 다시 실행 (tab.open)
+tab1, tab2, tab3, tab4 = st.tabs(["💰 미수금", "📸 영수증", "📊 현황", "💳 잔금표"], on_change="rerun")
 
 with tab1:
     st.subheader("받을 돈 기록하기")
@@ -153,6 +297,11 @@ with tab1:
             - "서초 빌라 미장 이백만원 다음주 수요일"
             """)
         
+        # ffmpeg가 없으면 녹음 전처리를 못 함을 미리 알림
+        preprocess_notice = preprocess_warning()
+        if preprocess_notice:
+            st.caption(f"⚠️ {preprocess_notice}")
+        
         # 세션 상태 초기화
         if 'is_recording' not in st.session_state:
             st.session_state.is_recording = False
@@ -204,42 +353,26 @@ with tab1:
                         # 🔥 자동으로 AI 인식 시작
                         with st.spinner("🎧 음성을 텍스트로 변환 중... (5~10초)"):
                             try:
-                                from openai import OpenAI
-                                import tempfile
-                                import os
                                 import time
                                 
                                 # API 제한 체크
                                 if check_api_limit("whisper_calls"):
-                                    # OpenAI 클라이언트
-                                    api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-                                    client = OpenAI(api_key=api_key)
-                                    
-                                    # 임시 파일 저장
-                                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                                        tmp.write(audio_bytes)
-                                        tmp_path = tmp.name
-                                    
-                                    # Whisper API 호출
-                                    with open(tmp_path, 'rb') as audio_file:
-                                        transcript = client.audio.transcriptions.create(
-                                            model="whisper-1",
-                                            file=audio_file,
-                                            language="ko"
-                                        )
-                                    
-                                    # 임시 파일 삭제
-                                    os.unlink(tmp_path)
+                                    # Whisper API 호출 (메모리에서 바로 업로드)
+                                    result = transcribe(audio_bytes, "recording")
+                                    if not result.ok:
+                                        raise RuntimeError(result.error)
                                     
                                     # 결과 저장 - 바로 입력창에 넣기
-                                    st.session_state.recognized_text = transcript.text
+                                    st.session_state.recognized_text = result.text
                                     
                                     # 인식 결과 표시
                                     st.success(f"✅ 인식 완료!")
-                                    st.info(f"📝 **인식된 텍스트:** {transcript.text}")
+                                    st.info(f"📝 **인식된 텍스트:** {result.text}")
+                                    if result.warning:
+                                        st.warning(f"⚠️ {result.warning}")
                                     
                                     # 활동 로깅
-                                    log_activity("voice_recognition", {"success": True, "text_length": len(transcript.text)})
+                                    log_activity("voice_recognition", {"success": True, "text_length": len(result.text), "elapsed": round(result.elapsed, 2)})
                                     
                                     # 오디오 데이터 삭제
                                     st.session_state.audio_data = None
@@ -257,7 +390,7 @@ with tab1:
             if st.session_state.audio_data and not st.session_state.is_recording:
                 st.divider()
                 st.warning("⚠️ 자동 인식이 실패했습니다. 아래 버튼을 눌러 다시 시도하세요.")
-                st.audio(st.session_state.audio_data, format="audio/wav")
+                st.audio(st.session_state.audio_data, format=sniff_format(st.session_state.audio_data)[1])
                 
                 col_ai1, col_ai2 = st.columns([1, 1])
                 
@@ -265,30 +398,15 @@ with tab1:
                     if st.button("🤖 **다시 인식**", type="primary", use_container_width=True, key="retry_recognize_btn"):
                         with st.spinner("🎧 음성을 텍스트로 변환 중..."):
                             try:
-                                from openai import OpenAI
-                                import tempfile
-                                import os
                                 import time
                                 
-                                api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-                                client = OpenAI(api_key=api_key)
-                                
-                                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                                    tmp.write(st.session_state.audio_data)
-                                    tmp_path = tmp.name
-                                
-                                with open(tmp_path, 'rb') as audio_file:
-                                    transcript = client.audio.transcriptions.create(
-                                        model="whisper-1",
-                                        file=audio_file,
-                                        language="ko"
-                                    )
+                                result = transcribe(st.session_state.audio_data, "recording")
+                                if not result.ok:
+                                    raise RuntimeError(result.error)
                                 
-                                os.unlink(tmp_path)
-                                
-                                st.session_state.recognized_text = transcript.text
-                                st.session_state.voice_text_input = transcript.text
-                                st.success(f"✅ 인식 완료: {transcript.text}")
+                                st.session_state.recognized_text = result.text
+                                st.session_state.voice_text_input = result.text
+                                st.success(f"✅ 인식 완료: {result.text}")
                                 st.session_state.audio_data = None
                                 time.sleep(1)
                                 st.rerun()
@@ -319,36 +437,20 @@ with tab1:
                 # 파일 업로드시 자동 인식
                 with st.spinner("🎧 음성 인식 중..."):
                     try:
-                        from openai import OpenAI
-                        import tempfile
                         import time
                         
-                        api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-                        client = OpenAI(api_key=api_key)
-                        
-                        # 파일을 바이트로 읽기
-                        audio_bytes = audio_file.read()
-                        
-                        # 임시 파일로 저장
-                        with tempfile.NamedTemporaryFile(suffix=f".{audio_file.name.split('.')[-1]}", delete=False) as tmp:
-                            tmp.write(audio_bytes)
-                            tmp_path = tmp.name
-                        
-                        # Whisper API
-                        with open(tmp_path, 'rb') as f:
-                            transcript = client.audio.transcriptions.create(
-                                model="whisper-1",
-                                file=f,
-                                language="ko"
-                            )
-                        
-                        os.unlink(tmp_path)
+                        # Whisper API (업로드 파일 바이트 그대로)
+                        result = transcribe(audio_file.getvalue(), audio_file.name)
+                        if not result.ok:
+                            raise RuntimeError(result.error)
                         
                         # 자동으로 텍스트 입력란에 추가
-                        st.session_state.recognized_text = transcript.text
-                        st.session_state.voice_text_input = transcript.text
+                        st.session_state.recognized_text = result.text
+                        st.session_state.voice_text_input = result.text
                         st.success(f"✅ 인식 완료!")
-                        st.info(f"📝 **인식된 텍스트:** {transcript.text}")
+                        st.info(f"📝 **인식된 텍스트:** {result.text}")
+                        if result.warning:
+                            st.warning(f"⚠️ {result.warning}")
                         time.sleep(1)
                         st.rerun()
                         
@@ -406,7 +508,7 @@ with tab1:
             # 녹음된 오디오 처리
             if st.session_state.audio_data:
                 st.success("✅ 녹음 완료!")
-                st.audio(st.session_state.audio_data, format="audio/wav")
+                st.audio(st.session_state.audio_data, format=sniff_format(st.session_state.audio_data)[1])
                 
                 col_ai1, col_ai2, col_ai3 = st.columns([2, 2, 1])
                 
@@ -418,47 +520,27 @@ with tab1:
                         
                         with st.spinner("🎧 음성을 텍스트로 변환 중... (5~10초)"):
                             try:
-                                from openai import OpenAI
-                                import tempfile
-                                import os
-                                
-                                # OpenAI 클라이언트
-                                api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-                                client = OpenAI(api_key=api_key)
-                                
-                                # 임시 파일 저장
-                                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                                    tmp.write(st.session_state.audio_data)
-                                    tmp_path = tmp.name
-                                
                                 # Progress bar 추가
                                 progress_bar = st.progress(0)
-                                progress_bar.progress(30, text="음성 파일 처리 중...")
+                                progress_bar.progress(60, text="AI 분석 중...")
                                 
                                 # Whisper API 호출
-                                with open(tmp_path, 'rb') as audio_file:
-                                    progress_bar.progress(60, text="AI 분석 중...")
-                                    transcript = client.audio.transcriptions.create(
-                                        model="whisper-1",
-                                        file=audio_file,
-                                        language="ko"
-                                    )
-                                
+                                result = transcribe(st.session_state.audio_data, "recording")
                                 progress_bar.progress(100, text="완료!")
-                                
-                                # 임시 파일 삭제
-                                os.unlink(tmp_path)
+                                if not result.ok:
+                                    progress_bar.empty()
+                                    raise RuntimeError(result.error)
                                 
                                 # 결과 저장
-                                st.session_state.recognized_text = transcript.text
-                                st.session_state.voice_text_input = transcript.text
-                                st.success(f"✅ 인식 완료: \"{transcript.text}\"")
+                                st.session_state.recognized_text = result.text
+                                st.session_state.voice_text_input = result.text
+                                st.success(f"✅ 인식 완료: \"{result.text}\" ({result.elapsed:.1f}초)")
                                 
                                 # Progress bar 제거
                                 progress_bar.empty()
                                 
                                 # 🔐 활동 로깅
-                                log_activity("voice_recognition", {"success": True, "text_length": len(transcript.text)})
+                                log_activity("voice_recognition", {"success": True, "text_length": len(result.text), "elapsed": round(result.elapsed, 2)})
                                 
                                 # 페이지 새로고침으로 텍스트 반영
                                 st.rerun()
@@ -490,30 +572,14 @@ with tab1:
                 if st.button("🤖 AI 음성 인식", type="primary"):
                     with st.spinner("🎧 음성 인식 중..."):
                         try:
-                            from openai import OpenAI
-                            import tempfile
-                            
-                            api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-                            client = OpenAI(api_key=api_key)
-                            
-                            # 파일 저장
-                            with tempfile.NamedTemporaryFile(suffix=f".{audio_file.name.split('.')[-1]}", delete=False) as tmp:
-                                tmp.write(audio_file.read())
-                                tmp_path = tmp.name
+                            # Whisper API (업로드 파일 바이트 그대로)
+                            result = transcribe(audio_file.getvalue(), audio_file.name)
+                            if not result.ok:
+                                raise RuntimeError(result.error)
                             
-                            # Whisper API
-                            with open(tmp_path, 'rb') as f:
-                                transcript = client.audio.transcriptions.create(
-                                    model="whisper-1",
-                                    file=f,
-                                    language="ko"
-                                )
-                            
-                            os.unlink(tmp_path)
-                            
-                            st.session_state.recognized_text = transcript.text
-                            st.session_state.voice_text_input = transcript.text
-                            st.success(f"✅ 인식 완료: \"{transcript.text}\"")
+                            st.session_state.recognized_text = result.text
+                            st.session_state.voice_text_input = result.text
+                            st.success(f"✅ 인식 완료: \"{result.text}\"")
                             st.rerun()
                             
                         except Exception as e:
@@ -572,16 +638,17 @@ with tab1:
             
             with st.spinner("AI가 분석 중..."):
                 try:
-                    # 분석 및 정규화
-                    raw = analyze_text(user_input)
+                    # 규칙 결과는 바로, 애매하면 LLM 확인은 백그라운드에서
+                    raw, pending = analyze_text(user_input, speculative=True)
                     normalized = normalize_data(raw)
                     
                     # 세션에 저장
                     st.session_state.analyzed_data = normalized
                     st.session_state.saved = False
+                    st.session_state.pending_analysis = (pending, dict(normalized)) if pending else None
                     
-                    # 🔐 활동 로깅
-                    log_activity("text_analysis", {"success": True, "text_length": len(user_input)})
+                    # 🔐 활동 로깅 (rule: 규칙만 / llm: AI 호출 / fallback: AI 불가)
+                    log_activity("text_analysis", {"success": True, "text_length": len(user_input), "source": raw.get('source')})
                     
                 except Exception as e:
                     st.error(f"처리 실패: {e}")
@@ -600,16 +667,17 @@ with tab1:
             with col1:
                 # 분석 결과 카드
                 st.markdown("### 📋 내용 정리")
+                if data.get('source') == 'rule':
+                    st.caption("⚡ 빠른 분석 (규칙)")
+                elif data.get('source') == 'llm':
+                    st.caption("🤖 AI 분석")
+                
+                # LLM 확인 중이면 끝날 때까지 주기적으로 확인
+                if st.session_state.get('pending_analysis'):
+                    st.fragment(run_every=0.5)(poll_pending_analysis)()
                 
                 with st.container():
-                    st.markdown(f"""
-                    - **🏗️ 현장:** {data.get('who', '-')}
-                    - **📋 내용:** {data.get('what', '-')}  
-                    - **💰 금액:** {data.get('how', '-')}
-                    - **📅 언제:** {data.get('when', '-')}
-                    - **📍 위치:** {data.get('where', '-')}
-                    - **❓ 유형:** {data.get('why', '-')}
-                    """)
+                    st.markdown(format_result_card(data))
                 
                 # 수정 가능한 필드들
                 with st.expander("✏️ 수정하기"):
@@ -631,34 +699,23 @@ with tab1:
                             if not check_api_limit("notion_saves"):
                                 st.stop()
                                 
-                            with st.spinner("저장 중..."):
-                                try:
-                                    status, msg = save_record(data)
-                                    if 200 <= status < 300:
-                                        st.success("✅ 저장 완료!")
-                                        st.session_state.saved = True
-                                        
-                                        # 🔐 활동 로깅
-                                        log_activity("notion_save", {"success": True, "site": data.get('who')})
-                                        
-                                        # 세션 정리
-                                        if 'analyzed_data' in st.session_state:
-                                            del st.session_state.analyzed_data
-                                        if 'recognized_text' in st.session_state:
-                                            del st.session_state.recognized_text
-                                    else:
-                                        st.error(f"❌ 저장 실패: {msg}")
-                                        log_activity("notion_save", {"success": False})
-                                except Exception as e:
-                                    st.error(f"저장 실패: {e}")
-                                    log_activity("notion_save", {"success": False, "error": str(e)})
+                            # 저장은 백그라운드에서 (결과는 사이드바 💾 저장 상태)
+                            submit_save(data, "notion_save", {"site": data.get('who')})
+                            st.success("✅ 저장 요청 완료!")
+                            st.session_state.saved = True
+                            
+                            # 세션 정리
+                            if 'analyzed_data' in st.session_state:
+                                del st.session_state.analyzed_data
+                            if 'recognized_text' in st.session_state:
+                                del st.session_state.recognized_text
                     
                     with col2:
                         if st.button("🗑️ 취소", use_container_width=True):
                             st.session_state.analyzed_data = None
                             st.rerun()
                 else:
-                    st.success("✅ 저장됨")
+                    st.success("✅ 저장 요청됨 (결과는 사이드바)")
                     if st.button("🔄 새로 기록", use_container_width=True):
                         st.session_state.analyzed_data = None
                         st.session_state.saved = False
@@ -718,181 +775,168 @@ with tab2:
                     try:
                         # 영수증 텍스트를 5W1H로 변환
                         receipt_input = f"{site} {category} {extracted_text}"
-                        raw = analyze_text(receipt_input)
+                        # AI가 필요하면 필드가 완성되는 대로 카드에 채워 보여줌 (규칙/캐시 결과는 바로 끝남)
+                        live_card = st.empty()
+                        partial = {}
+                        raw = {}
+                        for field, value in analyze_text(receipt_input, stream=True):
+                            if field is None:
+                                raw = value
+                            else:
+                                partial[field] = value
+                                live_card.markdown(format_result_card(normalize_data(partial)))
                         normalized = normalize_data(raw)
-                        status, msg = save_record(normalized)
-                        
-                        if 200 <= status < 300:
-                            st.success(f"✅ '{category}' 영수증이 저장되었습니다!")
-                            # 🔐 활동 로깅
-                            log_activity("receipt_save", {"success": True, "category": category})
-                        else:
-                            st.error("저장 실패")
-                            log_activity("receipt_save", {"success": False})
+                        live_card.markdown(format_result_card(normalized))
+                        submit_save(normalized, "receipt_save", {"category": category})
+                        st.success(f"✅ '{category}' 영수증 저장을 요청했습니다!")
                     except Exception as e:
                         st.error(f"처리 실패: {e}")
                         log_activity("receipt_save", {"success": False, "error": str(e)})
 
 # Tab 3: 현황 대시보드
 with tab3:
-    st.subheader("이번 달 현황")
+    if tab3.open:
+        from services.dashboard_cache import data_version, record_count, month_metrics, collection_pie
+        from services.charts import figure_from_spec
+        
+        # 로컬 저장소에서만 읽음 (Notion 변경분은 백그라운드로 가져옴)
+        # 집계/차트는 데이터 버전이 바뀔 때만 다시 계산
+        start_background_sync()
+        version = data_version()
+        if not record_count(version):
+            st.info("아직 불러온 기록이 없습니다. 사이드바에서 🔄 동기화를 눌러 주세요.")
+        
+        today = datetime.now().date()
+        metrics = month_metrics(version, today)
+        total_amount = metrics['total']
+        received_amount = metrics['received']
+        remaining_amount = metrics['remaining']
+        expense_amount = metrics['expense']
+        
+        st.subheader("이번 달 현황")
     
-    # 메트릭 카드
-    col1, col2, col3, col4 = st.columns(4)
+        # 메트릭 카드
+        col1, col2, col3, col4 = st.columns(4)
     
-    with col1:
-        st.metric(
-            label="총 계약금액",
-            value="8,500만원",
-            delta="신규 500만원"
-        )
+        with col1:
+            st.metric(
+                label="총 계약금액",
+                value=format_manwon(total_amount),
+                delta=f"{metrics['count']}건"
+            )
     
-    with col2:
-        st.metric(
-            label="받은 돈",
-            value="5,250만원",
-            delta="이번주 +500만원"
-        )
+        with col2:
+            st.metric(
+                label="받은 돈",
+                value=format_manwon(received_amount)
+            )
     
-    with col3:
-        st.metric(
-            label="받을 돈",
-            value="3,250만원",
-            delta="38.2%"
-        )
+        with col3:
+            st.metric(
+                label="받을 돈",
+                value=format_manwon(remaining_amount),
+                delta=f"{remaining_amount / total_amount:.1%}" if total_amount else None
+            )
     
-    with col4:
-        st.metric(
-            label="지출",
-            value="2,130만원",
-            delta="-230만원"
-        )
+        with col4:
+            st.metric(
+                label="지출",
+                value=format_manwon(expense_amount)
+            )
     
-    st.divider()
+        st.divider()
     
-    # 미수금 알림
-    col1, col2 = st.columns([2, 1])
+        # 미수금 알림
+        col1, col2 = st.columns([2, 1])
     
-    with col1:
-        st.subheader("📌 이번 주 받을 돈")
-        
-        # 미수금 데이터
-        receivables_df = pd.DataFrame([
-            {"현장": "강남 오피스텔", "구분": "중도금", "금액": 5000000, "예정일": "2025-01-25", "D-Day": 2},
-            {"현장": "북구청 방수", "구분": "잔금", "금액": 10000000, "예정일": "2025-01-28", "D-Day": 5},
-            {"현장": "서초 아파트", "구분": "계약금", "금액": 3000000, "예정일": "2025-01-23", "D-Day": 0},
-            {"현장": "판교 빌라", "구분": "중도금", "금액": 4500000, "예정일": "2025-01-30", "D-Day": 7},
-        ])
+        with col1:
+            st.subheader("📌 이번 주 받을 돈")
         
-        for _, row in receivables_df.iterrows():
-            col_a, col_b, col_c, col_d, col_e = st.columns([3, 2, 2, 1, 1])
-            
-            with col_a:
-                st.write(f"**{row['현장']}**")
-            with col_b:
-                st.write(f"{row['구분']}")
-            with col_c:
-                st.write(f"{row['금액']:,}원")
-            with col_d:
-                if row['D-Day'] == 0:
-                    st.write("🔴 오늘")
-                elif row['D-Day'] <= 2:
-                    st.write(f"🟡 D-{row['D-Day']}")
-                else:
-                    st.write(f"D-{row['D-Day']}")
-            with col_e:
-                if st.button("📞", key=f"call_{row['현장']}"):
-                    st.info(f"{row['현장']} 담당자 연결")
+            # 미수금 데이터: 안 받은 돈 중 오늘~7일 뒤 예정 (한 페이지씩)
+            st.fragment(show_upcoming_receivables)(today)
     
-    with col2:
-        # 수금률 파이 차트
-        fig = go.Figure(data=[go.Pie(
-            labels=['받은 돈', '받을 돈'],
-            values=[5250, 3250],
-            hole=.3,
-            marker_colors=['#4CAF50', '#FFC107']
-        )])
-        
-        fig.update_layout(
-            title="수금 현황",
-            height=300,
-            showlegend=True
-        )
-        
-        st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            # 수금률 파이 차트
+            st.plotly_chart(figure_from_spec(collection_pie(version, today)), use_container_width=True)
 
 # Tab 4: 잔금 현황표
 with tab4:
-    st.subheader("💳 현장별 잔금 현황")
-    
-    # 샘플 데이터
-    payment_data = pd.DataFrame([
-        {"현장명": "강남 오피스텔", "계약금액": 15000000, "받은금액": 10000000, "잔금": 5000000, "진행률": 67},
-        {"현장명": "북구청 방수", "계약금액": 30000000, "받은금액": 20000000, "잔금": 10000000, "진행률": 67},
-        {"현장명": "서초 아파트", "계약금액": 8000000, "받은금액": 5000000, "잔금": 3000000, "진행률": 63},
-        {"현장명": "판교 빌라", "계약금액": 12000000, "받은금액": 7500000, "잔금": 4500000, "진행률": 63},
-        {"현장명": "분당 주택", "계약금액": 20000000, "받은금액": 20000000, "잔금": 0, "진행률": 100},
-    ])
-    
-    # 차트 표시
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        # 막대 차트
-        fig = create_payment_chart(payment_data)
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        # 요약 정보
-        st.metric("총 계약금액", f"{payment_data['계약금액'].sum():,}원")
-        st.metric("총 받은금액", f"{payment_data['받은금액'].sum():,}원")
-        st.metric("총 잔금", f"{payment_data['잔금'].sum():,}원")
+    if tab4.open:
+        from services.dashboard_cache import data_version, site_table, site_table_view, payment_chart
+        from services.charts import figure_from_spec
+        from services.export import export_bytes, export_format, MIME_TYPES
+        
+        st.subheader("💳 현장별 잔금 현황")
+    
+        # 현장별 합계 (로컬 저장소 기준)
+        start_background_sync()
+        version = data_version()
+        payment_data = site_table(version)
+        if payment_data.empty:
+            st.info("아직 불러온 기록이 없습니다. 사이드바에서 🔄 동기화를 눌러 주세요.")
+    
+        # 차트 표시
+        col1, col2 = st.columns([2, 1])
+    
+        with col1:
+            # 막대 차트 (데이터 버전이 같으면 만들어 둔 Figure 재사용)
+            st.plotly_chart(figure_from_spec(payment_chart(version)), use_container_width=True)
+    
+        with col2:
+            # 요약 정보
+            st.metric("총 계약금액", f"{payment_data['계약금액'].sum():,}원")
+            st.metric("총 받은금액", f"{payment_data['받은금액'].sum():,}원")
+            st.metric("총 잔금", f"{payment_data['잔금'].sum():,}원")
         
-        avg_progress = payment_data['진행률'].mean()
-        st.metric("평균 수금률", f"{avg_progress:.1f}%")
-    
-    # 상세 테이블
-    st.divider()
-    st.markdown("### 📋 상세 내역")
-    
-    # 테이블 스타일링
-    styled_df = payment_data.copy()
-    styled_df['계약금액'] = styled_df['계약금액'].apply(lambda x: f"{x:,}원")
-    styled_df['받은금액'] = styled_df['받은금액'].apply(lambda x: f"{x:,}원")
-    styled_df['잔금'] = styled_df['잔금'].apply(lambda x: f"{x:,}원")
-    styled_df['진행률'] = styled_df['진행률'].apply(lambda x: f"{x}%")
-    
-    # 편집 가능한 테이블
-    edited_df = st.data_editor(
-        styled_df,
-        hide_index=True,
-        use_container_width=True,
-        column_config={
-            "현장명": st.column_config.TextColumn("현장명", width="medium"),
-            "계약금액": st.column_config.TextColumn("계약금액", width="small"),
-            "받은금액": st.column_config.TextColumn("받은금액", width="small"),
-            "잔금": st.column_config.TextColumn("잔금", width="small"),
-            "진행률": st.column_config.ProgressColumn(
-                "진행률",
-                help="수금 진행률",
-                format="%d%%",
-                min_value=0,
-                max_value=100,
-            ),
-        }
-    )
-    
-    # 엑셀 다운로드 버튼
-    col1, col2, col3 = st.columns([1, 1, 2])
+            avg_progress = payment_data['진행률'].mean() if len(payment_data) else 0
+            st.metric("평균 수금률", f"{avg_progress:.1f}%")
     
-    with col1:
-        if st.button("📊 엑셀 다운로드", use_container_width=True):
-            # 엑셀 파일 생성 (실제로는 pandas to_excel 사용)
-            st.success("수금현황.xlsx 다운로드 완료!")
+        # 상세 테이블
+        st.divider()
+        st.markdown("### 📋 상세 내역")
+    
+        # 테이블 스타일링 (금액/진행률 문자열)
+        styled_df = site_table_view(version)
+    
+        # 편집 가능한 테이블
+        edited_df = st.data_editor(
+            styled_df,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "현장명": st.column_config.TextColumn("현장명", width="medium"),
+                "계약금액": st.column_config.TextColumn("계약금액", width="small"),
+                "받은금액": st.column_config.TextColumn("받은금액", width="small"),
+                "잔금": st.column_config.TextColumn("잔금", width="small"),
+                "진행률": st.column_config.ProgressColumn(
+                    "진행률",
+                    help="수금 진행률",
+                    format="%d%%",
+                    min_value=0,
+                    max_value=100,
+                ),
+            }
+        )
     
-    with col2:
-        if st.button("📨 세무사 전송", use_container_width=True):
-            st.success("세무사님께 자료 전송 완료!")
+        # 엑셀 다운로드 버튼
+        col1, col2, col3 = st.columns([1, 1, 2])
+    
+        with col1:
+            # 누른 뒤에 별도 스레드에서 생성 (화면/다른 세션을 막지 않음), openpyxl이 없으면 CSV
+            export_fmt = export_format()
+            st.download_button(
+                "📊 엑셀 다운로드",
+                data=functools.partial(export_bytes, export_fmt),
+                file_name=f"수금현황_{datetime.now():%Y%m%d}.{export_fmt}",
+                mime=MIME_TYPES[export_fmt],
+                on_click="ignore",
+                use_container_width=True,
+                help=None if export_fmt == "xlsx" else "CSV 파일 (엑셀에서 열 수 있습니다)"
+            )
+    
+        with col2:
+            if st.button("📨 세무사 전송", use_container_width=True):
+                st.success("세무사님께 자료 전송 완료!")
 
 # ============================================
 # 하단 상태바
@@ -936,3 +980,8 @@ with footer_cols[3]:
     if st.button("🚪 로그아웃", use_container_width=True, key="logout_btn_main"):
         st.session_state.clear()
         st.rerun()
+
+# 현황 캐시 적중 수 (이번 실행까지 반영)
+dashboard_cache = get_dashboard_cache_stats()
+if dashboard_cache['hits'] + dashboard_cache['misses']:
+    dashboard_cache_slot.caption(f"현황 캐시: 적중 {dashboard_cache['hits']} / 계산 {dashboard_cache['misses']} ({dashboard_cache['hit_rate']:.0%})")
@@ -0,0 +1,74 @@
+# benchmarks/bench_import_time.py - 서비스 모듈 import 시간 예산 점검
+"""
+python -X importtime으로 각 서비스 모듈을 새 프로세스에서 import해서
+누적 import 시간이 예산 안인지, 무거운 모듈을 미리 불러오지 않는지 확인
+
+실행: python -m benchmarks.bench_import_time
+예산을 넘으면 종료 코드 1 (CI에서 그대로 사용 가능)
+"""
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 모듈별 누적 import 예산 (ms, 여러 번 잰 것 중 최솟값 기준)
+BUDGETS_MS = {
+    "services.config": 30,
+    "services.rule_parser": 40,
+    "services.llm": 150,
+    "services.notion": 200,
+    "services.transcription": 40,
+}
+
+# import만으로 불러오면 안 되는 모듈 (처음 쓸 때 불러옴)
+DEFERRED = ("openai", "pandas", "plotly", "PIL", "streamlit", "dotenv")
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_profile(module):
+    """새 프로세스에서 module을 import하고 {모듈명: 누적 µs} 반환"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    profile = {}
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            profile[match.group(4)] = int(match.group(2))
+    return profile
+
+
+def measure(module, repeat=5):
+    """repeat번 재서 최솟값(ms)과 함께 불러온 모듈 목록 반환"""
+    best, loaded = None, set()
+    for _ in range(repeat):
+        profile = import_profile(module)
+        elapsed = profile.get(module, 0) / 1000
+        best = elapsed if best is None else min(best, elapsed)
+        loaded = set(profile)
+    return best, loaded
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failed = False
+
+    print(f"{'모듈':<24}{'시간(ms)':>10}{'예산':>8}")
+    for module, budget in BUDGETS_MS.items():
+        elapsed, loaded = measure(module, repeat)
+        eager = sorted(name for name in loaded if name.split(".")[0] in DEFERRED)
+        ok = elapsed <= budget and not eager
+        failed |= not ok
+        print(f"{module:<24}{elapsed:>10.1f}{budget:>8} {'✅' if ok else '❌'}")
+        if eager:
+            print(f"   ⚠️ import 시점에 불러옴: {', '.join(eager[:5])}")
+
+    sys.exit(1 if failed else 0)
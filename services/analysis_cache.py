@@ -0,0 +1,166 @@
+# services/analysis_cache.py - 분석 결과 영구 캐시 (SQLite)
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_DIR = os.getenv("MAUMDA_CACHE_DIR", ".cache")
+
+# 접근 시각 갱신 간격 (매 히트마다 디스크 쓰기를 하지 않도록 LRU 정밀도를 낮춤)
+TOUCH_INTERVAL = 60
+
+
+def normalize_text(text):
+    """공백 정규화 (앞뒤 공백 제거, 연속 공백/줄바꿈 → 공백 하나)"""
+    return " ".join((text or "").split())
+
+
+def make_key(text, version, anchor_date):
+    """
+    캐시 키 = 정규화된 텍스트 + 프롬프트 버전 + 기준일
+
+    "내일", "다음주" 같은 상대 날짜는 오늘 날짜에 따라 답이 달라지므로
+    기준일이 바뀌면 다른 키가 된다.
+    """
+    raw = f"{version}\x00{anchor_date}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    """
+    내용 주소 기반 SQLite 캐시 (TTL + LRU + 용량 제한)
+
+    - get(): 만료(TTL)된 항목은 지우고 미스 처리
+    - put(): 항목 수/바이트 한도를 넘으면 가장 오래 안 쓴 항목부터 제거
+    - stats(): 이 프로세스의 hits/misses/expired/evictions 카운터
+    DB를 열 수 없는 환경(읽기 전용 등)에서는 캐시 없이 동작한다.
+    """
+
+    def __init__(self, path=None, ttl=7 * 24 * 3600, max_entries=5000, max_bytes=20 * 1024 * 1024, label="분석 캐시"):
+        self.path = path or os.path.join(CACHE_DIR, "analysis_cache.sqlite3")
+        self.label = label
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._conn = None
+        self._opened = False
+
+    def _connect(self):
+        """처음 쓸 때 DB 열기 (import만으로는 파일을 만들지 않음)"""
+        if self._opened:
+            return self._conn
+        with self._lock:
+            if self._opened:
+                return self._conn
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS entries (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+                self._conn = conn
+            except Exception as e:
+                print(f"{self.label} 비활성화: {e}")
+            self._opened = True
+        return self._conn
+
+    @property
+    def enabled(self):
+        return self._connect() is not None
+
+    def get(self, key):
+        """캐시된 dict 반환 (없거나 만료면 None)"""
+        if not self._connect():
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            value, created_at, accessed_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._counters["expired"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            if now - accessed_at > TOUCH_INTERVAL:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+
+            self._counters["hits"] += 1
+
+        return json.loads(value)
+
+    def put(self, key, value):
+        """dict 저장 후 한도 초과분 LRU 제거"""
+        if not self._connect():
+            return
+
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        removed = 0
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            removed += 1
+        self._counters["evictions"] += removed
+
+    def clear(self):
+        if self._connect():
+            with self._lock:
+                self._conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        """카운터 + 현재 항목 수/용량 + 적중률"""
+        stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        if self._connect():
+            with self._lock:
+                count, total = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+                ).fetchone()
+            stats["entries"] = count
+            stats["bytes"] = total
+        return stats
+
+
+# 앱 전체에서 공유하는 기본 캐시 (Streamlit 재시작 후에도 디스크에 남음)
+analysis_cache = AnalysisCache()
@@ -1,19 +1,6 @@
 # services/audio_ai.py
 import streamlit as st
-import io
-import tempfile
-import os
-
-# OpenAI 클라이언트
-try:
-    from openai import OpenAI
-    import streamlit as st
-    
-    # API 키 가져오기
-    api_key = st.secrets.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-    client = OpenAI(api_key=api_key) if api_key else None
-except:
-    client = None
+from services.transcription import transcribe, sniff_format
 
 def transcribe_audio(audio_bytes, filename="audio.wav"):
     """
@@ -21,36 +8,15 @@ def transcribe_audio(audio_bytes, filename="audio.wav"):
     
     Args:
         audio_bytes: 오디오 파일 바이트
-        filename: 파일명 (확장자 포함)
+        filename: 파일명 (확장자는 참고용, 실제 형식은 내용으로 판별)
     
     Returns:
         str: 변환된 텍스트
     """
-    if not client:
-        return "❌ OpenAI API 키가 설정되지 않았습니다."
-    
-    try:
-        # 임시 파일로 저장 (Whisper API는 파일 객체 필요)
-        with tempfile.NamedTemporaryFile(suffix=f".{filename.split('.')[-1]}", delete=False) as tmp_file:
-            tmp_file.write(audio_bytes)
-            tmp_file_path = tmp_file.name
-        
-        # Whisper API 호출
-        with open(tmp_file_path, 'rb') as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language="ko",  # 한국어 지정
-                response_format="text"
-            )
-        
-        # 임시 파일 삭제
-        os.unlink(tmp_file_path)
-        
-        return transcript
-        
-    except Exception as e:
-        return f"❌ 음성 인식 실패: {str(e)}"
+    result = transcribe(audio_bytes, filename)
+    if not result.ok:
+        return f"❌ 음성 인식 실패: {result.error}"
+    return result.text
 
 def create_audio_recorder():
     """
@@ -87,7 +53,7 @@ def audio_input_section():
         audio_file = st.file_uploader(
             "음성 파일 선택",
             type=['wav', 'mp3', 'm4a', 'ogg', 'webm'],
-            help="최대 25MB, 한국어 음성"
+            help="한국어 음성 (긴 녹음은 자동으로 나눠서 인식)"
         )
         
         if audio_file:
@@ -122,7 +88,7 @@ def audio_input_section():
         audio_bytes = create_audio_recorder()
         
         if audio_bytes:
-            st.audio(audio_bytes, format="audio/wav")
+            st.audio(audio_bytes, format=sniff_format(audio_bytes)[1])
             
             if st.button("🔍 AI 음성 인식", key="transcribe_record"):
                 with st.spinner("AI가 음성을 인식하는 중..."):
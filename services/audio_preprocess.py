@@ -0,0 +1,228 @@
+# services/audio_preprocess.py - Whisper 업로드 전 음성 전처리 (모노 16kHz + 앞뒤 무음 제거)
+import io
+import shutil
+import subprocess
+import wave
+from dataclasses import dataclass
+
+import numpy as np
+
+TARGET_RATE = 16000        # Whisper 내부 샘플레이트
+FRAME_MS = 30              # VAD 프레임 길이
+PAD_MS = 200               # 말 앞뒤로 남겨 둘 여유
+MIN_SPEECH_DB = -50.0      # 이보다 작으면 무조건 무음 (dBFS)
+FLOOR_MARGIN_DB = 10.0     # 배경 소음보다 이만큼 커야 말소리
+PEAK_MARGIN_DB = 25.0      # 가장 큰 프레임보다 이만큼 작으면 무음
+FIR_TAPS = 63              # 다운샘플링 전 저역통과 필터 길이
+OPUS_BITRATE = "24k"
+
+
+@dataclass(frozen=True)
+class PreparedAudio:
+    """전처리된 업로드용 음성"""
+    data: bytes
+    ext: str
+    mime: str
+    duration: float            # 전처리 후 길이(초)
+    original_duration: float   # 원본 길이(초)
+    samples: np.ndarray = None # 16kHz 모노 float32 (긴 녹음 분할용)
+
+
+def preprocess_audio(audio_bytes, ext):
+    """
+    음성 바이트 → PreparedAudio (처리할 수 없으면 None, 호출 측은 원본 업로드)
+
+    1. PCM 디코딩 (wav는 표준 라이브러리, 그 외 형식은 ffmpeg가 있을 때만)
+    2. 모노 다운믹스 + 16kHz 리샘플링
+    3. 에너지 기반 VAD로 앞뒤 무음 제거
+    4. 재인코딩 (ffmpeg가 있으면 Opus, 없으면 16bit wav)
+    """
+    try:
+        decoded = _decode(audio_bytes, ext)
+    except Exception as e:
+        print(f"⚠️ 음성 전처리 생략 (디코딩 실패: {e})")
+        return None
+    if decoded is None:
+        print(f"⚠️ 음성 전처리 생략: {skip_reason(ext)}")
+        return None
+
+    samples, rate = decoded
+    original_duration = len(samples) / rate if rate else 0.0
+    samples = resample(samples, rate, TARGET_RATE)
+    samples = trim_silence(samples, TARGET_RATE)
+
+    data, out_ext, mime = encode(samples, TARGET_RATE)
+    return PreparedAudio(
+        data=data, ext=out_ext, mime=mime,
+        duration=len(samples) / TARGET_RATE,
+        original_duration=original_duration,
+        samples=samples,
+    )
+
+
+def _decode(audio_bytes, ext):
+    """→ (float32 모노 샘플 -1~1, 샘플레이트) 또는 None"""
+    if ext == "wav":
+        return decode_wav(audio_bytes)
+    if _ffmpeg():
+        return _decode_ffmpeg(audio_bytes)
+    return None
+
+
+def skip_reason(ext):
+    """이 형식을 전처리할 수 없는 이유 (할 수 있으면 빈 문자열)"""
+    if ext == "wav" or _ffmpeg():
+        return ""
+    return f"ffmpeg가 설치돼 있지 않아 {ext} 음성을 해석할 수 없습니다 (packages.txt)"
+
+
+def decode_wav(audio_bytes):
+    """PCM wav 디코딩 + 모노 다운믹스"""
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        raw = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        pcm = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        pcm = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        # 24bit: 3바이트씩 끊어 상위 바이트 부호 확장
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        pcm = (np.where(value & 0x800000, value - (1 << 24), value)).astype(np.float32) / (1 << 23)
+    elif width == 4:
+        pcm = np.frombuffer(raw, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"지원하지 않는 샘플 크기: {width}바이트")
+
+    if channels > 1:
+        pcm = pcm[: len(pcm) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return pcm, rate
+
+
+def resample(samples, rate, target=TARGET_RATE):
+    """저역통과(windowed-sinc) 후 선형 보간으로 target Hz 변환"""
+    if rate == target or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+
+    if rate > target:
+        # 새 나이퀴스트 주파수 위 성분을 먼저 깎아 에일리어싱 방지
+        cutoff = 0.5 * target / rate
+        n = np.arange(FIR_TAPS) - (FIR_TAPS - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(FIR_TAPS)
+        samples = np.convolve(samples, taps / taps.sum(), mode="same")
+
+    duration = len(samples) / rate
+    positions = np.arange(int(duration * target)) * (rate / target)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def trim_silence(samples, rate=TARGET_RATE):
+    """
+    앞뒤 무음 제거 (프레임 RMS 에너지 기준, 전부 무음이면 원본 유지)
+
+    기준: 배경 소음(하위 10% 프레임) + FLOOR_MARGIN_DB 와 최대 프레임 - PEAK_MARGIN_DB 중 작은 값,
+    단 MIN_SPEECH_DB 이상
+    """
+    frame = int(rate * FRAME_MS / 1000)
+    db = frame_db(samples, frame)
+    if len(db) < 3:
+        return samples
+
+    threshold = max(MIN_SPEECH_DB, min(np.percentile(db, 10) + FLOOR_MARGIN_DB, db.max() - PEAK_MARGIN_DB))
+    voiced = np.flatnonzero(db > threshold)
+    if len(voiced) == 0:
+        return samples
+
+    pad = int(rate * PAD_MS / 1000)
+    start = max(0, voiced[0] * frame - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame + pad)
+    return samples[start:end]
+
+
+def frame_db(samples, frame):
+    """프레임별 RMS 에너지 (dBFS)"""
+    count = len(samples) // frame
+    frames = samples[: count * frame].reshape(count, frame)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    return 20 * np.log10(rms)
+
+
+def split_at_silence(samples, rate=TARGET_RATE, chunk_seconds=60.0, search_seconds=10.0, overlap_seconds=1.5):
+    """
+    긴 음성을 무음 지점에서 나눈 (시작, 끝) 샘플 구간 목록
+
+    chunk_seconds마다 그 직전 search_seconds 안에서 가장 조용한 프레임을 자르는 지점으로 잡고,
+    이어 붙일 때 말이 잘리지 않도록 각 구간을 앞뒤로 overlap_seconds씩 겹친다.
+    """
+    total = len(samples)
+    chunk = int(chunk_seconds * rate)
+    if total <= chunk:
+        return [(0, total)]
+
+    frame = int(rate * FRAME_MS / 1000)
+    db = frame_db(samples, frame)
+    search = max(1, int(search_seconds * 1000 / FRAME_MS))
+
+    cuts = [0]
+    while total - cuts[-1] > chunk:
+        target = (cuts[-1] + chunk) // frame
+        window = db[max(target - search, cuts[-1] // frame + 1):target + 1]
+        quietest = target - len(window) + 1 + int(np.argmin(window))
+        cuts.append(quietest * frame)
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * rate)
+    return [(max(0, start - overlap), min(total, end + overlap)) for start, end in zip(cuts, cuts[1:])]
+
+
+def to_pcm16(samples):
+    """float 샘플 → 16bit little-endian PCM 바이트"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(samples, rate=TARGET_RATE):
+    """float 샘플 → 16bit 모노 wav 바이트"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(to_pcm16(samples))
+    return buffer.getvalue()
+
+
+def encode(samples, rate=TARGET_RATE):
+    """→ (바이트, 확장자, MIME). Opus가 wav보다 10배 가까이 작다"""
+    if _ffmpeg():
+        try:
+            return _encode_opus(samples, rate), "ogg", "audio/ogg"
+        except Exception as e:
+            print(f"Opus 인코딩 실패, wav 사용: {e}")
+    return encode_wav(samples, rate), "wav", "audio/wav"
+
+
+def _ffmpeg():
+    return shutil.which("ffmpeg")
+
+
+def _decode_ffmpeg(audio_bytes):
+    """ffmpeg로 임의 형식(webm/ogg/mp3/m4a) → 16kHz 모노 float32"""
+    proc = subprocess.run(
+        [_ffmpeg(), "-v", "error", "-i", "pipe:0",
+         "-f", "f32le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+        input=audio_bytes, capture_output=True, check=True, timeout=60,
+    )
+    return np.frombuffer(proc.stdout, dtype="<f4"), TARGET_RATE
+
+
+def _encode_opus(samples, rate):
+    proc = subprocess.run(
+        [_ffmpeg(), "-v", "error", "-f", "f32le", "-ac", "1", "-ar", str(rate), "-i", "pipe:0",
+         "-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip", "-f", "ogg", "pipe:1"],
+        input=samples.astype("<f4").tobytes(), capture_output=True, check=True, timeout=60,
+    )
+    return proc.stdout
@@ -0,0 +1,88 @@
+# services/charts.py - 대시보드 차트 (재사용은 dashboard_cache에서 데이터 버전별 JSON으로)
+
+
+def create_payment_chart(data):
+    """
+    잔금 현황 차트 생성
+
+    현장 수와 상관없이 '받은 돈' / '받을 돈' 막대 두 개(trace)로 쌓아 그린다.
+    비율과 라벨도 컬럼 전체를 한 번에 계산한다.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    contract = data['계약금액'].to_numpy()
+    received = data['받은금액'].to_numpy()
+    remaining = data['잔금'].to_numpy()
+
+    # 전체 대비 받은 금액 비율
+    received_pct = np.divide(received * 100.0, contract, out=np.zeros(len(data)), where=contract > 0)
+    remaining_pct = 100 - received_pct
+
+    sites = data['현장명'].astype(str).to_numpy()
+    fig = go.Figure(data=[
+        go.Bar(
+            name='받은 돈',
+            x=sites,
+            y=received,
+            text=data['받은금액'].map("{:,}원".format).to_numpy(),
+            customdata=received_pct,
+            hovertemplate="%{text} (%{customdata:.0f}%)<extra>받은 돈</extra>",
+            textposition='inside',
+            marker_color='#4CAF50'
+        ),
+        go.Bar(
+            name='받을 돈',
+            x=sites,
+            y=remaining,
+            text=data['잔금'].map("{:,}원".format).to_numpy(),
+            customdata=remaining_pct,
+            hovertemplate="%{text} (%{customdata:.0f}%)<extra>받을 돈</extra>",
+            textposition='inside',
+            marker_color='#FF9800'
+        ),
+    ])
+
+    fig.update_layout(
+        barmode='stack',
+        height=400,
+        title="현장별 수금 현황",
+        yaxis_title="금액 (원)",
+        showlegend=True,
+        hovermode='x unified'
+    )
+
+    return fig
+
+
+def create_collection_pie(received_amount, remaining_amount):
+    """수금률 파이 차트"""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Pie(
+        labels=['받은 돈', '받을 돈'],
+        values=[received_amount, remaining_amount],
+        hole=.3,
+        marker_colors=['#4CAF50', '#FFC107']
+    )])
+
+    fig.update_layout(
+        title="수금 현황",
+        height=300,
+        showlegend=True
+    )
+
+    return fig
+
+
+def figure_from_spec(spec):
+    """
+    캐시된 차트 JSON → st.plotly_chart에 넘길 Figure
+
+    spec은 검증된 Figure의 to_json()이라 다시 검증하지 않는다 (검증하면 막대 수에 비례해 느려짐).
+    매번 새 Figure라 고쳐도 캐시에는 영향이 없다.
+    """
+    import json
+    import plotly.graph_objects as go
+
+    return go.Figure(json.loads(spec), _validate=False)
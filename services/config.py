@@ -1,19 +1,80 @@
-# services/config.py
+# services/config.py - 설정/클라이언트 공용 진입점
+#
+# 모듈 import 시점에는 아무것도 읽거나 만들지 않는다.
+# 설정은 get_settings()를 처음 부를 때 한 번만 읽고,
+# API 클라이언트는 각 서비스가 @cache_resource로 처음 쓸 때 만든다.
 import os
-import streamlit as st
+import functools
+from dataclasses import dataclass
+from typing import Optional
+
 
 def get_secret(key):
     """로컬과 Streamlit Cloud 환경 모두 지원"""
     # Streamlit Cloud
-    if hasattr(st, 'secrets'):
-        try:
-            return st.secrets[key]
-        except:
-            pass
-    
+    try:
+        import streamlit as st
+        return st.secrets[key]
+    except Exception:
+        pass
+
     # 로컬 환경 (.env)
     return os.getenv(key)
 
 # 사용 예시:
-# NOTION_API_KEY = get_secret("NOTION_API_KEY")
+# NOTION_API_KEY = get_settings().notion_api_key
+
+
+@dataclass(frozen=True)
+class Settings:
+    deepseek_api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    notion_api_key: Optional[str] = None
+    notion_db_id: Optional[str] = None
+    notion_idempotency_property: Optional[str] = None   # 멱등 키를 적어 둘 rich_text 속성 (선택)
+
+
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    """.env + secrets에서 설정 읽기 (프로세스당 한 번)"""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass  # Streamlit Cloud에서는 secrets 사용
+
+    return Settings(
+        deepseek_api_key=get_secret("DEEPSEEK_API_KEY"),
+        openai_api_key=get_secret("OPENAI_API_KEY"),
+        notion_api_key=get_secret("NOTION_API_KEY"),
+        notion_db_id=get_secret("NOTION_DB_ID"),
+        notion_idempotency_property=get_secret("NOTION_IDEMPOTENCY_PROPERTY"),
+    )
+
+
+def cache_resource(func):
+    """
+    Streamlit 앱 안에서는 st.cache_resource(모든 세션이 공유),
+    스크립트/테스트에서는 프로세스 단위 캐시로 동작하는 데코레이터
+
+    어느 쪽을 쓸지는 처음 호출될 때 정하므로 import만으로 streamlit을 불러오지 않는다.
+    """
+    cached = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal cached
+        if cached is None:
+            try:
+                import streamlit as st
+                cached = st.cache_resource(show_spinner=False)(func)
+            except ImportError:
+                cached = functools.lru_cache(maxsize=None)(func)
+        return cached(*args, **kwargs)
+
+    def clear():
+        if cached is not None:
+            (cached.clear if hasattr(cached, "clear") else cached.cache_clear)()
 
+    wrapper.clear = clear
+    return wrapper
@@ -0,0 +1,127 @@
+# services/dashboard_cache.py - 현황/잔금표 집계·차트 캐시 (데이터 버전마다 한 번만 계산)
+import functools
+import threading
+
+from services.local_store import local_store
+
+MAX_ENTRIES = 32   # 함수마다 보관할 (버전, 인자) 조합 수
+
+_counters = {"lookups": 0, "misses": 0}
+_counter_lock = threading.Lock()
+
+
+def data_version(store=None):
+    """
+    대시보드 데이터 버전 = 로컬 저장소 revision
+
+    저장 요청(add_pending), Notion 전송 확인/거절, 동기화 upsert/삭제 때마다 1씩 오른다.
+    """
+    return (store or local_store).revision()
+
+
+def versioned(func):
+    """
+    첫 인자가 데이터 버전인 함수를 (버전, 나머지 인자)별로 한 번만 계산하는 데코레이터
+
+    Streamlit 앱 안에서는 st.cache_data(모든 세션이 공유, 꺼낼 때마다 복사본),
+    스크립트/테스트에서는 프로세스 단위 LRU. 버전이 오르면 키가 바뀌어 자연스럽게 새로 계산된다.
+    차트는 Figure 대신 JSON 문자열(불변)로 캐시한다.
+    """
+    cached = None
+
+    @functools.wraps(func)
+    def compute(version, *args):
+        _count("misses")
+        return func(version, *args)
+
+    @functools.wraps(func)
+    def wrapper(version, *args):
+        nonlocal cached
+        if cached is None:
+            try:
+                import streamlit as st
+                cached = st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)(compute)
+            except ImportError:
+                cached = functools.lru_cache(maxsize=MAX_ENTRIES)(compute)
+        _count("lookups")
+        return cached(version, *args)
+
+    return wrapper
+
+
+def _count(name):
+    with _counter_lock:
+        _counters[name] += 1
+
+
+def get_dashboard_cache_stats():
+    """이 프로세스의 대시보드 캐시 hits/misses/hit_rate"""
+    with _counter_lock:
+        lookups, misses = _counters["lookups"], _counters["misses"]
+    return {
+        "hits": lookups - misses,
+        "misses": misses,
+        "hit_rate": (lookups - misses) / lookups if lookups else 0.0,
+    }
+
+
+# ----- 탭3: 이번 달 현황 -----
+
+@versioned
+def record_count(version):
+    """로컬 저장소 전체 기록 수 (비어 있으면 동기화 안내)"""
+    return local_store.count()
+
+
+@versioned
+def month_metrics(version, today):
+    """이번 달 현황 카드 값 (receivables.summary_metrics)"""
+    from services.receivables import load_frame, month_frame, summary_metrics
+    return summary_metrics(month_frame(load_frame(), today))
+
+
+@versioned
+def upcoming_sites(version, start, end):
+    """받을 돈 목록의 현장 필터 선택지"""
+    return local_store.open_receivable_sites(start, end)
+
+
+@versioned
+def upcoming(version, today, days, sites, payment_types, order, page):
+    """받을 돈 목록 한 페이지 → (DataFrame, 전체 건수). sites/payment_types는 tuple로"""
+    from services.receivables import upcoming_page
+    return upcoming_page(today, days=days, sites=sites, payment_types=payment_types, order=order, page=page)
+
+
+@versioned
+def collection_pie(version, today):
+    """이번 달 수금률 파이 차트 JSON (charts.figure_from_spec으로 그림)"""
+    from services.charts import create_collection_pie
+    metrics = month_metrics(version, today)
+    return create_collection_pie(metrics["received"], metrics["remaining"]).to_json()
+
+
+# ----- 탭4: 현장별 잔금 현황 -----
+
+@versioned
+def site_table(version):
+    """현장별 계약금액/받은금액/잔금/진행률 (receivables.site_summary)"""
+    from services.receivables import load_frame, site_summary
+    return site_summary(load_frame())
+
+
+@versioned
+def site_table_view(version):
+    """상세 내역 표시용 (금액은 '1,000원', 진행률은 '40%' 문자열)"""
+    view = site_table(version).copy()
+    for column in ("계약금액", "받은금액", "잔금"):
+        view[column] = view[column].map("{:,}원".format).astype(str)
+    view["진행률"] = view["진행률"].map("{}%".format).astype(str)
+    return view
+
+
+@versioned
+def payment_chart(version):
+    """현장별 수금 현황 막대 차트 JSON (charts.figure_from_spec으로 그림)"""
+    from services.charts import create_payment_chart
+    return create_payment_chart(site_table(version)).to_json()
@@ -0,0 +1,84 @@
+# services/export.py - 수금 기록 내보내기 (로컬 저장소 → XLSX/CSV, chunk 단위로 흘려 씀)
+import csv
+import io
+import tempfile
+
+from services.local_store import local_store, LOCAL_PREFIX
+
+EXPORT_CHUNK = 5000                  # 저장소에서 한 번에 읽는 행 수
+SPOOL_MAX_BYTES = 4 * 1024 * 1024    # 이보다 커지면 임시 파일(디스크)로 넘김
+
+MIME_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+# (저장소 컬럼, 내보내기 헤더)
+EXPORT_COLUMNS = (
+    ("site", "현장"),
+    ("work", "작업내용"),
+    ("payment_type", "구분"),
+    ("amount", "금액(원)"),
+    ("due_date", "예정일"),
+    ("location", "위치"),
+    ("received", "입금완료"),
+    ("created_time", "등록일시"),
+    ("page_id", "Notion 페이지"),
+)
+
+
+def export_format():
+    """openpyxl이 있으면 xlsx, 없으면 csv (엑셀에서 바로 열리도록 UTF-8 BOM)"""
+    try:
+        import openpyxl  # noqa: F401
+        return "xlsx"
+    except ImportError:
+        return "csv"
+
+
+def export_rows(store=None, chunk_size=EXPORT_CHUNK):
+    """저장소 기록 → 내보내기 행 (chunk 단위로 읽어 한 행씩)"""
+    columns = [column for column, _ in EXPORT_COLUMNS]
+    received = columns.index("received")
+    page_id = columns.index("page_id")
+    for chunk in (store or local_store).iter_rows(columns, chunk_size=chunk_size):
+        for row in chunk:
+            row = list(row)
+            row[received] = "예" if row[received] else ""
+            if row[page_id].startswith(LOCAL_PREFIX):
+                row[page_id] = "전송 대기"
+            yield row
+
+
+def export_bytes(fmt=None, store=None):
+    """
+    전체 기록 → fmt(xlsx/csv) 파일 내용
+
+    행은 chunk 단위로 읽어 바로 흘려 쓰고(xlsx는 openpyxl write-only), 쓰는 중인 파일은
+    SPOOL_MAX_BYTES를 넘으면 임시 파일로 옮긴다. 메모리에는 저장소 chunk 하나와 완성된 파일 내용
+    (st.download_button이 보관하는 분량)만 남는다.
+    """
+    fmt = fmt or export_format()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    headers = [header for _, header in EXPORT_COLUMNS]
+
+    if fmt == "xlsx":
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("수금현황")
+        sheet.append(headers)
+        for row in export_rows(store):
+            sheet.append(row)
+        workbook.save(spool)
+    else:
+        text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        writer = csv.writer(text)
+        writer.writerow(headers)
+        writer.writerows(export_rows(store))
+        text.flush()
+        text.detach()
+
+    with spool:
+        spool.seek(0)
+        return spool.read()
@@ -0,0 +1,105 @@
+# services/json_stream.py - 스트리밍 JSON 증분 파서
+import json
+
+
+class JSONFieldStream:
+    """
+    조각으로 도착하는 JSON 객체에서 최상위 필드를 완성되는 즉시 꺼내는 파서
+
+    stream = JSONFieldStream()
+    for chunk in 응답조각들:
+        for key, value in stream.feed(chunk):
+            ...  # "site_name": "북구청" 이 닫히는 순간 바로 나옴
+
+    문자열/숫자/true/false/null은 물론 중첩 객체·배열 값도 닫히면 한 번에 내보낸다.
+    이미 읽은 위치는 다시 훑지 않으므로 전체 비용은 응답 길이에 비례.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+        self.done = False
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"       # key → value → after
+        self._key = None
+        self._token_start = None   # 최상위 문자열 토큰 시작 위치
+        self._value_start = None   # 현재 값 시작 위치
+
+    def feed(self, chunk):
+        """조각 추가 후 새로 완성된 (키, 값) 목록 반환"""
+        self.buffer += chunk or ""
+        completed = []
+        buf = self.buffer
+
+        while self._pos < len(buf) and not self.done:
+            pos = self._pos
+            ch = buf[pos]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._close_string(pos, completed)
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1:
+                    self._token_start = pos
+                    if self._expect == "value" and self._value_start is None:
+                        self._value_start = pos
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2 and self._expect == "value":
+                    self._value_start = pos
+            elif ch in "}]":
+                if self._depth == 2 and self._value_start is not None:
+                    self._emit(pos + 1, completed)
+                elif self._depth == 1:
+                    self._finish_scalar(pos, completed)
+                    self.done = True
+                self._depth -= 1
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect = "value"
+                    self._value_start = None
+                elif ch == ",":
+                    self._finish_scalar(pos, completed)
+                    self._expect = "key"
+                elif not ch.isspace() and self._expect == "value" and self._value_start is None:
+                    self._value_start = pos  # 숫자/true/false/null
+
+        return completed
+
+    def _close_string(self, pos, completed):
+        if self._expect == "key":
+            self._key = self._decode(self._token_start, pos + 1)
+        elif self._expect == "value" and self._value_start == self._token_start:
+            self._emit(pos + 1, completed)
+
+    def _finish_scalar(self, end, completed):
+        if self._expect == "value" and self._value_start is not None:
+            self._emit(end, completed)
+
+    def _emit(self, end, completed):
+        value = self._decode(self._value_start, end)
+        if self._key is not None:
+            self.fields[self._key] = value
+            completed.append((self._key, value))
+        self._expect = "after"
+        self._value_start = None
+
+    def _decode(self, start, end):
+        raw = self.buffer[start:end].strip()
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
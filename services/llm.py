@@ -2,437 +2,642 @@
 import os
 import json
 import re
-from datetime import datetime, timedelta
-from openai import OpenAI
-
-# Streamlit Cloud와 로컬 환경 모두 지원
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
-
-# DeepSeek API 설정
-try:
-    import streamlit as st
-    DEEPSEEK_API_KEY = st.secrets.get("DEEPSEEK_API_KEY", os.getenv("DEEPSEEK_API_KEY"))
-except:
-    DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-
-# DeepSeek 클라이언트 설정
-if DEEPSEEK_API_KEY:
-    deepseek_client = OpenAI(
-        api_key=DEEPSEEK_API_KEY,
-        base_url="https://api.deepseek.com/v1"
+import hashlib
+import random
+import asyncio
+import weakref
+import functools
+import time
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date
+from services.rule_parser import rule_based_parse, parse_with_confidence
+from services.analysis_cache import analysis_cache, make_key
+from services.json_stream import JSONFieldStream
+from services.config import get_settings, cache_resource
+
+DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
+
+@cache_resource
+def get_deepseek_client():
+    """DeepSeek 클라이언트 (처음 쓸 때 생성, 세션 간 공유). API 키가 없으면 None"""
+    api_key = get_settings().deepseek_api_key
+    if not api_key:
+        return None
+
+    from openai import OpenAI
+    return OpenAI(
+        api_key=api_key,
+        base_url=DEEPSEEK_BASE_URL,
+        timeout=REQUEST_TIMEOUT  # 일괄 분석 기본값 (마감이 있는 단건 분석은 _deadline_client로 줄임)
     )
-else:
-    deepseek_client = None
 
-def analyze_text(text):
-    """건설현장 실무 중심 텍스트 분석"""
-    
-    prompt = f"""
-    건설현장 수금 관리 시스템입니다.
-    아래 텍스트를 분석해서 JSON 형식으로 변환하세요.
-
-    분석할 텍스트: "{text}"
-
-    반환 형식:
-    {{
-        "site_name": "현장명 또는 거래처명",
-        "work_type": "작업 종류",
-        "amount": "금액 (숫자만)",
-        "payment_type": "계약금|중도금|잔금|자재비|인건비|기타",
-        "expected_date": "받을 날짜",
-        "payment_method": "현금|계좌이체|카드|미정",
-        "memo": "추가 메모사항"
-    }}
-
-    **분석 규칙:**
-    1. site_name: "북구청", "강남 아파트", "김사장" 등 거래처/현장명
-    2. work_type: "방수", "타일", "미장", "조적", "인테리어" 등
-    3. amount: 숫자만 (예: "1000만원" → "10000000")
-    4. payment_type: 텍스트에서 "잔금", "중도금" 등 찾기
-    5. expected_date: "YYYY-MM-DD" 형식으로 변환
-    6. 정보가 없으면 빈 문자열 ""
-    
-    반드시 유효한 JSON만 반환하세요.
+# 비동기 대량 분석 설정
+ASYNC_CONCURRENCY = int(os.getenv("DEEPSEEK_CONCURRENCY", "8"))
+REQUEST_TIMEOUT = float(os.getenv("DEEPSEEK_TIMEOUT", "30"))
+ASYNC_MAX_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+_async_clients = weakref.WeakKeyDictionary()
+
+# 지연 예산: 마감 시간을 넘기면 규칙 결과로 대체, p95를 넘기면 헤지 요청
+LLM_DEADLINE = float(os.getenv("DEEPSEEK_DEADLINE", "8"))
+HEDGE_ENABLED = os.getenv("DEEPSEEK_HEDGE", "1") == "1"
+HEDGE_DEFAULT_DELAY = 3.0     # 지연 표본이 모이기 전 헤지 시점
+HEDGE_MIN_SAMPLES = 20
+LLM_POOL_SIZE = 8
+LLM_LATENCIES = deque(maxlen=200)   # 최근 성공 지연(초)
+LLM_OUTCOMES = Counter()            # primary / hedge / fallback
+_llm_pool = None
+_speculative_pool = None
+_pool_lock = threading.Lock()   # 풀 생성은 세션 스레드들이 동시에 할 수 있음
+
+# 분석 결과 필드 (화면 표시 순서)
+RESULT_FIELDS = ('site_name', 'work_type', 'amount', 'payment_type', 'expected_date', 'payment_method', 'memo')
+
+# 규칙 우선 라우팅: 필수 필드 신뢰도가 모두 기준 이상이면 LLM 호출 생략
+REQUIRED_FIELDS = ('site_name', 'amount', 'payment_type', 'expected_date')
+CONFIDENCE_THRESHOLD = 0.5
+
+# 분석 경로별 처리 건수
+# (rule: 규칙으로 충분 / cache: 캐시된 LLM 결과 / llm: DeepSeek / fallback: LLM 불가·실패로 규칙 사용)
+ROUTE_STATS = Counter()
+
+def analyze_text(text, stream=False, speculative=False):
     """
-    
-    if deepseek_client:
-        try:
-            response = deepseek_client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "건설현장 수금 관리 데이터 분석 AI"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content or "{}")
-            print(f"AI 분석 결과: {result}")
-            return post_process(result, text)
-            
-        except Exception as e:
-            print(f"AI 분석 오류: {e}")
-            return rule_based_parse(text)
-    else:
-        return rule_based_parse(text)
-
-def rule_based_parse(text):
-    """규칙 기반 파싱 (AI 없이도 작동)"""
-    result = {
-        'site_name': '',
-        'work_type': '',
-        'amount': '',
-        'payment_type': '',
-        'expected_date': '',
-        'payment_method': '',
-        'memo': ''
-    }
-    
-    # 1. 현장명/거래처 추출
-    site_patterns = [
-        (r'(\S+구청)', 1),
-        (r'(\S+시청)', 1),
-        (r'(\S+청사)', 1),
-        (r'(\S+\s?아파트)', 1),
-        (r'(\S+\s?현장)', 1),
-        (r'(\S+\s?빌딩)', 1),
-        (r'(\S+\s?오피스텔)', 1),
-        (r'(\S+\s?빌라)', 1),
-        (r'(\S+\s?주택)', 1),
-        (r'(\S+건설)', 1),
-        (r'(\S+건축)', 1),
-        (r'(\S+시공)', 1),
-        (r'(\S+인테리어)', 1),
-        (r'(\S+사장)', 1),
-    ]
-    
-    for pattern, group in site_patterns:
-        match = re.search(pattern, text)
-        if match:
-            result['site_name'] = match.group(group).strip()
-            break
-    
-    # 2. 작업 종류 추출
-    work_keywords = {
-        '방수': '방수공사',
-        '미장': '미장공사',
-        '조적': '조적공사',
-        '타일': '타일공사',
-        '인테리어': '인테리어',
-        '도색': '도색작업',
-        '페인트': '페인트작업',
-        '전기': '전기공사',
-        '설비': '설비공사',
-        '철근': '철근작업',
-        '도배': '도배작업',
-        '장판': '장판작업',
-        '샷시': '샷시공사',
-        '유리': '유리공사',
-        '목공': '목공작업',
-        '철거': '철거작업',
-        '청소': '청소작업'
-    }
-    
-    for keyword, work_name in work_keywords.items():
-        if keyword in text:
-            result['work_type'] = work_name
-            break
-    
-    # 작업이 안 나오면 text에서 "작업" 앞 단어 추출
-    if not result['work_type']:
-        work_match = re.search(r'(\S+)\s*작업', text)
-        if work_match:
-            result['work_type'] = f"{work_match.group(1)}작업"
-    
-    # 3. 금액 추출 (숫자로 변환)
-    amount_patterns = [
-        (r'(\d+)\s*억\s*(\d+)?\s*만?\s*원?', lambda m: 
-            int(m.group(1)) * 100000000 + (int(m.group(2)) * 10000 if m.group(2) else 0)),
-        (r'(\d+)\s*천\s*만\s*원?', lambda m: int(m.group(1)) * 10000000),
-        (r'(\d+)\s*백\s*만\s*원?', lambda m: int(m.group(1)) * 1000000),
-        (r'(\d+)\s*만\s*원', lambda m: int(m.group(1)) * 10000),
-        (r'(\d+)\s*만원', lambda m: int(m.group(1)) * 10000),
-        (r'(\d+)만', lambda m: int(m.group(1)) * 10000),
-        (r'(\d{7,})\s*원', lambda m: int(m.group(1))),  # 7자리 이상 숫자
-        (r'(\d+,\d+)\s*원', lambda m: int(m.group(1).replace(',', ''))),
-    ]
-    
-    for pattern, converter in amount_patterns:
-        match = re.search(pattern, text)
-        if match:
-            result['amount'] = str(converter(match))
-            break
-    
-    # 4. 거래 유형 추출
-    payment_types = {
-        '계약금': '계약금',
-        '착수금': '계약금',
-        '선금': '계약금',
-        '중도금': '중도금',
-        '중도 금': '중도금',
-        '잔금': '잔금',
-        '잔 금': '잔금',
-        '완료금': '잔금',
-        '준공금': '잔금',
-        '자재비': '자재비',
-        '자재 비': '자재비',
-        '자재값': '자재비',
-        '자재 값': '자재비',
-        '인건비': '인건비',
-        '인건 비': '인건비',
-        '노무비': '인건비',
-        '일당': '인건비',
-        '품값': '인건비',
-        '품삯': '인건비'
-    }
-    
-    for keyword, ptype in payment_types.items():
-        if keyword in text:
-            result['payment_type'] = ptype
-            break
-    
-    if not result['payment_type']:
-        result['payment_type'] = '기타'
-    
-    # 5. 예상 날짜 추출
-    today = datetime.now()  # 시스템 날짜 자동 가져오기
-    
-    # 조건부 날짜 (작업 완료 후 등)
-    if any(word in text for word in ['끝나면', '완료되면', '완료후', '완료 후', '끝나고']):
-        result['expected_date'] = '작업 완료 후'
-    # 다음주 + 요일 패턴
-    elif '다음주' in text or '다음 주' in text:
-        # 현재 요일 확인 (0=월요일, 6=일요일)
-        current_weekday = today.weekday()
-        
-        # 다음주 시작(월요일)까지 일수 계산
-        if current_weekday == 6:  # 일요일
-            days_to_next_monday = 1
+    건설현장 실무 중심 텍스트 분석 (규칙 우선, 애매할 때만 LLM)
+
+    stream=True면 (필드, 값)을 완성되는 순서대로 내보내는 제너레이터를 반환하고,
+    마지막에 (None, 전체 결과)를 내보낸다.
+    speculative=True면 (규칙 결과, Future)를 바로 반환한다. LLM이 필요 없으면 Future는 None,
+    있으면 백그라운드에서 LLM 결과(실패 시 규칙 결과)로 완료된다.
+    """
+    if stream:
+        return _analyze_stream(text)
+    if speculative:
+        return _analyze_speculative(text)
+
+    served, cache_key, rule_result, weak_fields = _route(text, date.today().isoformat())
+    if served is not None:
+        return served
+
+    return _llm_or_fallback(text, cache_key, rule_result, weak_fields)
+
+def _analyze_speculative(text):
+    """analyze_text(speculative=True) 본체"""
+    served, cache_key, rule_result, weak_fields = _route(text, date.today().isoformat())
+    if served is not None:
+        return served, None
+
+    # 화면에는 규칙 결과를 먼저 보여주고, LLM 결과는 Future로 나중에 받는다
+    preview = dict(rule_result, source='rule')
+    future = _get_speculative_pool().submit(_llm_or_fallback, text, cache_key, rule_result, weak_fields)
+    return preview, future
+
+def _llm_or_fallback(text, cache_key, rule_result, weak_fields):
+    """마감 시간 안에 LLM 분석, 실패하면 규칙 결과"""
+    print(f"LLM 호출 (애매한 필드: {weak_fields})")
+    try:
+        result = _llm_analyze_within_deadline(text)
+        analysis_cache.put(cache_key, result)
+        return _served(result, 'llm')
+    except Exception as e:
+        print(f"AI 분석 오류: {e}")
+        return _served(rule_result, 'fallback')
+
+def apply_upgrade(data, baseline, upgraded):
+    """
+    선분석(규칙) 화면 데이터에 LLM 결과 반영 (normalize_data 형식끼리)
+
+    값이 다른 필드만 바꾸고, 그 사이 사용자가 직접 고친 필드(baseline과 달라진 값)는 건드리지 않는다.
+    반환: 바뀐 필드 목록
+    """
+    changed = []
+    for key, value in upgraded.items():
+        if key == 'source' or data.get(key) != baseline.get(key) or data.get(key) == value:
+            continue
+        data[key] = value
+        changed.append(key)
+    data['source'] = upgraded.get('source', data.get('source'))
+    return changed
+
+def _analyze_stream(text):
+    """analyze_text(stream=True) 본체"""
+    served, cache_key, rule_result, weak_fields = _route(text, date.today().isoformat())
+    if served is not None:
+        yield from _replay(served)
+        return
+
+    print(f"LLM 스트리밍 호출 (애매한 필드: {weak_fields})")
+    started = time.monotonic()
+    deadline = started + LLM_DEADLINE
+    expired = threading.Event()
+    response = watchdog = None
+    try:
+        parser = JSONFieldStream()
+        response = _deadline_client(deadline).chat.completions.create(
+            **_completion_args(text), stream=True, stream_options={"include_usage": True}
+        )
+        # 요청 타임아웃은 조각 하나를 읽을 때마다 새로 재므로, 전체 마감은 타이머가 스트림을 닫아 지킨다
+        watchdog = threading.Timer(max(deadline - time.monotonic(), 0), _expire, (response, expired))
+        watchdog.daemon = True
+        watchdog.start()
+        for chunk in response:
+            # usage는 choices가 빈 마지막 조각에 실려 온다
+            if getattr(chunk, "usage", None):
+                _record_usage(chunk.usage)
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            for key, value in parser.feed(delta):
+                yield key, _clean_field(key, value)
+        if expired.is_set():
+            raise TimeoutError(f"마감 시간 {LLM_DEADLINE}초 초과")
+
+        result = json.loads(parser.buffer or "{}")
+        print(f"AI 분석 결과: {result}")
+        result = post_process(result, text)
+        _record_latency('primary', time.monotonic() - started)
+        analysis_cache.put(cache_key, result)
+        yield None, _served(result, 'llm')
+    except Exception as e:
+        if expired.is_set():
+            e = TimeoutError(f"마감 시간 {LLM_DEADLINE}초 초과")
+        print(f"AI 분석 오류: {e}")
+        LLM_OUTCOMES['fallback'] += 1
+        yield None, _served(rule_result, 'fallback')
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+        if response is not None:
+            response.close()
+
+def _expire(response, expired):
+    """마감 시각에 스트림을 닫아 읽기 대기를 끊는다 (타이머 스레드에서 호출)"""
+    expired.set()
+    response.close()
+
+def _replay(result):
+    """이미 끝난 결과를 스트리밍 형식으로 내보내기"""
+    for key in RESULT_FIELDS:
+        yield key, result.get(key, '')
+    yield None, result
+
+def _clean_field(key, value):
+    """스트리밍 중인 필드 하나를 post_process와 같은 규칙으로 보정"""
+    if not value:
+        return value
+    if key == 'amount':
+        return _clean_amount(value)
+    if key == 'expected_date':
+        return _clean_date(value)
+    return value
+
+def analyze_texts(texts):
+    """
+    여러 메모 일괄 분석 (백필용)
+
+    규칙/캐시로 끝나지 않는 메모만 모아 한 번의 요청에 여러 건씩 묶어 보낸다.
+    결과는 입력 순서 그대로 반환하고, 응답에서 빠지거나 깨진 항목은 규칙 결과로 대체.
+    """
+    anchor = date.today().isoformat()
+    results = [None] * len(texts)
+    pending = {}  # cache_key -> [text, rule_result, [입력 인덱스]] (같은 메모는 한 번만 요청)
+
+    for i, text in enumerate(texts):
+        served, cache_key, rule_result, _ = _route(text, anchor)
+        if served is not None:
+            results[i] = served
+        elif cache_key in pending:
+            pending[cache_key][2].append(i)
         else:
-            days_to_next_monday = 7 - current_weekday
-        
-        next_monday = today + timedelta(days=days_to_next_monday)
-        
-        # 요일별 처리
-        weekday_offsets = {
-            '월요일': 0,
-            '화요일': 1, 
-            '수요일': 2,
-            '목요일': 3,
-            '금요일': 4,
-            '토요일': 5,
-            '일요일': 6
-        }
-        
-        # 요일 찾기
-        found_weekday = False
-        for day_name, offset in weekday_offsets.items():
-            if day_name in text:
-                target_date = next_monday + timedelta(days=offset)
-                result['expected_date'] = target_date.strftime('%Y-%m-%d')
-                found_weekday = True
-                break
-        
-        # 요일이 명시되지 않은 경우 다음주 월요일
-        if not found_weekday:
-            result['expected_date'] = next_monday.strftime('%Y-%m-%d')
-    
-    # 이번주 + 요일 패턴
-    elif '이번주' in text or '이번 주' in text:
-        weekday_map = {
-            '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
-            '금요일': 4, '토요일': 5, '일요일': 6
-        }
-        
-        for day_name, day_num in weekday_map.items():
-            if day_name in text:
-                # 이번주의 특정 요일 계산
-                days_ahead = day_num - today.weekday()
-                if days_ahead <= 0:  # 이미 지난 경우
-                    days_ahead += 7
-                result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-                break
-    
-    # 요일만 언급된 경우 (이번주로 간주)
-    elif any(day in text for day in ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']):
-        weekday_map = {
-            '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
-            '금요일': 4, '토요일': 5, '일요일': 6
-        }
-        
-        for day_name, day_num in weekday_map.items():
-            if day_name in text:
-                days_ahead = day_num - today.weekday()
-                if days_ahead <= 0:  # 이미 지났거나 오늘이면 다음주
-                    days_ahead += 7
-                result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-                break
-    
-    # 기타 날짜 패턴들
-    else:
-        date_patterns = [
-            (r'오늘', today.strftime('%Y-%m-%d')),
-            (r'내일', (today + timedelta(days=1)).strftime('%Y-%m-%d')),
-            (r'모레', (today + timedelta(days=2)).strftime('%Y-%m-%d')),
-            (r'글피', (today + timedelta(days=3)).strftime('%Y-%m-%d')),
-            (r'어제', (today - timedelta(days=1)).strftime('%Y-%m-%d')),
-            (r'(\d+)일\s*후', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-            (r'(\d+)일\s*뒤', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-            (r'(\d+)일\s*전', lambda m: (today - timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-        ]
-        
-        for pattern, replacement in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if callable(replacement):
-                    result['expected_date'] = replacement(match)
-                else:
-                    result['expected_date'] = replacement
-                break
-        
-        # 구체적 날짜 패턴
-        if not result.get('expected_date'):
-            # 월/일 형식
-            date_match = re.search(r'(\d{1,2})[월/]\s*(\d{1,2})', text)
-            if date_match:
-                month = int(date_match.group(1))
-                day = int(date_match.group(2))
-                year = today.year
-                try:
-                    target_date = datetime(year, month, day)
-                    if target_date < today:
-                        year += 1
-                    result['expected_date'] = f"{year}-{month:02d}-{day:02d}"
-                except:
-                    pass
-        
-        # 이번주 + 요일 패턴
-        elif '이번주' in text or '이번 주' in text:
-            weekday_map = {
-                '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
-                '금요일': 4, '토요일': 5, '일요일': 6
-            }
-            
-            for day_name, day_num in weekday_map.items():
-                if day_name in text:
-                    # 이번주의 특정 요일 계산
-                    days_ahead = day_num - today.weekday()
-                    if days_ahead <= 0:  # 이미 지난 경우
-                        days_ahead += 7
-                    result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-                    break
-        
-        # 요일만 언급된 경우 (이번주로 간주)
-        elif any(day in text for day in ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']):
-            weekday_map = {
-                '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
-                '금요일': 4, '토요일': 5, '일요일': 6
-            }
-            
-            for day_name, day_num in weekday_map.items():
-                if day_name in text:
-                    days_ahead = day_num - today.weekday()
-                    if days_ahead <= 0:  # 이미 지났거나 오늘이면 다음주
-                        days_ahead += 7
-                    result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-                    break
-        
-        # 기타 날짜 패턴들
+            pending[cache_key] = [text, rule_result, [i]]
+
+    items = [(key, text, rule_result, indices) for key, (text, rule_result, indices) in pending.items()]
+    for batch in _plan_batches(items):
+        _analyze_batch(batch, results)
+
+    return results
+
+def get_route_stats():
+    """분석 경로별 누적 처리 건수"""
+    return dict(ROUTE_STATS)
+
+async def analyze_text_async(text, semaphore=None):
+    """
+    analyze_text의 비동기 버전 (대량 재처리용)
+    semaphore를 넘기면 동시에 나가는 DeepSeek 요청 수를 제한한다.
+    """
+    served, cache_key, rule_result, weak_fields = _route(text, date.today().isoformat())
+    if served is not None:
+        return served
+
+    client = _get_async_client()
+    if client is None:
+        return _served(rule_result, 'fallback')
+
+    print(f"LLM 비동기 호출 (애매한 필드: {weak_fields})")
+    try:
+        if semaphore is None:
+            result = await _llm_analyze_async(client, text)
         else:
-            date_patterns = [
-                (r'오늘', today.strftime('%Y-%m-%d')),
-                (r'내일', (today + timedelta(days=1)).strftime('%Y-%m-%d')),
-                (r'모레', (today + timedelta(days=2)).strftime('%Y-%m-%d')),
-                (r'글피', (today + timedelta(days=3)).strftime('%Y-%m-%d')),
-                (r'어제', (today - timedelta(days=1)).strftime('%Y-%m-%d')),
-                (r'(\d+)일\s*후', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-                (r'(\d+)일\s*뒤', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-                (r'(\d+)일\s*전', lambda m: (today - timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
-            ]
-        
-        for pattern, replacement in date_patterns:
-            match = re.search(pattern, text)
-            if match:
-                if callable(replacement):
-                    result['expected_date'] = replacement(match)
-                else:
-                    result['expected_date'] = replacement
-                break
-        
-        # 구체적 날짜 패턴
-        if not result['expected_date']:
-            # 월/일 형식
-            date_match = re.search(r'(\d{1,2})[월/]\s*(\d{1,2})', text)
-            if date_match:
-                month = int(date_match.group(1))
-                day = int(date_match.group(2))
-                year = today.year
-                try:
-                    target_date = datetime(year, month, day)
-                    if target_date < today:
-                        year += 1
-                    result['expected_date'] = f"{year}-{month:02d}-{day:02d}"
-                except:
-                    pass
-    
-    # 6. 결제 방식 추출
-    payment_methods = {
-        '현금': '현금',
-        '캐시': '현금',
-        '계좌': '계좌이체',
-        '이체': '계좌이체',
-        '송금': '계좌이체',
-        '입금': '계좌이체',
-        '카드': '카드',
-        '체크카드': '카드',
-        '신용카드': '카드',
-        '외상': '외상',
-        '후불': '외상'
-    }
-    
-    for keyword, method in payment_methods.items():
-        if keyword in text:
-            result['payment_method'] = method
-            break
-    
-    if not result['payment_method']:
-        result['payment_method'] = '미정'
-    
-    # 7. 전체 텍스트를 메모로
-    result['memo'] = text
-    
+            async with semaphore:
+                result = await _llm_analyze_async(client, text)
+        analysis_cache.put(cache_key, result)
+        return _served(result, 'llm')
+    except Exception as e:
+        print(f"AI 분석 오류: {e}")
+        return _served(rule_result, 'fallback')
+
+async def analyze_texts_async(texts, concurrency=None):
+    """
+    여러 메모 동시 분석 (결과는 입력 순서 그대로)
+
+    사용 예: results = asyncio.run(analyze_texts_async(memos))
+    같은 메모는 한 번만 요청하고 결과를 복사해 돌려준다.
+    """
+    semaphore = asyncio.Semaphore(concurrency or ASYNC_CONCURRENCY)
+    unique = {text: None for text in texts}
+    done = await asyncio.gather(*(analyze_text_async(text, semaphore) for text in unique))
+    by_text = dict(zip(unique, done))
+    return [dict(by_text[text]) for text in texts]
+
+def _route(text, anchor):
+    """
+    규칙 → 캐시 순으로 처리 시도
+    반환: (처리된 결과 또는 None, 캐시 키, 규칙 결과, 애매한 필드)
+    """
+    rule_result, confidence = parse_with_confidence(text)
+    weak_fields = [f for f in REQUIRED_FIELDS if confidence[f] < CONFIDENCE_THRESHOLD]
+
+    if not weak_fields:
+        return _served(rule_result, 'rule'), None, rule_result, weak_fields
+
+    if get_deepseek_client() is None:
+        return _served(rule_result, 'fallback'), None, rule_result, weak_fields
+
+    # 같은 메모 + 같은 프롬프트 버전 + 같은 기준일이면 이전 LLM 결과 재사용
+    cache_key = make_key(text, PROMPT_VERSION, anchor)
+    cached = analysis_cache.get(cache_key)
+    if cached is not None:
+        return _served(cached, 'cache'), cache_key, rule_result, weak_fields
+
+    return None, cache_key, rule_result, weak_fields
+
+def _served(result, source):
+    """결과에 처리 경로를 기록"""
+    result['source'] = source
+    ROUTE_STATS[source] += 1
     return result
 
+DEEPSEEK_MODEL = "deepseek-chat"
+# 프롬프트 캐싱: DeepSeek는 요청 앞부분이 이전 요청과 바이트 단위로 같으면
+# 그 구간을 캐시에서 읽는다 (과금↓, 첫 토큰 지연↓).
+# 그래서 규칙/스키마는 고정된 system 메시지에 두고, 메모는 항상 맨 끝에 붙인다.
+# 아래 블록을 한 글자라도 바꾸면 PROMPT_RULES_VERSION도 올릴 것.
+PROMPT_RULES_VERSION = "2"
+
+SYSTEM_PROMPT = f"""건설현장 수금 관리 데이터 분석 AI [규칙 v{PROMPT_RULES_VERSION}]
+
+건설현장 수금 메모를 분석해서 JSON 형식으로 변환하세요.
+
+메모 하나의 반환 형식:
+{{
+    "site_name": "현장명 또는 거래처명",
+    "work_type": "작업 종류",
+    "amount": "금액 (숫자만)",
+    "payment_type": "계약금|중도금|잔금|자재비|인건비|기타",
+    "expected_date": "받을 날짜",
+    "payment_method": "현금|계좌이체|카드|미정",
+    "memo": "추가 메모사항"
+}}
+
+**분석 규칙:**
+1. site_name: "북구청", "강남 아파트", "김사장" 등 거래처/현장명
+2. work_type: "방수", "타일", "미장", "조적", "인테리어" 등
+3. amount: 숫자만 (예: "1000만원" → "10000000")
+4. payment_type: 텍스트에서 "잔금", "중도금" 등 찾기
+5. expected_date: "YYYY-MM-DD" 형식으로 변환
+6. 정보가 없으면 빈 문자열 ""
+
+반드시 유효한 JSON만 반환하세요."""
+
+# 메모 한 건 (가변 부분만: 날짜는 캐시되는 앞부분이 아니라 여기에)
+PROMPT_TEMPLATE = '오늘 날짜: {today}\n분석할 텍스트: "{text}"'
+
+# 여러 건 일괄 (가변 부분만, 메모 목록은 맨 끝)
+BATCH_PROMPT_TEMPLATE = """여러 메모를 각각 위 형식으로 분석해서 {{"results": [...]}} 로 반환하세요.
+- 각 항목에 메모의 "index"를 그대로 붙일 것
+- memo: 원문을 그대로 옮기지 말고 추가 사항만 (없으면 "")
+- 오늘 날짜: {today}
+
+분석할 메모 목록:
+{memos}"""
+
+# 프롬프트/모델이 바뀌면 캐시 키도 바뀌도록 버전 해시
+PROMPT_VERSION = hashlib.sha256(
+    f"{DEEPSEEK_MODEL}\x00{SYSTEM_PROMPT}\x00{PROMPT_TEMPLATE}\x00{BATCH_PROMPT_TEMPLATE}".encode("utf-8")
+).hexdigest()[:16]
+
+# DeepSeek 프롬프트 캐시 사용량 (usage.prompt_cache_hit_tokens / miss_tokens 누적)
+PROMPT_CACHE_USAGE = Counter()
+
+# 일괄 분석 토큰 예산 (입력 + 예상 출력). 한글은 대략 글자당 1토큰으로 넉넉히 추정
+BATCH_TOKEN_BUDGET = 6000
+BATCH_MAX_ITEMS = 40
+BATCH_PROMPT_TOKENS = 450      # 지시문 고정 비용
+ITEM_OUTPUT_TOKENS = 110       # 항목당 JSON 응답 (memo 제외)
+MAX_OUTPUT_TOKENS = 8000
+
+def _deadline_client(deadline):
+    """
+    마감 시각까지 남은 시간만 기다리는 클라이언트
+
+    재시도(기본 2회)는 마감을 넘기므로 끈다. 마감 후 버려진 요청도 이 시간이 지나면 끝나서
+    LLM 풀 스레드를 오래 잡지 않는다.
+    """
+    remaining = max(deadline - time.monotonic(), 0.1)
+    return get_deepseek_client().with_options(timeout=remaining, max_retries=0)
+
+def _llm_analyze(text, deadline):
+    """DeepSeek로 분석 (실패 시 예외)"""
+    response = _deadline_client(deadline).chat.completions.create(**_completion_args(text))
+    return _parse_completion(response, text)
+
+def _llm_analyze_within_deadline(text):
+    """
+    마감 시간 안에서만 DeepSeek 분석 (넘기면 TimeoutError)
+
+    첫 요청이 최근 p95 지연을 넘기도록 응답이 없으면 같은 요청을 하나 더 보내고(헤지)
+    둘 중 먼저 성공한 결과를 쓴다. 끝나면 아직 풀에서 시작도 못 한 요청은 취소하고,
+    이미 보낸 요청은 마감 시각에 타임아웃되도록 보낸다 (_deadline_client).
+    지연은 요청마다 자기가 보내진 시점부터 잰다 (헤지 지연이 p95를 부풀리지 않도록).
+    """
+    pool = _get_llm_pool()
+    started = time.monotonic()
+    deadline = started + LLM_DEADLINE
+    pending = {pool.submit(_llm_analyze, text, deadline): ('primary', started)}
+    hedge_at = started + _hedge_delay() if HEDGE_ENABLED else None
+    error = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+
+        wake_at = hedge_at if hedge_at and hedge_at < deadline else deadline
+        done, _ = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+
+        for future in done:
+            outcome, submitted = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                error = e
+                continue
+            _record_latency(outcome, time.monotonic() - submitted)
+            _cancel(pending)
+            return result
+
+        if hedge_at and time.monotonic() >= hedge_at:
+            print(f"DeepSeek 응답 지연 ({hedge_at - started:.1f}초) → 헤지 요청")
+            pending[pool.submit(_llm_analyze, text, deadline)] = ('hedge', time.monotonic())
+            hedge_at = None
+
+    LLM_OUTCOMES['fallback'] += 1
+    if error and not pending:
+        raise error
+    _cancel(pending)
+    raise TimeoutError(f"마감 시간 {LLM_DEADLINE}초 초과")
+
+def _cancel(pending):
+    """버리는 요청 정리: 대기 중이면 취소 (실행 중인 것은 마감 타임아웃으로 끝난다)"""
+    for future in pending:
+        future.cancel()
+
+def _hedge_delay():
+    """헤지 요청 시점: 최근 성공 지연의 p95 (표본이 적으면 기본값)"""
+    if len(LLM_LATENCIES) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    ordered = sorted(LLM_LATENCIES)
+    return ordered[int(len(ordered) * 0.95) - 1]
+
+def _record_latency(outcome, elapsed):
+    LLM_OUTCOMES[outcome] += 1
+    LLM_LATENCIES.append(elapsed)
+
+def get_latency_stats():
+    """LLM 호출 결과(primary/hedge/fallback) 건수 + 최근 p95 지연(초)"""
+    stats = dict(LLM_OUTCOMES)
+    stats['p95'] = _hedge_delay() if len(LLM_LATENCIES) >= HEDGE_MIN_SAMPLES else None
+    return stats
+
+def _get_speculative_pool():
+    """선분석 후 LLM 확인용 스레드 풀 (LLM 풀과 분리해서 서로 기다리다 막히지 않도록)"""
+    global _speculative_pool
+    if _speculative_pool is None:
+        with _pool_lock:
+            if _speculative_pool is None:
+                _speculative_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="speculative")
+    return _speculative_pool
+
+def _get_llm_pool():
+    """동기 LLM 호출용 스레드 풀 (처음 쓸 때 생성)"""
+    global _llm_pool
+    if _llm_pool is None:
+        with _pool_lock:
+            if _llm_pool is None:
+                _llm_pool = ThreadPoolExecutor(max_workers=LLM_POOL_SIZE, thread_name_prefix="deepseek")
+    return _llm_pool
+
+def _completion_args(text):
+    """단건 분석 요청 파라미터 (동기/비동기 공용)"""
+    prompt = PROMPT_TEMPLATE.format(today=date.today().isoformat(), text=text)
+    return dict(
+        model=DEEPSEEK_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        response_format={"type": "json_object"}
+    )
+
+def _parse_completion(response, text):
+    _record_usage(response.usage)
+    result = json.loads(response.choices[0].message.content or "{}")
+    print(f"AI 분석 결과: {result}")
+    return post_process(result, text)
+
+def _get_async_client():
+    """
+    이벤트 루프별 AsyncOpenAI 클라이언트 (처음 쓸 때 생성)
+    httpx 비동기 커넥션은 만든 루프에 묶이므로 asyncio.run()마다 따로 둔다.
+    """
+    api_key = get_settings().deepseek_api_key
+    if not api_key:
+        return None
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=DEEPSEEK_BASE_URL,
+            timeout=REQUEST_TIMEOUT,
+            max_retries=0  # 재시도는 _llm_analyze_async에서 지터와 함께 처리
+        )
+        _async_clients[loop] = client
+    return client
+
+async def _llm_analyze_async(client, text):
+    """DeepSeek 비동기 분석 (요청별 타임아웃 + 지터 재시도, 최종 실패 시 예외)"""
+    for attempt in range(ASYNC_MAX_RETRIES + 1):
+        try:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(**_completion_args(text)),
+                timeout=REQUEST_TIMEOUT
+            )
+            return _parse_completion(response, text)
+        except _retryable_errors() as e:
+            if attempt == ASYNC_MAX_RETRIES:
+                raise
+            delay = random.uniform(0, RETRY_BASE_DELAY * (2 ** attempt))
+            print(f"DeepSeek 재시도 {attempt + 1}/{ASYNC_MAX_RETRIES} ({type(e).__name__}, {delay:.1f}초 후)")
+            await asyncio.sleep(delay)
+
+def _record_usage(usage):
+    """응답 usage에서 프롬프트 캐시 적중/미적중 토큰 누적"""
+    if usage is None:
+        return
+    PROMPT_CACHE_USAGE['requests'] += 1
+    PROMPT_CACHE_USAGE['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+    PROMPT_CACHE_USAGE['cache_hit_tokens'] += getattr(usage, 'prompt_cache_hit_tokens', 0) or 0
+    PROMPT_CACHE_USAGE['cache_miss_tokens'] += getattr(usage, 'prompt_cache_miss_tokens', 0) or 0
+    print(f"프롬프트 캐시: {getattr(usage, 'prompt_cache_hit_tokens', 0) or 0}/{getattr(usage, 'prompt_tokens', 0) or 0} 토큰 적중")
+
+def get_prompt_cache_stats():
+    """DeepSeek 프롬프트 캐시 누적 사용량 + 적중률 (입력 토큰 기준)"""
+    stats = dict(PROMPT_CACHE_USAGE)
+    hit = stats.get('cache_hit_tokens', 0)
+    total = hit + stats.get('cache_miss_tokens', 0)
+    stats['hit_rate'] = hit / total if total else 0.0
+    return stats
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors():
+    """재시도할 예외 (openai는 처음 필요할 때 import)"""
+    from openai import APITimeoutError, APIConnectionError, RateLimitError, InternalServerError
+    return (asyncio.TimeoutError, APITimeoutError, APIConnectionError, RateLimitError, InternalServerError)
+
+def _estimate_tokens(text):
+    """항목 하나의 입력 + 출력 토큰 추정치"""
+    return len(text) + 16 + ITEM_OUTPUT_TOKENS
+
+def _plan_batches(items):
+    """토큰 예산과 최대 건수 안에서 최대한 많이 묶기"""
+    batch, used = [], BATCH_PROMPT_TOKENS
+    for item in items:
+        cost = _estimate_tokens(item[1])
+        if batch and (used + cost > BATCH_TOKEN_BUDGET or len(batch) >= BATCH_MAX_ITEMS):
+            yield batch
+            batch, used = [], BATCH_PROMPT_TOKENS
+        batch.append(item)
+        used += cost
+    if batch:
+        yield batch
+
+def _analyze_batch(batch, results):
+    """
+    한 번의 요청으로 batch 분석 후 results에 채움
+    응답이 잘리거나 JSON이 깨지면 반으로 나눠 다시 요청
+    요청 자체가 실패했거나 항목이 빠진 경우는 규칙 결과 사용
+    """
+    try:
+        entries, truncated = _llm_analyze_batch([text for _, text, _, _ in batch])
+    except Exception as e:
+        print(f"AI 일괄 분석 오류 ({len(batch)}건): {e}")
+        entries, truncated = None, False
+
+    if truncated and len(batch) > 1:
+        half = len(batch) // 2
+        _analyze_batch(batch[:half], results)
+        _analyze_batch(batch[half:], results)
+        return
+
+    entries = entries or {}
+    for position, (cache_key, text, rule_result, indices) in enumerate(batch):
+        entry = entries.get(position)
+        if isinstance(entry, dict) and any(entry.get(f) for f in REQUIRED_FIELDS):
+            entry.pop('index', None)
+            result = post_process(entry, text)
+            analysis_cache.put(cache_key, result)
+            source = 'llm'
+        else:
+            print(f"일괄 분석 항목 {position} 누락/오류 → 규칙 결과 사용")
+            result, source = rule_result, 'fallback'
+
+        for i in indices:
+            results[i] = _served(dict(result), source)
+
+def _llm_analyze_batch(texts):
+    """
+    DeepSeek로 여러 메모 분석
+    반환: ({번호: 결과 dict}, 잘림 여부)
+    """
+    memos = "\n".join(
+        json.dumps({"index": i, "text": text}, ensure_ascii=False) for i, text in enumerate(texts)
+    )
+    prompt = BATCH_PROMPT_TEMPLATE.format(today=date.today().isoformat(), memos=memos)
+    max_tokens = min(MAX_OUTPUT_TOKENS, 2 * ITEM_OUTPUT_TOKENS * len(texts) + 200)
+
+    response = get_deepseek_client().chat.completions.create(
+        model=DEEPSEEK_MODEL,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        max_tokens=max_tokens,
+        response_format={"type": "json_object"}
+    )
+
+    _record_usage(response.usage)
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        return None, True
+
+    try:
+        data = json.loads(choice.message.content or "{}")
+    except json.JSONDecodeError:
+        return None, True
+
+    entries = {}
+    items = data.get("results", []) if isinstance(data, dict) else []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("index"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < len(texts):
+            entries.setdefault(index, item)
+
+    print(f"AI 일괄 분석: {len(entries)}/{len(texts)}건")
+    return entries, False
+
 def post_process(result, original_text):
     """AI 결과 후처리 및 보정"""
     # amount가 문자열인 경우 숫자로 변환
     if 'amount' in result and result['amount']:
-        amount_str = str(result['amount'])
-        # 이미 숫자만 있으면 그대로
-        if amount_str.isdigit():
-            pass
-        # "500만원" 형태면 변환
-        elif '만원' in amount_str or '만' in amount_str:
-            match = re.search(r'(\d+)', amount_str)
-            if match:
-                result['amount'] = str(int(match.group(1)) * 10000)
+        result['amount'] = _clean_amount(result['amount'])
     
     # 날짜 형식 검증
     if 'expected_date' in result and result['expected_date']:
-        if not re.match(r'\d{4}-\d{2}-\d{2}', result['expected_date']):
-            # 상대적 날짜 표현 처리
-            from services.utils import parse_korean_date
-            parsed_date = parse_korean_date(result['expected_date'])
-            if parsed_date:
-                result['expected_date'] = parsed_date
+        result['expected_date'] = _clean_date(result['expected_date'])
     
     # 빈 필드 처리
-    for key in ['site_name', 'work_type', 'amount', 'payment_type', 'expected_date', 'payment_method', 'memo']:
+    for key in RESULT_FIELDS:
         if key not in result:
             result[key] = ''
     
@@ -442,6 +647,26 @@ def post_process(result, original_text):
     
     return result
 
+def _clean_amount(value):
+    """금액 보정: "500만원" → "5000000" """
+    amount_str = str(value)
+    # 이미 숫자만 있으면 그대로
+    if amount_str.isdigit():
+        return value
+    # "500만원" 형태면 변환
+    if '만원' in amount_str or '만' in amount_str:
+        match = re.search(r'(\d+)', amount_str)
+        if match:
+            return str(int(match.group(1)) * 10000)
+    return value
+
+def _clean_date(value):
+    """날짜 보정: 상대적 날짜 표현 → YYYY-MM-DD"""
+    if not isinstance(value, str) or re.match(r'\d{4}-\d{2}-\d{2}', value):
+        return value
+    from services.utils import parse_korean_date
+    return parse_korean_date(value) or value
+
 def normalize_data(raw_data):
     """
     LLM 분석 결과를 Notion 저장용 형식으로 변환
@@ -478,7 +703,8 @@ def normalize_data(raw_data):
         'original_amount': raw_data.get('amount', ''),
         'work_type': raw_data.get('work_type', ''),
         'payment_method': raw_data.get('payment_method', ''),
-        'memo': raw_data.get('memo', '')
+        'memo': raw_data.get('memo', ''),
+        'source': raw_data.get('source', '')             # 분석 경로 (rule/cache/llm/fallback)
     }
     
     return normalized
@@ -0,0 +1,302 @@
+# services/local_store.py - Notion 기록의 로컬 사본 (SQLite, 대시보드는 API 호출 없이 여기서 조회)
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from services.analysis_cache import CACHE_DIR
+
+# 거래 유형 분류 (rule_parser.PAYMENT_TYPES 값 기준)
+INCOME_TYPES = ("계약금", "중도금", "잔금", "기타")
+EXPENSE_TYPES = ("자재비", "인건비")
+
+LOCAL_PREFIX = "local-"   # Notion 페이지가 아직 없는(전송 대기) 기록의 page_id 앞머리
+
+# open_receivables() 정렬 (화면 선택값 → ORDER BY, 정해진 값만 허용)
+DUE_ORDERS = {
+    "due": "due_date ASC, amount DESC",
+    "amount": "amount DESC, due_date ASC",
+    "site": "site ASC, due_date ASC",
+}
+
+_NON_DIGITS = re.compile(r"\D")
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_PAGE_ID = re.compile(r"([0-9a-f]{32})(?:[?#].*)?$")
+
+COLUMNS = (
+    "page_id", "site", "work", "payment_type", "amount", "due_date",
+    "location", "received", "created_time", "last_edited_time",
+)
+
+
+class LocalStore:
+    """
+    Notion DB를 페이지 단위로 복사해 두는 로컬 저장소
+
+    - upsert(): 동기화로 받은 행 저장 (page_id 기준 덮어쓰기)
+    - delete_missing(): 전체 동기화 때 Notion에서 사라진 페이지 정리
+    - add_pending()/confirm()/discard(): 앱에서 저장한 기록을 Notion 전송 전부터 바로 반영
+    - get_state()/set_state(): 동기화 체크포인트 (마지막 last_edited_time 등)
+    - open_receivables(): 예정일 범위의 안 받은 돈을 한 페이지씩 (정렬/필터는 SQL에서)
+    - iter_rows(): 내보내기용으로 전체 기록을 chunk 단위로
+    - revision(): 기록이 바뀔 때마다 1씩 오르는 번호 (분석용 스냅샷이 최신인지 확인)
+    DB를 열 수 없는 환경에서는 빈 저장소처럼 동작한다.
+    """
+
+    def __init__(self, path=None, label="로컬 기록 저장소"):
+        self.path = path or os.path.join(CACHE_DIR, "local_store.sqlite3")
+        self.label = label
+        self._lock = threading.Lock()
+        self._conn = None
+        self._opened = False
+
+    def _connect(self):
+        """처음 쓸 때 DB 열기 (import만으로는 파일을 만들지 않음)"""
+        if self._opened:
+            return self._conn
+        with self._lock:
+            if self._opened:
+                return self._conn
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS records (
+                        page_id TEXT PRIMARY KEY,
+                        site TEXT NOT NULL DEFAULT '',
+                        work TEXT NOT NULL DEFAULT '',
+                        payment_type TEXT NOT NULL DEFAULT '',
+                        amount INTEGER NOT NULL DEFAULT 0,
+                        due_date TEXT,
+                        location TEXT NOT NULL DEFAULT '',
+                        received INTEGER NOT NULL DEFAULT 0,
+                        created_time TEXT,
+                        last_edited_time TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_records_due ON records(due_date)")
+                conn.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT)")
+                self._conn = conn
+            except Exception as e:
+                print(f"{self.label} 비활성화: {e}")
+            self._opened = True
+        return self._conn
+
+    @property
+    def enabled(self):
+        return self._connect() is not None
+
+    def upsert(self, rows):
+        """dict 행 목록 저장 (한 트랜잭션)"""
+        if not rows or not self._connect():
+            return 0
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        values = [tuple(row.get(column) for column in COLUMNS) for row in rows]
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO records ({', '.join(COLUMNS)}) VALUES ({placeholders})", values
+                )
+                self._bump()
+        return len(values)
+
+    def delete_missing(self, page_ids):
+        """page_ids에 없는 행 삭제 (전체 동기화 후, 전송 대기 중인 local- 행은 남김) → 지운 수"""
+        if not self._connect():
+            return 0
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (page_id TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM seen")
+                self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((p,) for p in page_ids))
+                removed = self._conn.execute(
+                    "DELETE FROM records WHERE page_id NOT IN (SELECT page_id FROM seen) AND page_id NOT LIKE ?",
+                    (LOCAL_PREFIX + "%",),
+                ).rowcount
+                if removed:
+                    self._bump()
+        return removed
+
+    def add_pending(self, key, record):
+        """저장 요청한 기록을 임시 page_id(local-키)로 바로 넣어 둠"""
+        row = row_from_record(record, LOCAL_PREFIX + key)
+        return self.upsert([row])
+
+    def confirm(self, key, page_url):
+        """Notion 전송 완료 → 임시 행을 실제 page_id로 (동기화가 먼저 가져왔으면 임시 행만 삭제)"""
+        page_id = page_id_from_url(page_url)
+        if not page_id or not self._connect():
+            return
+        local_id = LOCAL_PREFIX + key
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                exists = self._conn.execute("SELECT 1 FROM records WHERE page_id = ?", (page_id,)).fetchone()
+                if exists:
+                    self._conn.execute("DELETE FROM records WHERE page_id = ?", (local_id,))
+                else:
+                    self._conn.execute("UPDATE records SET page_id = ? WHERE page_id = ?", (page_id, local_id))
+                self._bump()
+
+    def discard(self, key):
+        """Notion이 거절한 기록의 임시 행 삭제"""
+        if self._connect():
+            with self._lock:
+                with self._conn:
+                    self._conn.execute("BEGIN")
+                    self._conn.execute("DELETE FROM records WHERE page_id = ?", (LOCAL_PREFIX + key,))
+                    self._bump()
+
+    def _bump(self):
+        """revision + 1 (쓰기 트랜잭션 안에서 호출)"""
+        self._conn.execute(
+            "INSERT INTO sync_state (key, value) VALUES ('revision', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    def revision(self):
+        return int(self.get_state("revision", 0) or 0)
+
+    def get_state(self, key, default=None):
+        if not self._connect():
+            return default
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, **values):
+        if not self._connect():
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                [(key, None if value is None else str(value)) for key, value in values.items()],
+            )
+
+    def count(self):
+        if not self._connect():
+            return 0
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def open_receivables(self, start, end, sites=(), payment_types=(), order="due", limit=20, offset=0):
+        """
+        예정일이 start~end(YYYY-MM-DD)인 안 받은 수입 → (이번 페이지 행 목록, 조건에 맞는 전체 건수)
+
+        due_date 인덱스로 범위만 읽고 정렬/필터/페이지 자르기를 SQLite에서 하므로
+        전체 기록 수와 상관없이 화면에 보일 limit건만 넘어온다.
+        행: (page_id, site, payment_type, amount, due_date). 알 수 없는 거래 유형은 '기타'.
+        """
+        if not self._connect():
+            return [], 0
+        payment_type = (
+            f"CASE WHEN payment_type IN ({', '.join('?' for _ in INCOME_TYPES)}) THEN payment_type ELSE '기타' END"
+        )
+        where = [
+            "due_date BETWEEN ? AND ?",
+            "received = 0",
+            f"payment_type NOT IN ({', '.join('?' for _ in EXPENSE_TYPES)})",
+        ]
+        params = [str(start), str(end), *EXPENSE_TYPES]
+        if sites:
+            where.append(f"site IN ({', '.join('?' for _ in sites)})")
+            params.extend(sites)
+        if payment_types:
+            where.append(f"{payment_type} IN ({', '.join('?' for _ in payment_types)})")
+            params.extend((*INCOME_TYPES, *payment_types))
+        condition = " AND ".join(where)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM records WHERE {condition}", params).fetchone()[0]
+            rows = self._conn.execute(
+                f"SELECT page_id, site, {payment_type}, amount, due_date FROM records WHERE {condition} "
+                f"ORDER BY {DUE_ORDERS[order]}, page_id LIMIT ? OFFSET ?",
+                [*INCOME_TYPES, *params, int(limit), int(offset)],
+            ).fetchall()
+        return rows, total
+
+    def open_receivable_sites(self, start, end):
+        """예정일이 start~end인 안 받은 수입이 있는 현장 목록 (필터 선택지)"""
+        if not self._connect():
+            return []
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                f"SELECT DISTINCT site FROM records WHERE due_date BETWEEN ? AND ? AND received = 0 "
+                f"AND payment_type NOT IN ({', '.join('?' for _ in EXPENSE_TYPES)}) ORDER BY site",
+                (str(start), str(end), *EXPENSE_TYPES),
+            )]
+
+    def iter_rows(self, columns=COLUMNS, order_by="site, due_date", chunk_size=5000):
+        """
+        전체 기록을 chunk_size행씩 (튜플 목록) 내보냄 — 내보내기용
+
+        별도 읽기 전용 연결의 한 트랜잭션에서 읽으므로 중간에 동기화가 들어와도 한 시점 기준으로 일관되고,
+        WAL이라 그동안 다른 세션의 저장/동기화를 막지 않는다. 메모리에는 한 chunk만 올라온다.
+        """
+        if not self._connect():
+            return
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            conn.execute("BEGIN")
+            cursor = conn.execute(f"SELECT {', '.join(columns)} FROM records ORDER BY {order_by}")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    def read_frame(self, columns=COLUMNS):
+        """전체 기록 → pandas DataFrame (없으면 빈 DataFrame)"""
+        import pandas as pd
+
+        if not self._connect():
+            return pd.DataFrame(columns=columns)
+        with self._lock:
+            return pd.read_sql_query(f"SELECT {', '.join(columns)} FROM records", self._conn)
+
+
+def parse_amount(value):
+    """'5,000,000원' / 5000000 → 5000000 (못 읽으면 0)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = _NON_DIGITS.sub("", str(value or ""))
+    return int(digits) if digits else 0
+
+
+def row_from_record(record, page_id):
+    """normalize_data() 결과 → 저장소 행"""
+    when = (record.get("when") or "").strip()
+    return {
+        "page_id": page_id,
+        "site": (record.get("who") or record.get("where") or "").strip(),
+        "work": record.get("what") or "",
+        "payment_type": record.get("why") or "기타",
+        "amount": parse_amount(record.get("original_amount") or record.get("how")),
+        "due_date": when[:10] if _ISO_DATE.match(when) else None,
+        "location": record.get("where") or "",
+        "received": 0,
+        "created_time": datetime.now(timezone.utc).isoformat(),
+        "last_edited_time": None,
+    }
+
+
+def page_id_from_url(page_url):
+    """Notion 페이지 URL(또는 id) → 하이픈 있는 page id"""
+    compact = (page_url or "").strip().lower()
+    if re.fullmatch(r"[0-9a-f-]{36}", compact):
+        compact = compact.replace("-", "")
+    match = _PAGE_ID.search(compact)
+    return str(uuid.UUID(match.group(1))) if match else None
+
+
+# 앱 전체에서 공유하는 저장소
+local_store = LocalStore()
@@ -1,75 +1,136 @@
-import os
+import time
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+
+from services.config import get_settings, cache_resource
+from services.notion_schema import get_payload_builder, invalidate_schema, title_text, TEXT_TYPES
+
+NOTION_VERSION = "2022-06-28"
+NOTION_API = "https://api.notion.com/v1"
+
+# HTTP 세션 (연결 재사용 + 타임아웃 + 재시도)
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 20
+POOL_SIZE = 10
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5         # 재시도 대기: BACKOFF_BASE × 2^시도 안에서 무작위 (full jitter)
+BACKOFF_MAX = 8.0
+RETRY_AFTER_MAX = 30.0     # Retry-After를 이보다 길게 주면 잘라서 대기
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PATCH", "DELETE"}
+
+def _headers():
+    """Notion API 헤더 (설정은 처음 호출 때 한 번만 읽음)"""
+    return {
+        "Authorization": f"Bearer {get_settings().notion_api_key}",
+        "Content-Type": "application/json",
+        "Notion-Version": NOTION_VERSION,
+    }
+
+@cache_resource
+def get_notion_session():
+    """Notion API용 공유 requests.Session (keep-alive 연결 풀, 세션 간 공유)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+    session.mount("https://", adapter)
+    return session
+
+def notion_request(method, path, idempotent=None, **kwargs) -> requests.Response:
+    """
+    Notion API 호출 (공유 세션 + 연결/읽기 타임아웃 + 재시도)
+
+    - 429는 Retry-After만큼, 5xx·연결 오류는 지수 백오프(full jitter)로 기다렸다 다시 보낸다.
+    - 페이지 생성처럼 멱등이 아닌 요청은 서버가 받지 않은 게 확실한 경우(429, 연결 타임아웃)만 재시도해
+      같은 페이지가 두 번 생기지 않게 한다. 조회용 POST(databases/query)는 idempotent=True로 호출.
+    - 재시도를 다 써도 실패하면 마지막 응답을 반환하거나 requests 예외를 그대로 올린다.
+    """
+    method = method.upper()
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    url = f"{NOTION_API}/{path.lstrip('/')}"
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+
+    for attempt in range(MAX_RETRIES + 1):
+        last = attempt == MAX_RETRIES
+        try:
+            r = get_notion_session().request(method, url, headers=_headers(), **kwargs)
+        except requests.ConnectTimeout as e:
+            if last:
+                raise
+            delay, reason = _backoff(attempt), f"연결 타임아웃 ({e.__class__.__name__})"
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if last or not idempotent:
+                raise
+            delay, reason = _backoff(attempt), f"연결 오류 ({e.__class__.__name__})"
+        else:
+            if r.status_code not in RETRY_STATUS or last:
+                return r
+            if r.status_code == 429:
+                delay = _retry_after(r)
+                delay = _backoff(attempt) if delay is None else delay + random.uniform(0, BACKOFF_BASE)
+            elif idempotent:
+                delay = _backoff(attempt)
+            else:
+                return r
+            reason = f"HTTP {r.status_code}"
 
-# Streamlit Cloud 호환
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # Streamlit Cloud에서는 secrets 사용
-
-# 환경변수 가져오기 (Streamlit Cloud와 로컬 모두 지원)
-try:
-    import streamlit as st
-    NOTION_API_KEY = st.secrets.get("NOTION_API_KEY", os.getenv("NOTION_API_KEY"))
-    NOTION_DB_ID = st.secrets.get("NOTION_DB_ID", os.getenv("NOTION_DB_ID"))
-except:
-    NOTION_API_KEY = os.getenv("NOTION_API_KEY")
-    NOTION_DB_ID = os.getenv("NOTION_DB_ID")
-
-HEADERS = {
-    "Authorization": f"Bearer {NOTION_API_KEY}",
-    "Content-Type": "application/json",
-    "Notion-Version": "2022-06-28",
-}
-
-def _rt(text: str):
-    """Rich text 헬퍼"""
-    return {"rich_text": [{"text": {"content": text or ""}}]}
+        print(f"Notion {method} {path} 재시도 {attempt + 1}/{MAX_RETRIES}: {reason}, {delay:.1f}초 대기")
+        time.sleep(delay)
+
+def _backoff(attempt):
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def _retry_after(response):
+    """Retry-After 헤더 (초 또는 HTTP 날짜) → 대기 초, 없으면 None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
 
 def ping_database() -> tuple[bool, str]:
-    """DB 연결/권한/ID 확인용"""
-    r = requests.get(f"https://api.notion.com/v1/databases/{NOTION_DB_ID}", headers=HEADERS)
-    if r.status_code >= 300:
-        return False, f"{r.status_code} {r.text}"
-    j = r.json()
-    title = "".join([t.get("plain_text","") for t in j.get("title",[])]) or "(제목 없음)"
-    return True, f"OK: '{title}' (id={NOTION_DB_ID})"
+    """DB 연결/권한/ID 확인용 (받은 스키마는 저장용으로 캐시해 둠)"""
+    db_id = get_settings().notion_db_id
+    try:
+        status, result = get_payload_builder(force=True)
+    except requests.RequestException as e:
+        return False, f"Notion 연결 실패: {e}"
+    if status >= 300:
+        return False, f"{status} {result}"
+    return True, f"OK: '{result.schema.title}' (id={db_id})"
 
-def save_record(data: dict) -> tuple[int, str]:
+def save_record(data: dict, idempotency_key: str = None) -> tuple[int, str]:
     """
-    현재 DB 스키마(who title / what rich_text / when date / where rich_text / why rich_text / how rich_text)에 맞춰 저장.
+    DB 스키마(캐시)에 맞춰 저장: 필드별로 실제 속성 이름/타입을 찾아 넣고, DB에 없는 필드는 뺀다.
+    (영문 who/what/... 스키마와 한글 발주처(Who)/... 스키마 모두 지원)
+    NOTION_IDEMPOTENCY_PROPERTY가 설정돼 있으면 그 rich_text 속성에 멱등 키도 기록 (find_page로 중복 확인용).
     성공: (HTTP 2xx, page_url) / 실패: (status, error_text)
     """
-    if not NOTION_API_KEY or not NOTION_DB_ID:
+    settings = get_settings()
+    if not settings.notion_api_key or not settings.notion_db_id:
         return 500, "NOTION_API_KEY 또는 NOTION_DB_ID 미설정"
 
-    # 최소 타이틀 보장
-    who_text = (data.get("who") or "").strip() or (data.get("where") or "").strip() or "새 기록"
-
-    # 날짜: ISO(YYYY-MM-DD) 기대. 없으면 rich_text 대체 저장 가능하도록 처리
-    when_iso = (data.get("when") or "").strip()
-    when_prop = {"date": {"start": when_iso}} if when_iso else None
-
-    properties = {
-        # 🔸 who = title
-        "who": {"title": [{"text": {"content": who_text}}]},
-        # 🔸 what/where/why/how = rich_text
-        "what": _rt(data.get("what", "")),
-        "where": _rt(data.get("where", "")),
-        "why": _rt(data.get("why", "")),
-        "how": _rt(data.get("how", "")),
-    }
-    # 🔸 when = date (값이 없으면 아예 속성을 빼서 검증 에러 방지)
-    if when_prop:
-        properties["when"] = when_prop
-
-    payload = {
-        "parent": {"database_id": NOTION_DB_ID},
-        "properties": properties,
-    }
-
-    r = requests.post("https://api.notion.com/v1/pages", headers=HEADERS, json=payload)
+    try:
+        status, builder = get_payload_builder()
+        if status >= 300:
+            return status, f"Notion DB 스키마 조회 실패: {builder}"
+        payload = {
+            "parent": {"database_id": settings.notion_db_id},
+            "properties": builder(data, idempotency_key),
+        }
+        r = notion_request("POST", "pages", json=payload)
+    except requests.RequestException as e:
+        return 503, f"Notion 연결 실패: {e}"
 
     # 응답 처리
     try:
@@ -80,5 +141,60 @@ def save_record(data: dict) -> tuple[int, str]:
     if 200 <= r.status_code < 300:
         return r.status_code, j.get("url") or j.get("id") or str(j)
 
+    if r.status_code == 400 and j.get("code") == "validation_error":
+        # 캐시 이후 DB 속성이 바뀐 경우 → 다음 저장 때 스키마 다시 조회
+        invalidate_schema()
+
     # 실패면 Notion 메시지 노출
     return r.status_code, j.get("message") or j.get("details") or str(j)
+
+def find_page(data: dict, idempotency_key: str = None, created_after: float = None, claimed=None):
+    """
+    이미 만들어진 페이지 찾기 (결과를 모르는 전송을 다시 보내기 전 중복 확인용) → page_url 또는 None
+
+    멱등 키 속성이 있으면 그 값으로 정확히 찾고, 없으면 created_after 이후 생성된 페이지 중
+    타이틀과 what/where/how 내용(텍스트 속성만)이 같은 것을 같은 기록으로 본다.
+    이때 claimed(page_url)가 참인 페이지(다른 기록이 이미 자기 것으로 확인한 페이지)는 건너뛰어
+    내용이 똑같은 두 저장이 한 페이지로 합쳐지지 않게 한다. 네트워크 오류는 예외로 올린다.
+    """
+    settings = get_settings()
+    status, builder = get_payload_builder()
+    if status >= 300:
+        raise requests.HTTPError(f"{status} {builder}")
+    prop = builder.idempotency_property
+    if prop and idempotency_key:
+        query = {"filter": {"property": prop, "rich_text": {"equals": idempotency_key}}}
+    else:
+        # who가 title이 아닌 텍스트 속성에 매핑될 수도 있음 → 항상 DB의 타이틀 속성으로 찾음 (값은 title_text)
+        conditions = [{"property": builder.schema.title_property, "title": {"equals": title_text(data)}}]
+        if created_after:
+            # 서버 시계 차이를 감안해 1분 여유
+            since = datetime.fromtimestamp(created_after - 60, tz=timezone.utc).isoformat()
+            conditions.append({"timestamp": "created_time", "created_time": {"on_or_after": since}})
+        query = {"filter": {"and": conditions}}
+
+    r = notion_request("POST", f"databases/{settings.notion_db_id}/query", idempotent=True, json=query)
+    if r.status_code >= 300:
+        raise requests.HTTPError(f"{r.status_code} {r.text}", response=r)
+
+    compared = [f for f in ("what", "where", "how") if builder.types.get(f) in TEXT_TYPES]
+    for page in r.json().get("results", []):
+        properties = page.get("properties", {})
+        if not (prop and idempotency_key):
+            same = all(
+                _plain_text(properties.get(builder.names[name])) == (data.get(name) or "")
+                for name in compared
+            )
+            if not same:
+                continue
+            if claimed and claimed(page.get("url") or page.get("id")):
+                continue
+        return page.get("url") or page.get("id")
+    return None
+
+def _plain_text(prop) -> str:
+    """rich_text/title 속성 → 평문"""
+    if not prop:
+        return ""
+    parts = prop.get("rich_text") or prop.get("title") or []
+    return "".join(p.get("plain_text") or p.get("text", {}).get("content", "") for p in parts)
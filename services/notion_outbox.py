@@ -0,0 +1,186 @@
+# services/notion_outbox.py - Notion 저장 outbox (SQLite WAL, 재시작/장애에도 기록 보존)
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.analysis_cache import CACHE_DIR
+
+RETRY_BASE_DELAY = 5.0         # 재전송 간격: 5초 → 10초 → ... 최대 10분
+RETRY_MAX_DELAY = 600.0
+SENT_RETENTION = 30 * 24 * 3600
+
+# 상태
+PENDING = "pending"     # 보내야 함
+SENDING = "sending"     # 보내는 중 (이 상태로 남아 있으면 프로세스가 도중에 죽은 것 → 확인 후 재전송)
+SENT = "sent"
+FAILED = "failed"       # 4xx 등 다시 보내도 안 되는 실패
+
+
+def new_idempotency_key():
+    return uuid.uuid4().hex
+
+
+class NotionOutbox:
+    """
+    Notion 저장 대기열을 디스크에 두는 outbox
+
+    - enqueue(): 기록을 멱등 키와 함께 로컬에 먼저 저장 (같은 키는 한 번만 들어감)
+    - begin() → mark_sent() / mark_retry() / mark_failed(): 전송 단계마다 상태를 커밋해 두는 체크포인트
+    - due(): 지금 보낼 차례인 키 목록 (재시작 직후 SENDING으로 남은 것 포함)
+    - claimed_by(): 페이지가 이미 다른 키의 것인지 (결과 모르는 전송의 중복 확인용)
+    DB를 열 수 없는 환경에서는 enabled=False가 되고 호출 측이 바로 전송한다.
+    """
+
+    def __init__(self, path=None, label="Notion outbox"):
+        self.path = path or os.path.join(CACHE_DIR, "notion_outbox.sqlite3")
+        self.label = label
+        self._lock = threading.Lock()
+        self._conn = None
+        self._opened = False
+
+    def _connect(self):
+        """처음 쓸 때 DB 열기 (import만으로는 파일을 만들지 않음)"""
+        if self._opened:
+            return self._conn
+        with self._lock:
+            if self._opened:
+                return self._conn
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=FULL")   # 캐시와 달리 잃으면 안 되는 데이터
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        key TEXT PRIMARY KEY,
+                        record TEXT NOT NULL,
+                        label TEXT NOT NULL DEFAULT '',
+                        status TEXT NOT NULL,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        in_doubt INTEGER NOT NULL DEFAULT 0,
+                        next_attempt_at REAL NOT NULL,
+                        attempt_started_at REAL,
+                        page_url TEXT,
+                        last_error TEXT,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_page ON outbox(page_url)")
+                self._conn = conn
+            except Exception as e:
+                print(f"{self.label} 비활성화: {e}")
+            self._opened = True
+        return self._conn
+
+    @property
+    def enabled(self):
+        return self._connect() is not None
+
+    def enqueue(self, record, key=None, label=""):
+        """기록을 outbox에 넣고 멱등 키 반환 (이미 있는 키면 그대로 두고 같은 키 반환)"""
+        key = key or new_idempotency_key()
+        now = time.time()
+        payload = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, record, label, status, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, payload, label, PENDING, now, now, now),
+            )
+        return key
+
+    def get(self, key):
+        """키에 해당하는 행 dict (없으면 None)"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT * FROM outbox WHERE key = ?", (key,))
+            row = cursor.fetchone()
+            columns = [c[0] for c in cursor.description]
+        if row is None:
+            return None
+        entry = dict(zip(columns, row))
+        entry["record"] = json.loads(entry["record"])
+        return entry
+
+    def due(self, now=None, limit=100):
+        """지금 보낼 차례인 (키, 라벨) 목록 (오래된 순)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, label FROM outbox WHERE status IN (?, ?) AND next_attempt_at <= ? "
+                "ORDER BY created_at LIMIT ?",
+                (PENDING, SENDING, now, limit),
+            ).fetchall()
+
+    def begin(self, key):
+        """
+        전송 직전 체크포인트: SENDING + 시도 횟수 증가를 먼저 커밋
+        → 이전 시도가 결과를 모른 채 끝났는지(in_doubt) 반환
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT status, in_doubt FROM outbox WHERE key = ?", (key,)).fetchone()
+            # 이전 프로세스가 SENDING 도중 죽었으면 Notion에 이미 만들어졌을 수 있음
+            in_doubt = bool(row and (row[0] == SENDING or row[1]))
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, attempt_started_at = ?, updated_at = ? "
+                "WHERE key = ?",
+                (SENDING, now, now, key),
+            )
+        return in_doubt
+
+    def claimed_by(self, page_url, key=None):
+        """page_url을 이미 자기 페이지로 기록한 다른 키 (없으면 None) — 같은 내용 기록끼리 페이지를 나눠 갖지 않게"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT key FROM outbox WHERE page_url = ? AND key != ? LIMIT 1", (page_url, key or "")
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_sent(self, key, page_url):
+        self._update(key, status=SENT, page_url=page_url, in_doubt=0, last_error=None)
+
+    def mark_failed(self, key, error):
+        self._update(key, status=FAILED, last_error=error, in_doubt=0)
+
+    def mark_retry(self, key, error, in_doubt):
+        """나중에 다시 보냄. in_doubt=True면 다음 시도 전에 Notion에 이미 생겼는지 먼저 확인"""
+        with self._lock:
+            attempts = self._conn.execute("SELECT attempts FROM outbox WHERE key = ?", (key,)).fetchone()[0]
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** max(0, attempts - 1))
+        self._update(
+            key, status=PENDING, last_error=error, in_doubt=int(in_doubt),
+            next_attempt_at=time.time() + delay,
+        )
+
+    def _update(self, key, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE outbox SET {assignments} WHERE key = ?", (*fields.values(), key))
+
+    def prune(self, retention=SENT_RETENTION):
+        """보낸 지 오래된 행 정리"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status = ? AND updated_at < ?", (SENT, time.time() - retention)
+            )
+
+    def stats(self):
+        """상태별 행 수 (pending/sending/sent/failed)"""
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        if self._connect():
+            with self._lock:
+                for status, count in self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+                    counts[status] = count
+        return counts
+
+
+# 앱 전체에서 공유하는 outbox
+notion_outbox = NotionOutbox()
@@ -0,0 +1,206 @@
+# services/notion_schema.py - Notion DB 스키마 조회(캐시)와 스키마에 맞춘 저장 payload 생성
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from services.config import get_settings
+
+SCHEMA_TTL = 600   # 스키마 재조회 간격(초). 저장이 validation 오류로 실패하면 바로 다시 조회
+
+# 정규화 필드(normalize_data) → Notion 속성 이름 후보 (notion.py는 영문, polygon.py는 한글 스키마)
+FIELD_PROPERTIES = {
+    "who": ("who", "발주처(Who)"),
+    "what": ("what", "금액(What)"),
+    "when": ("when", "날짜(When)"),
+    "where": ("where", "현장(Where)"),
+    "why": ("why", "목적(Why)"),
+    "how": ("how", "결제방법(How)"),
+}
+
+TEXT_TYPES = ("title", "rich_text")
+
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_NON_DIGITS = re.compile(r"\D")
+
+
+def title_text(data: dict) -> str:
+    """최소 타이틀 보장"""
+    return (data.get("who") or "").strip() or (data.get("where") or "").strip() or "새 기록"
+
+
+@dataclass(frozen=True)
+class DatabaseSchema:
+    """databases/{id} 응답에서 필요한 부분만"""
+    db_id: str
+    title: str
+    properties: dict   # 속성 이름 → 타입 (title, rich_text, date, number, select, ...)
+    fetched_at: float
+
+    @classmethod
+    def from_response(cls, db_id, body):
+        return cls(
+            db_id=db_id,
+            title="".join(t.get("plain_text", "") for t in body.get("title", [])) or "(제목 없음)",
+            properties={name: prop.get("type") for name, prop in body.get("properties", {}).items()},
+            fetched_at=time.time(),
+        )
+
+    @property
+    def title_property(self):
+        return next((name for name, kind in self.properties.items() if kind == "title"), None)
+
+    def resolve(self, field):
+        """정규화 필드 → 이 DB의 속성 이름 (후보 중 있는 것, 대소문자 무시) 또는 None"""
+        lowered = {name.lower(): name for name in self.properties}
+        for candidate in FIELD_PROPERTIES[field]:
+            if candidate.lower() in lowered:
+                return lowered[candidate.lower()]
+        return None
+
+
+# ----- 속성 타입별 값 변환 (None이면 그 속성은 보내지 않음) -----
+
+def _title(value):
+    return {"title": [{"text": {"content": value}}]}
+
+
+def _rich_text(value):
+    return {"rich_text": [{"text": {"content": value}}]}
+
+
+def _date(value):
+    return {"date": {"start": value[:10]}} if _ISO_DATE.match(value) else None
+
+
+def _number(value):
+    digits = _NON_DIGITS.sub("", value)
+    return {"number": int(digits)} if digits else None
+
+
+def _select(value):
+    # 선택지 이름에는 쉼표를 쓸 수 없음
+    return {"select": {"name": value.replace(",", " ")}} if value else None
+
+
+def _multi_select(value):
+    return {"multi_select": [{"name": value.replace(",", " ")}]} if value else None
+
+
+def _plain(kind):
+    return lambda value: {kind: value} if value else None
+
+
+CONVERTERS = {
+    "title": _title,
+    "rich_text": _rich_text,
+    "date": _date,
+    "number": _number,
+    "select": _select,
+    "status": lambda value: {"status": {"name": value}} if value else None,
+    "multi_select": _multi_select,
+    "url": _plain("url"),
+    "email": _plain("email"),
+    "phone_number": _plain("phone_number"),
+}
+
+
+def _getter(field, kind):
+    """정규화 dict에서 field 값을 꺼내는 함수 (속성 타입에 맞춰 미리 정함)"""
+    if kind == "title":
+        return title_text
+    if field == "when" and kind != "date":
+        # 날짜 속성이 텍스트면 '다음주 수요일' 같은 원문도 그대로 저장
+        return lambda data: str(data.get("when_pretty") or data.get("when") or "").strip()
+    if field == "how" and kind == "number":
+        return lambda data: str(data.get("original_amount") or data.get("how") or "")
+    return lambda data: str(data.get(field) or "").strip()
+
+
+class PayloadBuilder:
+    """
+    스키마로 미리 만들어 둔 properties 생성기
+
+    builder(data, idempotency_key) → pages API의 properties dict.
+    어떤 필드를 어느 속성에 어떤 타입으로 넣을지는 컴파일할 때 한 번만 정하고,
+    DB에 없거나 지원하지 않는 타입의 필드는 보내지 않는다 (저장 실패 왕복 방지).
+    타이틀 속성에는 항상 title_text(data)가 들어간다.
+    """
+
+    def __init__(self, schema, idempotency_property=None):
+        self.schema = schema
+        self.names = {}   # 필드 → 실제 속성 이름
+        self.types = {}   # 필드 → 속성 타입
+        self._steps = []
+        for field in FIELD_PROPERTIES:
+            name = schema.resolve(field)
+            if name is None and field == "who":
+                name = schema.title_property
+            if name is None:
+                print(f"Notion DB에 '{field}' 속성이 없어 저장에서 제외")
+                continue
+            kind = schema.properties[name]
+            convert = CONVERTERS.get(kind)
+            if convert is None:
+                print(f"Notion 속성 '{name}'({kind}) 타입은 지원하지 않아 저장에서 제외")
+                continue
+            self.names[field] = name
+            self.types[field] = kind
+            self._steps.append((name, _getter(field, kind), convert))
+
+        # 타이틀 속성은 어떤 필드가 매핑됐든 항상 title_text (find_page가 이 값으로 찾음)
+        title = schema.title_property
+        if title and title not in self.names.values():
+            self._steps.append((title, title_text, _title))
+
+        self.idempotency_property = None
+        if idempotency_property:
+            if schema.properties.get(idempotency_property) == "rich_text":
+                self.idempotency_property = idempotency_property
+            else:
+                print(f"멱등 키 속성 '{idempotency_property}'이 rich_text로 없어 기록하지 않음")
+
+    def __call__(self, data, idempotency_key=None):
+        properties = {}
+        for name, get, convert in self._steps:
+            value = convert(get(data))
+            if value is not None:
+                properties[name] = value
+        if idempotency_key and self.idempotency_property:
+            properties[self.idempotency_property] = _rich_text(idempotency_key)
+        return properties
+
+
+# DB id → (스키마, 빌더). 프로세스 전체에서 공유
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_payload_builder(force=False):
+    """
+    현재 DB 스키마로 만든 PayloadBuilder (SCHEMA_TTL 동안 재사용)
+
+    성공: (200, PayloadBuilder) / 실패: (status, error_text). 네트워크 오류는 requests 예외로 올린다.
+    """
+    from services.notion import notion_request
+
+    settings = get_settings()
+    db_id = settings.notion_db_id
+    with _lock:
+        cached = _cache.get(db_id)
+    if cached and not force and time.time() - cached.schema.fetched_at < SCHEMA_TTL:
+        return 200, cached
+
+    r = notion_request("GET", f"databases/{db_id}")
+    if r.status_code >= 300:
+        return r.status_code, r.text
+    builder = PayloadBuilder(DatabaseSchema.from_response(db_id, r.json()), settings.notion_idempotency_property)
+    with _lock:
+        _cache[db_id] = builder
+    return 200, builder
+
+
+def invalidate_schema():
+    """스키마가 바뀐 것 같을 때(저장 validation 오류) 다음 호출에서 다시 조회"""
+    with _lock:
+        _cache.clear()
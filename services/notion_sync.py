@@ -0,0 +1,183 @@
+# services/notion_sync.py - Notion DB → 로컬 저장소 증분 동기화
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from services.config import get_settings
+from services.local_store import local_store, parse_amount
+from services.notion_schema import FIELD_PROPERTIES as NOTION_FIELDS
+
+PAGE_SIZE = 100                 # databases/query 최대 페이지 크기
+EDIT_OVERLAP = timedelta(minutes=2)   # last_edited_time은 분 단위라 체크포인트보다 조금 앞부터 다시 받음
+FULL_SYNC_INTERVAL = 24 * 3600  # 삭제된 페이지 정리용 전체 동기화 주기
+AUTO_SYNC_INTERVAL = 60         # 화면에서 자동 동기화를 다시 시도하는 최소 간격(초)
+
+# 저장소 컬럼 → Notion 속성 이름 후보 (저장 때 쓰는 notion_schema.FIELD_PROPERTIES와 같은 이름)
+FIELD_PROPERTIES = {
+    "site": NOTION_FIELDS["who"],
+    "work": NOTION_FIELDS["what"],
+    "due_date": NOTION_FIELDS["when"],
+    "location": NOTION_FIELDS["where"],
+    "payment_type": NOTION_FIELDS["why"],
+    "amount": NOTION_FIELDS["how"],
+    "received": ("received", "입금완료", "받음"),
+}
+
+
+@dataclass(frozen=True)
+class SyncResult:
+    """동기화 한 번의 결과"""
+    ok: bool
+    mode: str = "incremental"   # full / incremental
+    pages: int = 0              # 받은 페이지(API 응답) 수
+    upserted: int = 0
+    removed: int = 0
+    elapsed: float = 0.0
+    error: str = ""
+
+
+def sync_database(full=False, store=None):
+    """
+    databases/{id}/query를 페이지 단위로 받아 로컬 저장소에 upsert
+
+    - 현재 페이지를 저장하는 동안 다음 커서를 미리 요청 (네트워크와 저장이 겹침)
+    - 처음(또는 full=True, FULL_SYNC_INTERVAL 경과)에는 전체, 이후에는 last_edited_time 체크포인트 이후만
+    - last_edited_time 오름차순으로 받으므로 페이지마다 체크포인트를 커밋해 중간에 끊겨도 이어서 받는다
+    """
+    store = store or local_store
+    settings = get_settings()
+    if not settings.notion_api_key or not settings.notion_db_id:
+        return SyncResult(ok=False, error="NOTION_API_KEY 또는 NOTION_DB_ID 미설정")
+    if not store.enabled:
+        return SyncResult(ok=False, error="로컬 저장소를 열 수 없습니다.")
+
+    started = time.perf_counter()
+    watermark = store.get_state("last_edited_time")
+    last_full = float(store.get_state("last_full_sync_at", 0) or 0)
+    if not watermark or time.time() - last_full > FULL_SYNC_INTERVAL:
+        full = True
+
+    body = {"page_size": PAGE_SIZE, "sorts": [{"timestamp": "last_edited_time", "direction": "ascending"}]}
+    if not full:
+        since = datetime.fromisoformat(watermark.replace("Z", "+00:00")) - EDIT_OVERLAP
+        body["filter"] = {"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since.isoformat()}}
+
+    pages = upserted = 0
+    seen = set()
+    try:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="notion-sync") as pool:
+            future = pool.submit(_query, settings.notion_db_id, body, None)
+            while future is not None:
+                response = future.result()
+                cursor = response.get("next_cursor") if response.get("has_more") else None
+                # 다음 페이지를 받는 동안 이번 페이지 저장
+                future = pool.submit(_query, settings.notion_db_id, body, cursor) if cursor else None
+
+                results = response.get("results", [])
+                rows = [page_to_row(page) for page in results]
+                upserted += store.upsert(rows)
+                seen.update(row["page_id"] for row in rows)
+                pages += 1
+                if rows:
+                    store.set_state(last_edited_time=max(row["last_edited_time"] for row in rows))
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        print(f"Notion 동기화 실패 ({pages}페이지 받은 뒤, {elapsed:.2f}초): {e}")
+        return SyncResult(ok=False, mode="full" if full else "incremental", pages=pages,
+                          upserted=upserted, elapsed=elapsed, error=str(e))
+
+    removed = 0
+    if full:
+        removed = store.delete_missing(seen)
+        store.set_state(last_full_sync_at=time.time())
+    store.set_state(last_sync_at=time.time())
+
+    elapsed = time.perf_counter() - started
+    mode = "full" if full else "incremental"
+    print(f"Notion 동기화 완료 ({mode}, {pages}페이지, {upserted}건 갱신, {removed}건 삭제, {elapsed:.2f}초)")
+    return SyncResult(ok=True, mode=mode, pages=pages, upserted=upserted, removed=removed, elapsed=elapsed)
+
+
+def _query(db_id, body, cursor):
+    """databases/{id}/query 한 페이지 (조회라 재시도 가능)"""
+    from services.notion import notion_request
+
+    payload = dict(body, start_cursor=cursor) if cursor else body
+    r = notion_request("POST", f"databases/{db_id}/query", idempotent=True, json=payload)
+    if r.status_code >= 300:
+        raise RuntimeError(f"{r.status_code} {r.text[:200]}")
+    return r.json()
+
+
+def page_to_row(page):
+    """Notion 페이지 → 로컬 저장소 행"""
+    properties = page.get("properties", {})
+
+    def field(name):
+        for prop_name in FIELD_PROPERTIES[name]:
+            if prop_name in properties:
+                return property_value(properties[prop_name])
+        return None
+
+    due = field("due_date")
+    return {
+        "page_id": page["id"],
+        "site": field("site") or field("location") or "",
+        "work": field("work") or "",
+        "payment_type": field("payment_type") or "기타",
+        "amount": parse_amount(field("amount")),
+        "due_date": due[:10] if isinstance(due, str) and due else None,
+        "location": field("location") or "",
+        "received": int(bool(field("received"))),
+        "created_time": page.get("created_time"),
+        "last_edited_time": page.get("last_edited_time"),
+    }
+
+
+def property_value(prop):
+    """Notion 속성 → 파이썬 값 (텍스트/숫자/날짜 시작일/체크박스/선택지 이름)"""
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(p.get("plain_text") or p.get("text", {}).get("content", "") for p in value or [])
+    if kind == "date":
+        return (value or {}).get("start")
+    if kind in ("select", "status"):
+        return (value or {}).get("name")
+    if kind in ("number", "checkbox", "url", "email", "phone_number"):
+        return value
+    if kind == "formula":
+        return (value or {}).get((value or {}).get("type"))
+    return None
+
+
+# 화면에서 쓰는 백그라운드 동기화 (한 번에 하나만, AUTO_SYNC_INTERVAL 간격)
+_sync_lock = threading.Lock()
+_last_attempt = 0.0
+last_result = None
+
+
+def start_background_sync(force=False):
+    """동기화를 백그라운드 스레드로 시작 (이미 도는 중이거나 최근에 했으면 생략) → 시작 여부"""
+    global _last_attempt
+    if not force and time.time() - _last_attempt < AUTO_SYNC_INTERVAL:
+        return False
+    if not _sync_lock.acquire(blocking=False):
+        return False
+    _last_attempt = time.time()
+
+    def run():
+        global last_result
+        try:
+            last_result = sync_database()
+        finally:
+            _sync_lock.release()
+
+    threading.Thread(target=run, name="notion-sync", daemon=True).start()
+    return True
+
+
+def is_syncing():
+    return _sync_lock.locked()
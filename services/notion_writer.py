@@ -0,0 +1,287 @@
+# services/notion_writer.py - Notion 저장을 백그라운드 스레드에서 (초당 3건 토큰 버킷 + outbox 재전송)
+import itertools
+import queue
+import threading
+import time
+
+from services.config import cache_resource
+from services.notion_outbox import notion_outbox, SENT, FAILED
+from services.local_store import local_store
+
+NOTION_RATE = 3.0      # Notion 평균 허용 요청 수 (초당)
+NOTION_BURST = 3       # 한 번에 몰아 보낼 수 있는 요청 수
+QUEUE_MAX = 500
+REPLAY_INTERVAL = 5.0  # outbox에서 재전송할 기록을 찾는 간격(초)
+
+STORED = 0             # Notion에는 아직 못 보냈지만 outbox에 보관됨 (2xx가 아니므로 ok가 아님, stored로 확인)
+
+_ids = itertools.count(1)
+
+
+class TokenBucket:
+    """초당 rate개씩 채워지는 토큰 버킷 (capacity까지 모아 둘 수 있음)"""
+
+    def __init__(self, rate=NOTION_RATE, capacity=NOTION_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 하나를 쓸 수 있을 때까지 기다림"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SaveHandle:
+    """
+    저장 요청 하나의 상태 (queued → saving → done / stored / failed)
+    세션에 들고 있다가 done()으로 확인하고 result로 (status, msg)를 꺼낸다.
+    ok는 Notion에 저장된 경우만, stored는 outbox에만 보관돼 나중에 다시 보내는 경우.
+    """
+
+    def __init__(self, record, label="", meta=None, key=None):
+        self.id = next(_ids)
+        self.record = record
+        self.label = label
+        self.key = key             # outbox 멱등 키 (outbox를 안 쓰면 None)
+        self.meta = meta or {}     # 호출 측이 결과를 처리할 때 쓸 정보 (로그 action 등)
+        self.status = "queued"
+        self.result = None
+        self.submitted = time.time()
+        self.finished = None
+        self._event = threading.Event()
+
+    @property
+    def ok(self):
+        return self.result is not None and 200 <= self.result[0] < 300
+
+    @property
+    def stored(self):
+        """Notion 전송은 미뤄졌고 outbox가 나중에 다시 보냄"""
+        return self.result is not None and self.result[0] == STORED
+
+    def done(self):
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """끝날 때까지 기다렸다가 (status, msg) 반환 (시간 초과면 None)"""
+        self._event.wait(timeout)
+        return self.result
+
+    def _finish(self, status, msg):
+        self.result = (status, msg)
+        self.status = "done" if self.ok else "stored" if self.stored else "failed"
+        self.finished = time.time()
+        self._event.set()
+
+
+class NotionWriter:
+    """
+    write-behind 저장기: submit()은 기록을 outbox(디스크)에 먼저 넣고 바로 돌아오고,
+    백그라운드 스레드 하나가 토큰 버킷 속도로 Notion을 호출한다 (find/save 요청마다 토큰 하나).
+
+    Notion이 느리거나 죽어 있으면 기록은 outbox에 남고 REPLAY_INTERVAL마다 다시 보낸다.
+    local이 있으면 저장 요청 즉시 로컬 저장소에도 넣어 대시보드에 바로 보이게 한다.
+    결과를 모르는 채 끝난 전송(타임아웃, 5xx, 전송 중 프로세스 종료)은 다시 보내기 전에
+    find로 이미 만들어졌는지 확인하므로 같은 기록이 두 페이지가 되지 않는다.
+    """
+
+    def __init__(self, save=None, find=None, outbox=None, local=None,
+                 rate=NOTION_RATE, burst=NOTION_BURST, maxsize=QUEUE_MAX):
+        self._save = save
+        self._find = find
+        self._outbox = outbox
+        self._local = local
+        self._queue = queue.Queue(maxsize)
+        self._bucket = TokenBucket(rate, burst)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._inflight = set()      # 대기열에 들어가 있는 outbox 키 (중복 재전송 방지)
+        self.stats = {"submitted": 0, "done": 0, "failed": 0, "stored": 0, "replayed": 0}
+
+    @property
+    def outbox(self):
+        return self._outbox if self._outbox is not None and self._outbox.enabled else None
+
+    def submit(self, record, label="", meta=None, key=None):
+        """레코드를 outbox와 저장 대기열에 넣고 SaveHandle 반환 (key가 같으면 한 번만 저장)"""
+        handle = SaveHandle(dict(record), label, meta)
+        if self.outbox:
+            try:
+                handle.key = self.outbox.enqueue(handle.record, key, label)
+            except Exception as e:
+                print(f"outbox 기록 실패, 바로 전송: {e}")
+        if handle.key is not None and self._local is not None:
+            self._sync_local("add_pending", handle.key, handle.record)
+        self._ensure_thread()
+        self._put(handle)
+        self.stats["submitted"] += 1
+        return handle
+
+    def _put(self, handle):
+        if handle.key is not None:
+            with self._lock:
+                if handle.key in self._inflight:
+                    handle._finish(STORED, "같은 기록을 이미 보내는 중입니다.")
+                    return False
+                self._inflight.add(handle.key)
+        try:
+            self._queue.put_nowait(handle)
+            return True
+        except queue.Full:
+            if handle.key is not None:
+                self._inflight.discard(handle.key)
+                handle._finish(STORED, "저장 대기열이 가득 차 로컬에 보관했습니다. 자동으로 다시 보냅니다.")
+            else:
+                handle._finish(503, "저장 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.")
+            return False
+
+    def pending(self):
+        """아직 저장 안 된 요청 수"""
+        return self._queue.unfinished_tasks
+
+    def join(self):
+        """대기열이 빌 때까지 기다림 (스크립트/종료용)"""
+        self._queue.join()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="notion-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        if self._save is None or self._find is None:
+            from services.notion import save_record, find_page
+            self._save = self._save or save_record
+            self._find = self._find or find_page
+
+        # 이전 프로세스가 못 보낸 기록부터
+        if self.outbox:
+            self.outbox.prune()
+        self._replay_due()
+        next_replay = time.monotonic() + REPLAY_INTERVAL
+
+        while True:
+            # 재전송은 대기열이 쉬지 않고 차 있어도 REPLAY_INTERVAL마다 (get 시간 초과에만 기대지 않음)
+            now = time.monotonic()
+            if now >= next_replay:
+                self._replay_due()
+                next_replay = now + REPLAY_INTERVAL
+                continue
+            try:
+                handle = self._queue.get(timeout=next_replay - now)
+            except queue.Empty:
+                continue
+            try:
+                handle.status = "saving"
+                try:
+                    status, msg = self._deliver(handle)
+                except Exception as e:
+                    status, msg = 500, str(e)
+                handle._finish(status, msg)
+                self.stats["stored" if handle.stored else "done" if handle.ok else "failed"] += 1
+                if not handle.ok and not handle.stored:
+                    print(f"Notion 저장 실패 (#{handle.id} {handle.label}): {status} {msg}")
+            finally:
+                if handle.key is not None:
+                    with self._lock:
+                        self._inflight.discard(handle.key)
+                self._queue.task_done()
+
+    def _deliver(self, handle):
+        """
+        한 건 전송 (outbox 체크포인트 → 필요하면 중복 확인 → save → 결과 커밋)
+        토큰은 Notion 요청(find, save)마다 하나씩 쓴다.
+        """
+        key = handle.key
+        if key is None or not self.outbox:
+            self._bucket.acquire()
+            return self._save(handle.record)
+
+        outbox = self.outbox
+        entry = outbox.get(key)
+        if entry["status"] == SENT:
+            return 200, entry["page_url"]
+        if entry["status"] == FAILED:
+            return 400, entry["last_error"]
+
+        in_doubt = outbox.begin(key)
+        if in_doubt:
+            try:
+                self._bucket.acquire()
+                url = self._find(
+                    entry["record"], key, entry["attempt_started_at"] or entry["created_at"],
+                    claimed=lambda page_url: outbox.claimed_by(page_url, key) is not None,
+                )
+            except Exception as e:
+                outbox.mark_retry(key, f"중복 확인 실패: {e}", in_doubt=True)
+                return STORED, "Notion 연결 불가 — 로컬에 보관했다가 자동으로 다시 보냅니다."
+            if url:
+                print(f"이미 저장된 기록 확인 (#{handle.id} {handle.label}), 재전송 생략")
+                outbox.mark_sent(key, url)
+                self._sync_local("confirm", key, url)
+                return 200, url
+
+        self._bucket.acquire()
+        status, msg = self._save(entry["record"], key)
+        if 200 <= status < 300:
+            outbox.mark_sent(key, msg)
+            self._sync_local("confirm", key, msg)
+            return status, msg
+        if _permanent(status):
+            outbox.mark_failed(key, f"{status} {msg}")
+            self._sync_local("discard", key)
+            return status, msg
+
+        # 429는 Notion이 받지 않은 게 확실, 나머지는 만들어졌을 수도 있음
+        outbox.mark_retry(key, f"{status} {msg}", in_doubt=status != 429)
+        return STORED, f"Notion 응답 지연({status}) — 로컬에 보관했다가 자동으로 다시 보냅니다."
+
+    def _sync_local(self, method, *args):
+        """로컬 저장소 반영 (실패해도 Notion 저장 흐름은 계속)"""
+        if self._local is None:
+            return
+        try:
+            getattr(self._local, method)(*args)
+        except Exception as e:
+            print(f"로컬 저장소 반영 실패 ({method}): {e}")
+
+    def _replay_due(self):
+        """outbox에서 보낼 차례가 된 기록을 대기열에 다시 넣음"""
+        if not self.outbox:
+            return
+        try:
+            due = self.outbox.due()
+        except Exception as e:
+            print(f"outbox 조회 실패: {e}")
+            return
+        for key, label in due:
+            with self._lock:
+                if key in self._inflight:
+                    continue
+            entry = self.outbox.get(key)
+            if not self._put(SaveHandle(entry["record"], label, key=key)):
+                break
+            self.stats["replayed"] += 1
+
+
+def _permanent(status):
+    """다시 보내도 같은 결과인 실패 (요청 형식/권한 문제)"""
+    return 400 <= status < 500 and status not in (408, 409, 429)
+
+
+@cache_resource
+def get_notion_writer():
+    """프로세스 전체가 쓰는 저장기 하나 (Notion 속도 제한은 통합(키) 단위라서 세션 간 공유)"""
+    return NotionWriter(outbox=notion_outbox, local=local_store)
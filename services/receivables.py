@@ -0,0 +1,151 @@
+# services/receivables.py - 미수금/잔금 분석용 컬럼형 스냅샷과 집계 (반복문 없이 벡터 연산)
+import glob
+import os
+
+import pandas as pd
+
+from services.local_store import local_store, INCOME_TYPES, EXPENSE_TYPES
+
+PAYMENT_TYPE_DTYPE = pd.CategoricalDtype(categories=INCOME_TYPES + EXPENSE_TYPES)
+KIND_DTYPE = pd.CategoricalDtype(categories=("income", "expense"))
+
+SITE_COLUMNS = ["현장명", "계약금액", "받은금액", "잔금", "진행률"]
+UPCOMING_COLUMNS = ["현장", "구분", "금액", "예정일", "D-Day"]
+
+UPCOMING_PAGE_SIZE = 10
+UNASSIGNED_SITE = "현장 미지정"   # 현장명 없이 저장된 기록 묶음
+
+SOURCE_COLUMNS = ("page_id", "site", "payment_type", "amount", "due_date", "received", "created_time")
+
+
+def load_frame(store=None):
+    """
+    분석용 DataFrame (컬럼형 Parquet 스냅샷)
+
+    저장소 revision이 같으면 receivables.r{revision}.parquet를 바로 읽고,
+    바뀌었으면 SQLite에서 다시 만들어 스냅샷을 교체한다 (pyarrow 필요, 없으면 매번 SQLite에서 만든다).
+    """
+    store = store or local_store
+    revision = store.revision()
+    snapshot = _snapshot_path(store, revision)
+    if os.path.exists(snapshot):
+        try:
+            return pd.read_parquet(snapshot)
+        except (ImportError, OSError, ValueError) as e:   # pyarrow 없음 / 파일 문제 / 깨진 스냅샷
+            print(f"분석 스냅샷 읽기 실패, 다시 생성: {e}")
+
+    frame = build_frame(store)
+    _write_snapshot(frame, store, snapshot)
+    return frame
+
+
+def _snapshot_path(store, revision):
+    return os.path.join(os.path.dirname(store.path), f"receivables.r{revision}.parquet")
+
+
+def _write_snapshot(frame, store, snapshot):
+    """임시 파일에 쓰고 교체 (동시에 여러 세션이 만들어도 안전), 이전 스냅샷 정리"""
+    temp = f"{snapshot}.{os.getpid()}.{id(frame)}.tmp"
+    try:
+        frame.to_parquet(temp, index=False)
+        os.replace(temp, snapshot)
+    except (ImportError, OSError) as e:   # pyarrow 없음 / 디스크 문제
+        print(f"분석 스냅샷 저장 생략: {e}")
+        if os.path.exists(temp):
+            os.remove(temp)
+        return
+    for old in glob.glob(_snapshot_path(store, "*")):
+        if old != snapshot:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+
+def build_frame(store=None):
+    """
+    로컬 저장소 → 분석용 DataFrame
+
+    site/payment_type/kind는 category, amount는 int64(원), due_date/created_time은 datetime64,
+    received는 bool. 알 수 없는 거래 유형은 '기타'로 본다.
+    """
+    raw = (store or local_store).read_frame(SOURCE_COLUMNS)
+    payment_type = raw["payment_type"].where(raw["payment_type"].isin(PAYMENT_TYPE_DTYPE.categories), "기타")
+    frame = pd.DataFrame({
+        "page_id": raw["page_id"].astype("string"),
+        "site": raw["site"].fillna("").astype("category"),
+        "payment_type": payment_type.astype(PAYMENT_TYPE_DTYPE),
+        "amount": pd.to_numeric(raw["amount"], errors="coerce").fillna(0).astype("int64"),
+        "due_date": pd.to_datetime(raw["due_date"], errors="coerce", format="%Y-%m-%d"),
+        "received": raw["received"].fillna(0).astype(bool),
+        "created_time": pd.to_datetime(raw["created_time"], errors="coerce", utc=True, format="ISO8601"),
+    })
+    frame["kind"] = pd.Categorical.from_codes(
+        frame["payment_type"].isin(EXPENSE_TYPES).astype("int8"), dtype=KIND_DTYPE
+    )
+    return frame
+
+
+def month_frame(frame, today):
+    """예정일이 today와 같은 달인 행"""
+    due = frame["due_date"]
+    return frame[(due.dt.year == today.year) & (due.dt.month == today.month)]
+
+
+def summary_metrics(frame):
+    """현황 카드 값: 총 계약금액 / 받은 돈 / 받을 돈 / 지출 (원) + 수입 건수"""
+    income = frame["kind"] == "income"
+    amount = frame["amount"]
+    total = int(amount[income].sum())
+    received = int(amount[income & frame["received"]].sum())
+    return {
+        "total": total,
+        "received": received,
+        "remaining": total - received,
+        "expense": int(amount[~income].sum()),
+        "count": int(income.sum()),
+    }
+
+
+def site_summary(frame):
+    """현장별 계약금액/받은금액/잔금/진행률 (잔금 많은 순, 현장명이 없는 기록은 '현장 미지정')"""
+    income = frame[frame["kind"] == "income"]
+    site = income["site"]
+    names = site.cat.categories.astype(str).str.strip()
+    if (names == "").any():
+        # 빈 현장명은 한 묶음으로 (카테고리 이름만 바꿔 매핑)
+        site = site.map(dict(zip(site.cat.categories, names.where(names != "", UNASSIGNED_SITE))))
+    grouped = (
+        income.assign(site=site, received_amount=income["amount"].where(income["received"], 0))
+        .groupby("site", observed=True)[["amount", "received_amount"]]
+        .sum()
+    )
+    table = pd.DataFrame({
+        "현장명": grouped.index.astype(str),
+        "계약금액": grouped["amount"].to_numpy(),
+        "받은금액": grouped["received_amount"].to_numpy(),
+    })
+    table["잔금"] = table["계약금액"] - table["받은금액"]
+    table["진행률"] = (table["받은금액"] * 100 // table["계약금액"].where(table["계약금액"] > 0, 1)).astype("int64")
+    return table.sort_values("잔금", ascending=False, kind="stable").reset_index(drop=True)[SITE_COLUMNS]
+
+
+def upcoming_page(today, days=7, sites=(), payment_types=(), order="due", page=1,
+                  page_size=UPCOMING_PAGE_SIZE, store=None):
+    """
+    아직 안 받은 돈 중 오늘부터 days일 안에 예정된 것의 한 페이지 → (DataFrame, 전체 건수)
+
+    정렬/필터/자르기는 로컬 저장소 쿼리가 하고 여기서는 page_size건만 표로 만든다.
+    index는 page_id (행마다 위젯 키로 사용).
+    """
+    start = pd.Timestamp(today).normalize()
+    end = start + pd.Timedelta(days=days)
+    rows, total = (store or local_store).open_receivables(
+        start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"), sites=sites, payment_types=payment_types,
+        order=order, limit=page_size, offset=max(0, page - 1) * page_size,
+    )
+    raw = pd.DataFrame(rows, columns=["page_id", "현장", "구분", "금액", "예정일"])
+    table = raw.set_index("page_id")
+    table["금액"] = table["금액"].astype("int64")
+    table["D-Day"] = (pd.to_datetime(table["예정일"], format="%Y-%m-%d") - start).dt.days.astype("int64")
+    return table[UPCOMING_COLUMNS], total
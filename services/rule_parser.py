@@ -0,0 +1,478 @@
+# services/rule_parser.py - 규칙 기반 파서 (컴파일된 키워드 오토마톤)
+import re
+from datetime import date, datetime
+from functools import lru_cache
+
+# ============================================
+# 사전 (순서 = 우선순위, 먼저 나온 키워드가 이김)
+# ============================================
+
+# 현장명/거래처: (트리거 키워드, 추출 정규식)
+SITE_PATTERNS = [
+    ('구청', r'(\S+구청)'),
+    ('시청', r'(\S+시청)'),
+    ('청사', r'(\S+청사)'),
+    ('아파트', r'(\S+\s?아파트)'),
+    ('현장', r'(\S+\s?현장)'),
+    ('빌딩', r'(\S+\s?빌딩)'),
+    ('오피스텔', r'(\S+\s?오피스텔)'),
+    ('빌라', r'(\S+\s?빌라)'),
+    ('주택', r'(\S+\s?주택)'),
+    ('건설', r'(\S+건설)'),
+    ('건축', r'(\S+건축)'),
+    ('시공', r'(\S+시공)'),
+    ('인테리어', r'(\S+인테리어)'),
+    ('사장', r'(\S+사장)'),
+]
+
+WORK_KEYWORDS = {
+    '방수': '방수공사',
+    '미장': '미장공사',
+    '조적': '조적공사',
+    '타일': '타일공사',
+    '인테리어': '인테리어',
+    '도색': '도색작업',
+    '페인트': '페인트작업',
+    '전기': '전기공사',
+    '설비': '설비공사',
+    '철근': '철근작업',
+    '도배': '도배작업',
+    '장판': '장판작업',
+    '샷시': '샷시공사',
+    '유리': '유리공사',
+    '목공': '목공작업',
+    '철거': '철거작업',
+    '청소': '청소작업'
+}
+
+# 금액: (필요한 글자들, 정규식, 변환 함수)
+UNIT_MULTIPLIERS = {'천': 1000, '백': 100}
+AMOUNT_PATTERNS = [
+    # "1억 2천만원" / "1억2천" / "1억 5000만" → 억 뒤 숫자는 만 단위 (천/백이 붙으면 천만/백만)
+    (('억',), r'(\d+)\s*억\s*(?:(\d+)\s*([천백])?\s*만?)?\s*원?', lambda m:
+        int(m.group(1)) * 100000000
+        + (int(m.group(2)) * UNIT_MULTIPLIERS.get(m.group(3), 1) * 10000 if m.group(2) else 0)),
+    (('천', '만'), r'(\d+)\s*천\s*만\s*원?', lambda m: int(m.group(1)) * 10000000),
+    (('백', '만'), r'(\d+)\s*백\s*만\s*원?', lambda m: int(m.group(1)) * 1000000),
+    (('만', '원'), r'(\d+)\s*만\s*원', lambda m: int(m.group(1)) * 10000),
+    (('만',), r'(\d+)만', lambda m: int(m.group(1)) * 10000),
+    (('원',), r'(\d{7,})\s*원', lambda m: int(m.group(1))),  # 7자리 이상 숫자
+    (('원',), r'(\d+,\d+)\s*원', lambda m: int(m.group(1).replace(',', ''))),
+]
+
+PAYMENT_TYPES = {
+    '계약금': '계약금',
+    '착수금': '계약금',
+    '선금': '계약금',
+    '중도금': '중도금',
+    '중도 금': '중도금',
+    '잔금': '잔금',
+    '잔 금': '잔금',
+    '완료금': '잔금',
+    '준공금': '잔금',
+    '자재비': '자재비',
+    '자재 비': '자재비',
+    '자재값': '자재비',
+    '자재 값': '자재비',
+    '인건비': '인건비',
+    '인건 비': '인건비',
+    '노무비': '인건비',
+    '일당': '인건비',
+    '품값': '인건비',
+    '품삯': '인건비'
+}
+
+PAYMENT_METHODS = {
+    '현금': '현금',
+    '캐시': '현금',
+    '계좌': '계좌이체',
+    '이체': '계좌이체',
+    '송금': '계좌이체',
+    '입금': '계좌이체',
+    '카드': '카드',
+    '체크카드': '카드',
+    '신용카드': '카드',
+    '외상': '외상',
+    '후불': '외상'
+}
+
+# 조건부 날짜 (작업 완료 후 등)
+CONDITIONAL_WORDS = ['끝나면', '완료되면', '완료후', '완료 후', '끝나고']
+
+WEEKDAYS = {
+    '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
+    '금요일': 4, '토요일': 5, '일요일': 6
+}
+
+# 상대 날짜: 오늘 기준 일수
+RELATIVE_DAYS = {'오늘': 0, '내일': 1, '모레': 2, '글피': 3, '어제': -1}
+
+# "N일 후/뒤/전": (필요한 글자, 정규식, 부호)
+DAY_OFFSET_PATTERNS = [
+    ('후', r'(\d+)일\s*후', 1),
+    ('뒤', r'(\d+)일\s*뒤', 1),
+    ('전', r'(\d+)일\s*전', -1),
+]
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick 다중 키워드 매칭 오토마톤
+
+    키워드마다 태그 (카테고리, 값)를 붙여 등록하면 태그 하나당 비트 하나가
+    배정된다. 같은 카테고리 안에서는 먼저 등록한 태그가 낮은 비트 = 높은 우선순위.
+    실패 링크를 미리 풀어 둔 DFA 전이표를 쓰므로 scan()은 글자당 dict 조회와
+    비트 OR 한 번으로 끝나고, 등장한 모든 태그를 정수 비트마스크로 돌려준다.
+    정규식 실행 여부를 가르는 단서 글자('만', '원' 등)도 태그로 함께 등록한다.
+    키워드 안의 공백은 두 글자 이상 매칭된 뒤라면 건너뛴다 ("중도 금", "자재 값").
+    """
+
+    WHITESPACE = ' \t\r\n\u3000\xa0'
+
+    def __init__(self):
+        self._goto = [{}]
+        self._depth = [0]
+        self._bits = [0]
+        self.values = []
+        self.masks = {}
+        self._rows = None
+        self._output = None
+
+    def add(self, keyword, category, value=None):
+        state = 0
+        for ch in keyword:
+            if ch.isspace() and self._depth[state] >= 2:
+                continue  # scan()이 어차피 건너뛰는 공백
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._depth.append(self._depth[state] + 1)
+                self._bits.append(0)
+                self._goto[state][ch] = nxt
+            state = nxt
+
+        bit = 1 << len(self.values)
+        self.values.append(value)
+        self.masks[category] = self.masks.get(category, 0) | bit
+        self._bits[state] |= bit
+
+    def build(self):
+        """실패 링크 계산 후 완전한 전이표와 출력 비트표 생성"""
+        goto = self._goto
+        fail = [0] * len(goto)
+        output = list(self._bits)
+        delta = [dict(goto[0])]
+        delta.extend({} for _ in range(len(goto) - 1))
+
+        # BFS 순서로 처리하면 부모/실패 상태의 전이표가 항상 먼저 완성됨
+        queue = list(goto[0].values())
+        for state in queue:
+            fail_state = fail[state]
+            output[state] |= output[fail_state]
+            row = dict(delta[fail_state])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail_state].get(ch, 0)
+                row[ch] = nxt
+                queue.append(nxt)
+            delta[state] = row
+
+        # 공백 문자는 모두 ' '와 같게 취급하고, 두 글자 이상 매칭 중이면
+        # 제자리 전이로 건너뛴다 (출력 비트는 OR라 중복 무해)
+        for state, row in enumerate(delta):
+            skip = row.get(' ', state if self._depth[state] >= 2 else None)
+            if skip is not None:
+                for ch in self.WHITESPACE:
+                    row.setdefault(ch, skip)
+
+        self._rows = [row.get for row in delta]
+        self._output = output
+        return self
+
+    def scan(self, text):
+        """텍스트를 한 번 훑어 등장한 태그의 비트마스크 반환"""
+        rows = self._rows
+        output = self._output
+        mask = 0
+        state = 0
+        for ch in text:
+            state = rows[state](ch, 0)
+            mask |= output[state]
+        return mask
+
+
+def _build_automaton():
+    automaton = KeywordAutomaton()
+
+    for keyword, pattern in SITE_PATTERNS:
+        automaton.add(keyword, 'site', re.compile(pattern))
+    for keyword, value in WORK_KEYWORDS.items():
+        automaton.add(keyword, 'work', value)
+    for keyword, value in PAYMENT_TYPES.items():
+        automaton.add(keyword, 'payment_type', value)
+    for keyword, value in PAYMENT_METHODS.items():
+        automaton.add(keyword, 'payment_method', value)
+    for keyword in CONDITIONAL_WORDS:
+        automaton.add(keyword, 'conditional', True)
+    for keyword in ('다음주', '다음 주'):
+        automaton.add(keyword, 'next_week', True)
+    for keyword in ('이번주', '이번 주'):
+        automaton.add(keyword, 'this_week', True)
+    for keyword, offset in WEEKDAYS.items():
+        automaton.add(keyword, 'weekday', offset)
+    for keyword, days in RELATIVE_DAYS.items():
+        automaton.add(keyword, 'relative', days)
+
+    # 정규식 실행 여부를 가르는 단서 글자 (각자 고유 카테고리)
+    flags = {'작업', '일', '월', '/'}
+    for required, _, _ in AMOUNT_PATTERNS:
+        flags.update(required)
+    for required, _, _ in DAY_OFFSET_PATTERNS:
+        flags.add(required)
+    for flag in sorted(flags):
+        automaton.add(flag, flag)
+
+    return automaton.build()
+
+
+def _masks(*categories):
+    mask = 0
+    for category in categories:
+        mask |= _AUTOMATON.masks[category]
+    return mask
+
+
+# 모듈 로드 시 한 번만 컴파일
+_AUTOMATON = _build_automaton()
+_VALUES = _AUTOMATON.values
+_scan = _AUTOMATON.scan
+_AMOUNT_REGEX = [(_masks(*required), re.compile(pattern), converter)
+                 for required, pattern, converter in AMOUNT_PATTERNS]
+_AMOUNT_FLAGS = _masks(*{ch for required, _, _ in AMOUNT_PATTERNS for ch in required})
+_DAY_OFFSET_REGEX = [(_masks(required), re.compile(pattern), sign)
+                     for required, pattern, sign in DAY_OFFSET_PATTERNS]
+_WORK_SUFFIX_REGEX = re.compile(r'(\S+)\s*작업')
+_MONTH_DAY_REGEX = re.compile(r'(\d{1,2})[월/]\s*(\d{1,2})')
+_AMOUNT_TOKEN_REGEX = re.compile(r'\d[\d,]*\s*억(?:\s*\d+\s*[천백]?\s*만?)?|\d[\d,]*\s*[천백]?\s*만|\d[\d,]*\s*원')
+_DATE_HINT_REGEX = re.compile(r'\d+\s*일|월\s*[말초]|말까지|[이다]\S*\s*달')
+
+_SITE = _masks('site')
+_WORK = _masks('work')
+_PAYMENT_TYPE = _masks('payment_type')
+_PAYMENT_METHOD = _masks('payment_method')
+_CONDITIONAL = _masks('conditional')
+_NEXT_WEEK = _masks('next_week')
+_THIS_WEEK = _masks('this_week')
+_WEEKDAY = _masks('weekday')
+_RELATIVE = _masks('relative')
+_WORK_SUFFIX_FLAG = _masks('작업')
+_DAY_FLAG = _masks('일')
+_MONTH_DAY_FLAG = _masks('월', '/')
+_DATE = _CONDITIONAL | _NEXT_WEEK | _THIS_WEEK | _WEEKDAY | _RELATIVE | _DAY_FLAG | _MONTH_DAY_FLAG
+
+
+def _amount_plans():
+    """단위 글자 조합별로 시도할 금액 정규식 목록을 미리 계산"""
+    bits = [1 << i for i in range(_AMOUNT_FLAGS.bit_length()) if _AMOUNT_FLAGS >> i & 1]
+    plans = {}
+    for combo in range(1 << len(bits)):
+        present = 0
+        for i, bit in enumerate(bits):
+            if combo >> i & 1:
+                present |= bit
+        plans[present] = tuple((regex, converter) for required, regex, converter in _AMOUNT_REGEX
+                               if present & required == required)
+    return plans
+
+
+_AMOUNT_PLANS = _amount_plans()
+
+
+def _first(hit):
+    """비트마스크에서 가장 낮은 비트(최우선 태그)의 값"""
+    return _VALUES[(hit & -hit).bit_length() - 1]
+
+
+@lru_cache(maxsize=1024)
+def _iso_date(ordinal):
+    """서수(ordinal) → "YYYY-MM-DD" (strftime보다 빠르고 같은 날짜는 재사용)"""
+    return date.fromordinal(ordinal).isoformat()
+
+
+def _parse_date(text, today, mask):
+    """예상 날짜 추출 (조건부 → 다음주 → 이번주 → 요일 → 상대/구체 날짜)"""
+    if not mask & _DATE:
+        return ''
+
+    if mask & _CONDITIONAL:
+        return '작업 완료 후'
+
+    weekday = mask & _WEEKDAY
+    if weekday:
+        weekday = _first(weekday)
+
+    if mask & _NEXT_WEEK:
+        # 다음주 월요일 + 요일 (요일이 없으면 월요일)
+        return _iso_date(today.toordinal() + 7 - today.weekday() + (weekday or 0))
+
+    if mask & _WEEKDAY:
+        # 이번주 + 요일, 또는 요일만 언급 → 이미 지났거나 오늘이면 다음주
+        days_ahead = weekday - today.weekday()
+        if days_ahead <= 0:
+            days_ahead += 7
+        return _iso_date(today.toordinal() + days_ahead)
+
+    if mask & _THIS_WEEK:
+        return ''
+
+    relative = mask & _RELATIVE
+    if relative:
+        return _iso_date(today.toordinal() + _first(relative))
+
+    if mask & _DAY_FLAG:
+        for required, regex, sign in _DAY_OFFSET_REGEX:
+            if mask & required:
+                match = regex.search(text)
+                if match:
+                    return _iso_date(today.toordinal() + sign * int(match.group(1)))
+
+    # 구체적 날짜 패턴 (월/일 형식)
+    if mask & _MONTH_DAY_FLAG:
+        date_match = _MONTH_DAY_REGEX.search(text)
+        if date_match:
+            month = int(date_match.group(1))
+            day = int(date_match.group(2))
+            year = today.year
+            try:
+                if date(year, month, day) < today:
+                    year += 1
+                return f"{year}-{month:02d}-{day:02d}"
+            except ValueError:
+                pass
+
+    return ''
+
+
+def rule_based_parse(text, today=None):
+    """
+    규칙 기반 파싱 (AI 없이도 작동)
+
+    키워드 사전 전체를 오토마톤으로 한 번만 훑고, 정규식은 단서 글자가
+    있을 때만 실행한다. today(date 또는 datetime)를 넘기면 상대 날짜의 기준일로 쓴다.
+    """
+    return _parse(text, today)[0]
+
+
+def parse_with_confidence(text, today=None):
+    """
+    규칙 파싱 결과와 필드별 신뢰도(0~1)를 함께 반환
+
+    - 0: 못 찾음 / 0.4: 후보가 여럿이라 애매 / 0.6: 기본값('기타', '미정') / 0.9 이상: 확실
+    - expected_date는 날짜 언급이 아예 없으면 빈 값이어도 신뢰도가 높다
+    """
+    result, mask = _parse(text, today)
+    return result, _confidence(text, result, mask)
+
+
+def _distinct(hit):
+    """비트마스크에 등장한 서로 다른 값의 개수"""
+    values = set()
+    while hit:
+        low = hit & -hit
+        values.add(_VALUES[low.bit_length() - 1])
+        hit ^= low
+    return len(values)
+
+
+def _confidence(text, result, mask):
+    confidence = {}
+
+    confidence['site_name'] = 0.9 if result['site_name'] else 0.0
+
+    if mask & _WORK:
+        confidence['work_type'] = 0.9
+    else:
+        confidence['work_type'] = 0.6 if result['work_type'] else 0.0
+
+    if not result['amount']:
+        confidence['amount'] = 0.0
+    elif len(_AMOUNT_TOKEN_REGEX.findall(text)) > 1:
+        confidence['amount'] = 0.4  # 금액이 여러 개 → 어느 쪽인지 애매
+    else:
+        confidence['amount'] = 0.95
+
+    hit = mask & _PAYMENT_TYPE
+    if not hit:
+        confidence['payment_type'] = 0.6  # '기타' 기본값
+    else:
+        confidence['payment_type'] = 0.9 if _distinct(hit) == 1 else 0.4
+
+    if result['expected_date']:
+        confidence['expected_date'] = 0.9
+    elif _DATE_HINT_REGEX.search(text):
+        confidence['expected_date'] = 0.3  # 날짜 언급은 있는데 못 읽음 ("15일", "월말")
+    else:
+        confidence['expected_date'] = 0.8
+
+    hit = mask & _PAYMENT_METHOD
+    if not hit:
+        confidence['payment_method'] = 0.6  # '미정' 기본값
+    else:
+        confidence['payment_method'] = 0.9 if _distinct(hit) == 1 else 0.4
+
+    return confidence
+
+
+def _parse(text, today):
+    if today is None:
+        today = date.today()
+    elif isinstance(today, datetime):
+        # 기준일은 날짜만 (시각 때문에 오늘 날짜가 '지난 날'로 밀리지 않게)
+        today = today.date()
+
+    mask = _scan(text)
+
+    # 1. 현장명/거래처 (우선순위 순으로 등장한 패턴만 시도)
+    site_name = ''
+    hit = mask & _SITE
+    while hit:
+        low = hit & -hit
+        match = _VALUES[low.bit_length() - 1].search(text)
+        if match:
+            site_name = match.group(1).strip()
+            break
+        hit ^= low
+
+    # 2. 작업 종류 (없으면 "작업" 앞 단어)
+    work_type = ''
+    hit = mask & _WORK
+    if hit:
+        work_type = _first(hit)
+    elif mask & _WORK_SUFFIX_FLAG:
+        work_match = _WORK_SUFFIX_REGEX.search(text)
+        if work_match:
+            work_type = f"{work_match.group(1)}작업"
+
+    # 3. 금액 (숫자로 변환)
+    amount = ''
+    for regex, converter in _AMOUNT_PLANS[mask & _AMOUNT_FLAGS]:
+        match = regex.search(text)
+        if match:
+            amount = str(converter(match))
+            break
+
+    # 4. 거래 유형 / 6. 결제 방식
+    hit = mask & _PAYMENT_TYPE
+    payment_type = _first(hit) if hit else '기타'
+    hit = mask & _PAYMENT_METHOD
+    payment_method = _first(hit) if hit else '미정'
+
+    return {
+        'site_name': site_name,
+        'work_type': work_type,
+        'amount': amount,
+        'payment_type': payment_type,
+        'expected_date': _parse_date(text, today, mask),  # 5. 예상 날짜
+        'payment_method': payment_method,
+        'memo': text  # 7. 전체 텍스트를 메모로
+    }, mask
@@ -0,0 +1,291 @@
+# services/transcription.py - Whisper 음성 인식 서비스 (임시 파일 없이 메모리에서 바로 업로드)
+import os
+import shutil
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from services.config import get_settings, cache_resource
+from services.analysis_cache import AnalysisCache, CACHE_DIR
+
+WHISPER_MODEL = "whisper-1"
+WHISPER_MAX_BYTES = 25 * 1024 * 1024
+
+# 긴 녹음 분할 인식
+LONG_AUDIO_SECONDS = 90.0      # 이보다 길면 나눠서 동시에 인식
+CHUNK_SECONDS = 60.0
+CHUNK_OVERLAP_SECONDS = 1.5
+MAX_PARALLEL_CHUNKS = 8
+MAX_OVERLAP_WORDS = 20
+
+# 음성 인식 결과 캐시 (같은 녹음 재인식/재업로드는 Whisper 호출 없이 바로 반환)
+transcription_cache = AnalysisCache(
+    path=os.path.join(CACHE_DIR, "transcription_cache.sqlite3"),
+    ttl=30 * 24 * 3600, max_entries=2000, max_bytes=10 * 1024 * 1024,
+    label="음성 인식 캐시",
+)
+
+# 컨테이너 형식 판별용 시그니처: (시작 바이트, 위치, 확장자, MIME)
+AUDIO_SIGNATURES = (
+    (b"\x1a\x45\xdf\xa3", 0, "webm", "audio/webm"),   # EBML (브라우저 MediaRecorder)
+    (b"RIFF", 0, "wav", "audio/wav"),
+    (b"OggS", 0, "ogg", "audio/ogg"),
+    (b"fLaC", 0, "flac", "audio/flac"),
+    (b"ID3", 0, "mp3", "audio/mpeg"),
+    (b"ftyp", 4, "m4a", "audio/mp4"),
+)
+
+MIME_BY_EXT = {
+    "webm": "audio/webm",
+    "wav": "audio/wav",
+    "ogg": "audio/ogg",
+    "flac": "audio/flac",
+    "mp3": "audio/mpeg",
+    "mpeg": "audio/mpeg",
+    "mpga": "audio/mpeg",
+    "m4a": "audio/mp4",
+    "mp4": "audio/mp4",
+}
+
+
+@dataclass(frozen=True)
+class TranscriptionResult:
+    """음성 인식 결과 (실패해도 예외 대신 ok=False + error)"""
+    text: str
+    ok: bool
+    error: str = ""
+    filename: str = ""
+    mime: str = ""
+    size: int = 0              # 업로드 바이트 수 (전처리 후)
+    original_size: int = 0     # 원본 바이트 수
+    elapsed: float = 0.0       # Whisper 호출 시간(초)
+    preprocess_elapsed: float = 0.0
+    chunks: int = 1            # 나눠서 올린 조각 수
+    cached: bool = False       # 음성 인식 캐시에서 가져옴
+    warning: str = ""          # 전처리를 못 하고 원본을 올린 이유 등
+
+
+@cache_resource
+def get_openai_client():
+    """Whisper용 OpenAI 클라이언트 (처음 쓸 때 생성, 세션 간 공유). API 키가 없으면 None"""
+    api_key = get_settings().openai_api_key
+    if not api_key:
+        return None
+
+    from openai import OpenAI
+    return OpenAI(api_key=api_key)
+
+
+def preprocess_warning():
+    """
+    음성 전처리(무음 제거/압축/긴 녹음 분할)를 못 하는 환경이면 안내 문구, 아니면 빈 문자열
+    브라우저 녹음(webm)은 ffmpeg가 있어야 디코딩할 수 있다 (packages.txt로 설치).
+    """
+    if shutil.which("ffmpeg"):
+        return ""
+    return "ffmpeg가 없어 음성 전처리(무음 제거·긴 녹음 분할)를 건너뜁니다. 25MB가 넘는 녹음은 인식할 수 없습니다."
+
+
+def sniff_format(audio_bytes, filename=None):
+    """
+    실제 바이트로 컨테이너 형식 판별 → (확장자, MIME)
+    브라우저 녹음은 webm인데 .wav 이름으로 넘어오는 경우가 있어 파일명보다 내용을 우선한다.
+    """
+    head = bytes(audio_bytes[:16])
+    for magic, offset, ext, mime in AUDIO_SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return ext, mime
+
+    # ID3 태그 없는 mp3 (프레임 동기 비트)
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "mp3", "audio/mpeg"
+
+    ext = os.path.splitext(filename or "")[1].lstrip(".").lower()
+    if ext in MIME_BY_EXT:
+        return ext, MIME_BY_EXT[ext]
+    return "wav", "audio/wav"
+
+
+def transcribe(audio_bytes, filename=None, language="ko", preprocess=True):
+    """
+    음성 바이트 → 텍스트
+
+    (파일명, 바이트, MIME) 튜플로 바로 업로드하므로 디스크를 거치지 않고,
+    클라이언트는 get_openai_client()의 공유 인스턴스를 쓴다.
+    preprocess=True면 모노 16kHz + 앞뒤 무음 제거 후 더 작을 때만 전처리본을 올린다.
+    """
+    ext, mime = sniff_format(audio_bytes, filename)
+    stem = os.path.splitext(os.path.basename(filename or ""))[0] or "recording"
+    info = dict(original_size=len(audio_bytes))
+
+    if not audio_bytes:
+        return TranscriptionResult(text="", ok=False, error="녹음된 음성이 없습니다.", **info)
+
+    upload = bytes(audio_bytes)
+    prepared = None
+    if preprocess:
+        started = time.perf_counter()
+        from services.audio_preprocess import preprocess_audio  # numpy는 음성 인식 때만 import
+        prepared = preprocess_audio(upload, ext)
+        info["preprocess_elapsed"] = time.perf_counter() - started
+        if prepared is None:
+            from services.audio_preprocess import skip_reason
+            info["warning"] = skip_reason(ext) or "음성을 해석하지 못해 전처리 없이 원본을 올립니다."
+
+    # 같은 음성(디코딩한 PCM 기준)이면 이전 인식 결과 재사용
+    cache_key = audio_cache_key(upload, prepared, language)
+    cached = transcription_cache.get(cache_key)
+    if cached is not None:
+        print(f"음성 인식 캐시 적중 ({cache_key[:12]})")
+        return TranscriptionResult(
+            text=cached["text"], ok=True, cached=True,
+            filename=f"{stem}.{ext}", mime=mime, chunks=cached.get("chunks", 1), **info,
+        )
+
+    client = get_openai_client()
+    if client is None:
+        return TranscriptionResult(text="", ok=False, error="OpenAI API 키가 설정되지 않았습니다.", **info)
+
+    result = _transcribe_uncached(client, upload, prepared, stem, ext, mime, language, info)
+    if result.ok:
+        transcription_cache.put(cache_key, {"text": result.text, "chunks": result.chunks})
+    return result
+
+
+def audio_cache_key(upload, prepared, language):
+    """
+    캐시 키: BLAKE2b(16kHz 모노 16bit PCM + 모델 + 언어)
+    컨테이너/파일명/메타데이터가 달라도 소리가 같으면 같은 키. 디코딩할 수 없으면 원본 바이트 기준
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{WHISPER_MODEL}\x00{language}\x00".encode("utf-8"))
+    if prepared is not None and prepared.samples is not None:
+        from services.audio_preprocess import to_pcm16
+        digest.update(b"pcm16\x00")
+        digest.update(to_pcm16(prepared.samples))
+    else:
+        digest.update(b"raw\x00")
+        digest.update(upload)
+    return digest.hexdigest()
+
+
+def get_transcription_cache_stats():
+    """음성 인식 캐시 hits/misses/hit_rate/용량"""
+    return transcription_cache.stats()
+
+
+def _transcribe_uncached(client, upload, prepared, stem, ext, mime, language, info):
+    """캐시에 없을 때 실제 Whisper 호출 (짧으면 한 번, 길면 분할)"""
+    limit_mb = WHISPER_MAX_BYTES // (1024 * 1024)
+    if prepared is None and len(upload) > WHISPER_MAX_BYTES:
+        # 디코딩을 못 하면 나눌 수도 줄일 수도 없음 → Whisper가 거절할 파일은 보내지 않는다
+        reason = info.get("warning") or "음성 형식을 해석할 수 없습니다."
+        print(f"음성 인식 생략 ({len(upload):,}바이트 > {limit_mb}MB, 디코딩 불가)")
+        return TranscriptionResult(
+            text="", ok=False,
+            error=f"녹음 파일이 {len(upload) / (1024 * 1024):.0f}MB로 Whisper 한도({limit_mb}MB)를 넘는데 "
+                  f"나눠 올릴 수 없습니다: {reason}",
+            filename=f"{stem}.{ext}", mime=mime, size=len(upload), **info,
+        )
+
+    # 긴 녹음은 무음 지점에서 나눠 동시에 인식
+    if prepared is not None and prepared.duration > LONG_AUDIO_SECONDS:
+        return _transcribe_chunked(client, prepared, stem, language, info)
+
+    if prepared is not None and len(prepared.data) < len(upload):
+        print(f"음성 전처리: {len(upload):,} → {len(prepared.data):,}바이트, "
+              f"{prepared.original_duration:.1f} → {prepared.duration:.1f}초")
+        upload, ext, mime = prepared.data, prepared.ext, prepared.mime
+
+    upload_name = f"{stem}.{ext}"
+    info.update(filename=upload_name, mime=mime, size=len(upload))
+
+    if len(upload) > WHISPER_MAX_BYTES:
+        return TranscriptionResult(
+            text="", ok=False, error=f"전처리한 음성도 Whisper 한도({limit_mb}MB)를 넘습니다.", **info,
+        )
+
+    started = time.perf_counter()
+    try:
+        text = _whisper(client, upload_name, upload, mime, language)
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        print(f"음성 인식 실패 ({upload_name}, {elapsed:.2f}초): {e}")
+        return TranscriptionResult(text="", ok=False, error=str(e), elapsed=elapsed, **info)
+
+    elapsed = time.perf_counter() - started
+    print(f"음성 인식 완료 ({upload_name}, {len(upload):,}바이트, {elapsed:.2f}초)")
+    return TranscriptionResult(text=text, ok=True, elapsed=elapsed, **info)
+
+
+def _whisper(client, upload_name, data, mime, language):
+    """Whisper 한 번 호출 (실패 시 예외)"""
+    transcript = client.audio.transcriptions.create(
+        model=WHISPER_MODEL,
+        file=(upload_name, data, mime),
+        language=language,
+    )
+    return transcript.text
+
+
+def _transcribe_chunked(client, prepared, stem, language, info):
+    """
+    긴 음성: 무음 지점 분할 → 스레드 풀에서 동시 인식 → 겹친 부분 중복 제거 후 이어 붙이기
+    전체 시간은 가장 긴 조각 하나를 인식하는 시간 정도가 된다.
+    """
+    from services.audio_preprocess import split_at_silence, encode, TARGET_RATE
+
+    spans = split_at_silence(
+        prepared.samples, TARGET_RATE,
+        chunk_seconds=CHUNK_SECONDS, overlap_seconds=CHUNK_OVERLAP_SECONDS,
+    )
+    pieces = [encode(prepared.samples[start:end], TARGET_RATE) for start, end in spans]
+    info.update(
+        filename=f"{stem}.{pieces[0][1]}", mime=pieces[0][2],
+        size=sum(len(data) for data, _, _ in pieces), chunks=len(pieces),
+    )
+    print(f"긴 녹음 분할: {prepared.duration:.0f}초 → {len(pieces)}조각")
+
+    def run(index):
+        data, ext, mime = pieces[index]
+        return _whisper(client, f"{stem}_{index:03d}.{ext}", data, mime, language)
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=min(len(pieces), MAX_PARALLEL_CHUNKS)) as pool:
+            texts = list(pool.map(run, range(len(pieces))))
+    except Exception as e:
+        elapsed = time.perf_counter() - started
+        print(f"음성 인식 실패 (분할 {len(pieces)}조각, {elapsed:.2f}초): {e}")
+        return TranscriptionResult(text="", ok=False, error=str(e), elapsed=elapsed, **info)
+
+    elapsed = time.perf_counter() - started
+    print(f"음성 인식 완료 (분할 {len(pieces)}조각, {elapsed:.2f}초)")
+    return TranscriptionResult(text=stitch_transcripts(texts), ok=True, elapsed=elapsed, **info)
+
+
+def stitch_transcripts(texts, max_overlap_words=MAX_OVERLAP_WORDS):
+    """
+    겹치게 자른 조각들의 인식 결과 이어 붙이기
+
+    앞 조각의 끝 단어들과 다음 조각의 첫 단어들이 같으면(문장부호 무시) 가장 긴 일치 구간을 한 번만 남긴다.
+    """
+    words = []
+    for text in texts:
+        nxt = text.split()
+        if not nxt:
+            continue
+        keys = [_word_key(w) for w in words[-max_overlap_words:]]
+        nxt_keys = [_word_key(w) for w in nxt[:max_overlap_words]]
+        skip = 0
+        for k in range(min(len(keys), len(nxt_keys)), 0, -1):
+            if keys[-k:] == nxt_keys[:k]:
+                skip = k
+                break
+        words.extend(nxt[skip:])
+    return " ".join(words)
+
+
+def _word_key(word):
+    return word.strip(".,!?~…\"'()[]").lower()
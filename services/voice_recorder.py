@@ -1,251 +1,163 @@
-# services/voice_recorder.py
+# services/voice_recorder.py - 브라우저 녹음 컴포넌트 (녹음 중에 조각을 바이너리로 보내 서버에서 이어 붙임)
+import os
+import struct
+from dataclasses import dataclass
+
 import streamlit as st
 import streamlit.components.v1 as components
-import base64
-import json
 
-def create_voice_recorder():
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "voice_recorder_frontend")
+
+TIMESLICE_MS = 1000                      # MediaRecorder 조각 간격
+MAX_RECORDING_BYTES = 25 * 1024 * 1024   # 녹음 하나 상한 (Whisper 업로드 한도와 같게)
+
+# 프레임: "MDA1" | flags | 녹음 id | 첫 조각 번호 | 조각 수 | 조각 길이 × N | 조각 바이트들 (index.html과 맞출 것)
+FRAME_MAGIC = b"MDA1"
+FLAG_FINAL = 1
+_HEADER = struct.Struct(">4sBIIH")
+
+_component = None
+
+
+def _recorder_component():
+    """declare_component는 처음 그릴 때 한 번만"""
+    global _component
+    if _component is None:
+        _component = components.declare_component("maumda_voice_recorder", path=FRONTEND_DIR)
+    return _component
+
+
+@dataclass(frozen=True)
+class AudioFrame:
+    """브라우저에서 온 프레임 하나 (ack 안 된 조각들 묶음)"""
+    recording_id: int
+    final: bool
+    first_seq: int
+    chunks: tuple
+
+
+def parse_frame(data):
+    """바이너리 프레임 → AudioFrame (형식이 틀리면 None). 조각은 복사 없이 memoryview로 자른다"""
+    view = memoryview(data)
+    if len(view) < _HEADER.size:
+        return None
+    magic, flags, recording_id, first_seq, count = _HEADER.unpack_from(view)
+    if magic != FRAME_MAGIC:
+        print("녹음 프레임 형식 오류 (시그니처 불일치)")
+        return None
+
+    offset = _HEADER.size
+    lengths = struct.unpack_from(f">{count}I", view, offset)
+    offset += 4 * count
+    if offset + sum(lengths) != len(view):
+        print(f"녹음 프레임 길이 불일치: {len(view)}바이트")
+        return None
+
+    chunks = []
+    for length in lengths:
+        chunks.append(view[offset:offset + length])
+        offset += length
+    return AudioFrame(recording_id, bool(flags & FLAG_FINAL), first_seq, tuple(chunks))
+
+
+class RecordingBuffer:
+    """
+    녹음 하나의 조각을 순서대로 이어 붙이는 상한 있는 버퍼
+
+    브라우저는 서버가 ack할 때까지 같은 조각을 다시 보내므로 조각 번호로 중복을 거른다.
+    max_bytes를 넘는 조각은 버리고 overflow만 표시한다.
+    """
+
+    def __init__(self, recording_id, max_bytes=MAX_RECORDING_BYTES):
+        self.recording_id = recording_id
+        self.max_bytes = max_bytes
+        self.data = bytearray()
+        self.next_seq = 0
+        self.final = False
+        self.overflow = False
+        self.delivered = False
+
+    @property
+    def acked(self):
+        """받은 마지막 조각 번호 (브라우저가 그 이하를 버린다)"""
+        return self.next_seq - 1
+
+    def add(self, frame):
+        """새 조각만 이어 붙이고 붙인 바이트 수 반환"""
+        added = 0
+        for seq, chunk in enumerate(frame.chunks, start=frame.first_seq):
+            if seq < self.next_seq:
+                continue
+            if seq > self.next_seq:
+                print(f"녹음 조각 누락: {self.next_seq}번 대신 {seq}번 수신")
+                break
+            self.next_seq += 1
+            if len(self.data) + len(chunk) > self.max_bytes:
+                self.overflow = True
+                continue
+            self.data += chunk
+            added += len(chunk)
+
+        if frame.final:
+            self.final = True
+        return added
+
+    def take(self):
+        """완성된 녹음을 한 번만 꺼내고 버퍼는 비운다"""
+        if not self.final or self.delivered:
+            return None
+        self.delivered = True
+        data, self.data = bytes(self.data), bytearray()
+        return data
+
+
+def create_voice_recorder(key="voice_recorder", max_bytes=MAX_RECORDING_BYTES):
     """
     브라우저 네이티브 녹음 기능을 사용하는 커스텀 음성 녹음 컴포넌트
     클릭 한 번으로 바로 녹음 시작
+
+    녹음 중에는 TIMESLICE_MS마다 조각을 바이너리 그대로(base64 없이) 보내 세션의 RecordingBuffer에 쌓고,
+    녹음을 멈춘 run에서 완성된 음성 바이트를 한 번 반환한다 (그 외에는 None).
     """
-    
-    recorder_html = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <style>
-            body {
-                margin: 0;
-                padding: 20px;
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            }
-            
-            .recorder-container {
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                gap: 20px;
-            }
-            
-            .record-button {
-                width: 200px;
-                height: 60px;
-                border: none;
-                border-radius: 30px;
-                font-size: 18px;
-                font-weight: bold;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                gap: 10px;
-            }
-            
-            .record-button.idle {
-                background: linear-gradient(135deg, #4CAF50, #45a049);
-                color: white;
-            }
-            
-            .record-button.idle:hover {
-                transform: scale(1.05);
-                box-shadow: 0 5px 15px rgba(76, 175, 80, 0.4);
-            }
-            
-            .record-button.recording {
-                background: linear-gradient(135deg, #f44336, #da190b);
-                color: white;
-                animation: pulse 1.5s infinite;
-            }
-            
-            @keyframes pulse {
-                0% { transform: scale(1); }
-                50% { transform: scale(1.05); }
-                100% { transform: scale(1); }
-            }
-            
-            .status {
-                font-size: 14px;
-                color: #666;
-                text-align: center;
-            }
-            
-            .audio-preview {
-                margin-top: 20px;
-                display: none;
-            }
-            
-            .dot {
-                display: inline-block;
-                width: 8px;
-                height: 8px;
-                border-radius: 50%;
-                background: #f44336;
-                margin-right: 5px;
-                animation: blink 1s infinite;
-            }
-            
-            @keyframes blink {
-                0%, 50% { opacity: 1; }
-                51%, 100% { opacity: 0; }
-            }
-        </style>
-    </head>
-    <body>
-        <div class="recorder-container">
-            <button id="recordBtn" class="record-button idle" onclick="handleRecord()">
-                <span id="btnIcon">🎤</span>
-                <span id="btnText">녹음 시작</span>
-            </button>
-            
-            <div id="status" class="status">준비됨</div>
-            
-            <audio id="audioPreview" class="audio-preview" controls></audio>
-        </div>
-        
-        <script>
-            let mediaRecorder = null;
-            let audioChunks = [];
-            let isRecording = false;
-            let stream = null;
-            
-            async function handleRecord() {
-                const btn = document.getElementById('recordBtn');
-                const btnIcon = document.getElementById('btnIcon');
-                const btnText = document.getElementById('btnText');
-                const status = document.getElementById('status');
-                const audioPreview = document.getElementById('audioPreview');
-                
-                if (!isRecording) {
-                    // 녹음 시작
-                    try {
-                        // 마이크 권한 요청 및 스트림 가져오기
-                        stream = await navigator.mediaDevices.getUserMedia({ 
-                            audio: {
-                                echoCancellation: true,
-                                noiseSuppression: true,
-                                sampleRate: 44100
-                            } 
-                        });
-                        
-                        // MediaRecorder 생성
-                        mediaRecorder = new MediaRecorder(stream, {
-                            mimeType: 'audio/webm'
-                        });
-                        
-                        audioChunks = [];
-                        
-                        // 데이터 수집
-                        mediaRecorder.ondataavailable = (event) => {
-                            if (event.data.size > 0) {
-                                audioChunks.push(event.data);
-                            }
-                        };
-                        
-                        // 녹음 완료 처리
-                        mediaRecorder.onstop = async () => {
-                            // Blob 생성
-                            const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-                            
-                            // 미리듣기
-                            const audioUrl = URL.createObjectURL(audioBlob);
-                            audioPreview.src = audioUrl;
-                            audioPreview.style.display = 'block';
-                            
-                            // Base64로 변환하여 Streamlit에 전송
-                            const reader = new FileReader();
-                            reader.onloadend = () => {
-                                const base64Audio = reader.result.split(',')[1];
-                                
-                                // Streamlit으로 데이터 전송
-                                window.parent.postMessage({
-                                    type: 'streamlit:setComponentValue',
-                                    data: {
-                                        audio_data: base64Audio,
-                                        mime_type: 'audio/webm'
-                                    }
-                                }, '*');
-                            };
-                            reader.readAsDataURL(audioBlob);
-                            
-                            // 상태 업데이트
-                            status.innerHTML = '✅ 녹음 완료! 자동으로 텍스트 변환 중...';
-                        };
-                        
-                        // 녹음 시작
-                        mediaRecorder.start();
-                        isRecording = true;
-                        
-                        // UI 업데이트
-                        btn.className = 'record-button recording';
-                        btnIcon.textContent = '⏹️';
-                        btnText.textContent = '녹음 중지';
-                        status.innerHTML = '<span class="dot"></span>녹음 중... 말씀해 주세요';
-                        audioPreview.style.display = 'none';
-                        
-                    } catch (err) {
-                        console.error('마이크 접근 오류:', err);
-                        status.innerHTML = '❌ 마이크 접근 실패. 권한을 확인하세요.';
-                    }
-                    
-                } else {
-                    // 녹음 중지
-                    if (mediaRecorder && mediaRecorder.state !== 'inactive') {
-                        mediaRecorder.stop();
-                        
-                        // 스트림 정지
-                        if (stream) {
-                            stream.getTracks().forEach(track => track.stop());
-                        }
-                        
-                        isRecording = false;
-                        
-                        // UI 업데이트
-                        btn.className = 'record-button idle';
-                        btnIcon.textContent = '🎤';
-                        btnText.textContent = '녹음 시작';
-                        status.innerHTML = '처리 중...';
-                    }
-                }
-            }
-            
-            // 페이지 로드시 자동으로 권한 체크
-            window.onload = async () => {
-                try {
-                    const permissionStatus = await navigator.permissions.query({ name: 'microphone' });
-                    if (permissionStatus.state === 'granted') {
-                        document.getElementById('status').innerHTML = '✅ 마이크 준비됨';
-                    }
-                } catch (err) {
-                    // 권한 API를 지원하지 않는 브라우저
-                }
-            };
-        </script>
-    </body>
-    </html>
-    """
-    
-    # 컴포넌트 렌더링
-    component_value = components.html(
-        recorder_html,
-        height=200,
-        scrolling=False
+    state_key = f"{key}_buffer"
+    buffer = st.session_state.get(state_key)
+
+    frame_bytes = _recorder_component()(
+        recording_id=buffer.recording_id if buffer else 0,
+        acked=buffer.acked if buffer else -1,
+        timeslice_ms=TIMESLICE_MS,
+        max_bytes=max_bytes,
+        key=key,
+        default=None,
     )
-    
-    return component_value
+    if not frame_bytes:
+        return None
+
+    frame = parse_frame(frame_bytes)
+    if frame is None:
+        return None
+
+    if buffer is None or buffer.recording_id != frame.recording_id:
+        buffer = RecordingBuffer(frame.recording_id, max_bytes)
+        st.session_state[state_key] = buffer
+
+    buffer.add(frame)
+    if buffer.overflow and buffer.final and not buffer.delivered:
+        st.warning(f"녹음이 {max_bytes // (1024 * 1024)}MB를 넘어 뒷부분은 버렸습니다.")
+    return buffer.take()
+
 
 def get_audio_recorder_component():
     """
     Streamlit 페이지에서 사용할 음성 녹음 컴포넌트
+    → (음성 바이트, MIME) 또는 (None, None)
     """
     st.markdown("### 🎤 음성으로 입력하기")
-    
-    # 커스텀 컴포넌트 사용
-    audio_data = create_voice_recorder()
-    
-    # 녹음 데이터 처리
-    if audio_data:
-        return audio_data.get('audio_data'), audio_data.get('mime_type')
-    
+
+    audio_bytes = create_voice_recorder()
+    if audio_bytes:
+        from services.transcription import sniff_format
+        _, mime = sniff_format(audio_bytes, "recording.webm")
+        return audio_bytes, mime
+
     return None, None
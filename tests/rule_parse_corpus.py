@@ -0,0 +1,359 @@
+# tests/rule_parse_corpus.py - 규칙 파서 비교 기준 (기존 구현 + 메모 모음), 테스트와 벤치마크가 같이 씀
+import re
+from datetime import datetime, timedelta
+
+
+def legacy_rule_based_parse(text, today=None):
+    """기존 rule_based_parse (비교 기준, 날짜 기준일 주입만 추가)"""
+    result = {
+        'site_name': '',
+        'work_type': '',
+        'amount': '',
+        'payment_type': '',
+        'expected_date': '',
+        'payment_method': '',
+        'memo': ''
+    }
+    
+    # 1. 현장명/거래처 추출
+    site_patterns = [
+        (r'(\S+구청)', 1),
+        (r'(\S+시청)', 1),
+        (r'(\S+청사)', 1),
+        (r'(\S+\s?아파트)', 1),
+        (r'(\S+\s?현장)', 1),
+        (r'(\S+\s?빌딩)', 1),
+        (r'(\S+\s?오피스텔)', 1),
+        (r'(\S+\s?빌라)', 1),
+        (r'(\S+\s?주택)', 1),
+        (r'(\S+건설)', 1),
+        (r'(\S+건축)', 1),
+        (r'(\S+시공)', 1),
+        (r'(\S+인테리어)', 1),
+        (r'(\S+사장)', 1),
+    ]
+    
+    for pattern, group in site_patterns:
+        match = re.search(pattern, text)
+        if match:
+            result['site_name'] = match.group(group).strip()
+            break
+    
+    # 2. 작업 종류 추출
+    work_keywords = {
+        '방수': '방수공사',
+        '미장': '미장공사',
+        '조적': '조적공사',
+        '타일': '타일공사',
+        '인테리어': '인테리어',
+        '도색': '도색작업',
+        '페인트': '페인트작업',
+        '전기': '전기공사',
+        '설비': '설비공사',
+        '철근': '철근작업',
+        '도배': '도배작업',
+        '장판': '장판작업',
+        '샷시': '샷시공사',
+        '유리': '유리공사',
+        '목공': '목공작업',
+        '철거': '철거작업',
+        '청소': '청소작업'
+    }
+    
+    for keyword, work_name in work_keywords.items():
+        if keyword in text:
+            result['work_type'] = work_name
+            break
+    
+    # 작업이 안 나오면 text에서 "작업" 앞 단어 추출
+    if not result['work_type']:
+        work_match = re.search(r'(\S+)\s*작업', text)
+        if work_match:
+            result['work_type'] = f"{work_match.group(1)}작업"
+    
+    # 3. 금액 추출 (숫자로 변환)
+    amount_patterns = [
+        (r'(\d+)\s*억\s*(\d+)?\s*만?\s*원?', lambda m: 
+            int(m.group(1)) * 100000000 + (int(m.group(2)) * 10000 if m.group(2) else 0)),
+        (r'(\d+)\s*천\s*만\s*원?', lambda m: int(m.group(1)) * 10000000),
+        (r'(\d+)\s*백\s*만\s*원?', lambda m: int(m.group(1)) * 1000000),
+        (r'(\d+)\s*만\s*원', lambda m: int(m.group(1)) * 10000),
+        (r'(\d+)\s*만원', lambda m: int(m.group(1)) * 10000),
+        (r'(\d+)만', lambda m: int(m.group(1)) * 10000),
+        (r'(\d{7,})\s*원', lambda m: int(m.group(1))),  # 7자리 이상 숫자
+        (r'(\d+,\d+)\s*원', lambda m: int(m.group(1).replace(',', ''))),
+    ]
+    
+    for pattern, converter in amount_patterns:
+        match = re.search(pattern, text)
+        if match:
+            result['amount'] = str(converter(match))
+            break
+    
+    # 4. 거래 유형 추출
+    payment_types = {
+        '계약금': '계약금',
+        '착수금': '계약금',
+        '선금': '계약금',
+        '중도금': '중도금',
+        '중도 금': '중도금',
+        '잔금': '잔금',
+        '잔 금': '잔금',
+        '완료금': '잔금',
+        '준공금': '잔금',
+        '자재비': '자재비',
+        '자재 비': '자재비',
+        '자재값': '자재비',
+        '자재 값': '자재비',
+        '인건비': '인건비',
+        '인건 비': '인건비',
+        '노무비': '인건비',
+        '일당': '인건비',
+        '품값': '인건비',
+        '품삯': '인건비'
+    }
+    
+    for keyword, ptype in payment_types.items():
+        if keyword in text:
+            result['payment_type'] = ptype
+            break
+    
+    if not result['payment_type']:
+        result['payment_type'] = '기타'
+    
+    # 5. 예상 날짜 추출
+    if today is None:
+        today = datetime.now()
+    
+    # 조건부 날짜 (작업 완료 후 등)
+    if any(word in text for word in ['끝나면', '완료되면', '완료후', '완료 후', '끝나고']):
+        result['expected_date'] = '작업 완료 후'
+    # 다음주 + 요일 패턴
+    elif '다음주' in text or '다음 주' in text:
+        # 현재 요일 확인 (0=월요일, 6=일요일)
+        current_weekday = today.weekday()
+        
+        # 다음주 시작(월요일)까지 일수 계산
+        if current_weekday == 6:  # 일요일
+            days_to_next_monday = 1
+        else:
+            days_to_next_monday = 7 - current_weekday
+        
+        next_monday = today + timedelta(days=days_to_next_monday)
+        
+        # 요일별 처리
+        weekday_offsets = {
+            '월요일': 0,
+            '화요일': 1, 
+            '수요일': 2,
+            '목요일': 3,
+            '금요일': 4,
+            '토요일': 5,
+            '일요일': 6
+        }
+        
+        # 요일 찾기
+        found_weekday = False
+        for day_name, offset in weekday_offsets.items():
+            if day_name in text:
+                target_date = next_monday + timedelta(days=offset)
+                result['expected_date'] = target_date.strftime('%Y-%m-%d')
+                found_weekday = True
+                break
+        
+        # 요일이 명시되지 않은 경우 다음주 월요일
+        if not found_weekday:
+            result['expected_date'] = next_monday.strftime('%Y-%m-%d')
+    
+    # 이번주 + 요일 패턴
+    elif '이번주' in text or '이번 주' in text:
+        weekday_map = {
+            '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
+            '금요일': 4, '토요일': 5, '일요일': 6
+        }
+        
+        for day_name, day_num in weekday_map.items():
+            if day_name in text:
+                # 이번주의 특정 요일 계산
+                days_ahead = day_num - today.weekday()
+                if days_ahead <= 0:  # 이미 지난 경우
+                    days_ahead += 7
+                result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+                break
+    
+    # 요일만 언급된 경우 (이번주로 간주)
+    elif any(day in text for day in ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']):
+        weekday_map = {
+            '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
+            '금요일': 4, '토요일': 5, '일요일': 6
+        }
+        
+        for day_name, day_num in weekday_map.items():
+            if day_name in text:
+                days_ahead = day_num - today.weekday()
+                if days_ahead <= 0:  # 이미 지났거나 오늘이면 다음주
+                    days_ahead += 7
+                result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+                break
+    
+    # 기타 날짜 패턴들
+    else:
+        date_patterns = [
+            (r'오늘', today.strftime('%Y-%m-%d')),
+            (r'내일', (today + timedelta(days=1)).strftime('%Y-%m-%d')),
+            (r'모레', (today + timedelta(days=2)).strftime('%Y-%m-%d')),
+            (r'글피', (today + timedelta(days=3)).strftime('%Y-%m-%d')),
+            (r'어제', (today - timedelta(days=1)).strftime('%Y-%m-%d')),
+            (r'(\d+)일\s*후', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+            (r'(\d+)일\s*뒤', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+            (r'(\d+)일\s*전', lambda m: (today - timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+        ]
+        
+        for pattern, replacement in date_patterns:
+            match = re.search(pattern, text)
+            if match:
+                if callable(replacement):
+                    result['expected_date'] = replacement(match)
+                else:
+                    result['expected_date'] = replacement
+                break
+        
+        # 구체적 날짜 패턴
+        if not result.get('expected_date'):
+            # 월/일 형식
+            date_match = re.search(r'(\d{1,2})[월/]\s*(\d{1,2})', text)
+            if date_match:
+                month = int(date_match.group(1))
+                day = int(date_match.group(2))
+                year = today.year
+                try:
+                    target_date = datetime(year, month, day)
+                    if target_date < today:
+                        year += 1
+                    result['expected_date'] = f"{year}-{month:02d}-{day:02d}"
+                except:
+                    pass
+        
+        # 이번주 + 요일 패턴
+        elif '이번주' in text or '이번 주' in text:
+            weekday_map = {
+                '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
+                '금요일': 4, '토요일': 5, '일요일': 6
+            }
+            
+            for day_name, day_num in weekday_map.items():
+                if day_name in text:
+                    # 이번주의 특정 요일 계산
+                    days_ahead = day_num - today.weekday()
+                    if days_ahead <= 0:  # 이미 지난 경우
+                        days_ahead += 7
+                    result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+                    break
+        
+        # 요일만 언급된 경우 (이번주로 간주)
+        elif any(day in text for day in ['월요일', '화요일', '수요일', '목요일', '금요일', '토요일', '일요일']):
+            weekday_map = {
+                '월요일': 0, '화요일': 1, '수요일': 2, '목요일': 3,
+                '금요일': 4, '토요일': 5, '일요일': 6
+            }
+            
+            for day_name, day_num in weekday_map.items():
+                if day_name in text:
+                    days_ahead = day_num - today.weekday()
+                    if days_ahead <= 0:  # 이미 지났거나 오늘이면 다음주
+                        days_ahead += 7
+                    result['expected_date'] = (today + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
+                    break
+        
+        # 기타 날짜 패턴들
+        else:
+            date_patterns = [
+                (r'오늘', today.strftime('%Y-%m-%d')),
+                (r'내일', (today + timedelta(days=1)).strftime('%Y-%m-%d')),
+                (r'모레', (today + timedelta(days=2)).strftime('%Y-%m-%d')),
+                (r'글피', (today + timedelta(days=3)).strftime('%Y-%m-%d')),
+                (r'어제', (today - timedelta(days=1)).strftime('%Y-%m-%d')),
+                (r'(\d+)일\s*후', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+                (r'(\d+)일\s*뒤', lambda m: (today + timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+                (r'(\d+)일\s*전', lambda m: (today - timedelta(days=int(m.group(1)))).strftime('%Y-%m-%d')),
+            ]
+        
+        for pattern, replacement in date_patterns:
+            match = re.search(pattern, text)
+            if match:
+                if callable(replacement):
+                    result['expected_date'] = replacement(match)
+                else:
+                    result['expected_date'] = replacement
+                break
+        
+        # 구체적 날짜 패턴
+        if not result['expected_date']:
+            # 월/일 형식
+            date_match = re.search(r'(\d{1,2})[월/]\s*(\d{1,2})', text)
+            if date_match:
+                month = int(date_match.group(1))
+                day = int(date_match.group(2))
+                year = today.year
+                try:
+                    target_date = datetime(year, month, day)
+                    if target_date < today:
+                        year += 1
+                    result['expected_date'] = f"{year}-{month:02d}-{day:02d}"
+                except:
+                    pass
+    
+    # 6. 결제 방식 추출
+    payment_methods = {
+        '현금': '현금',
+        '캐시': '현금',
+        '계좌': '계좌이체',
+        '이체': '계좌이체',
+        '송금': '계좌이체',
+        '입금': '계좌이체',
+        '카드': '카드',
+        '체크카드': '카드',
+        '신용카드': '카드',
+        '외상': '외상',
+        '후불': '외상'
+    }
+    
+    for keyword, method in payment_methods.items():
+        if keyword in text:
+            result['payment_method'] = method
+            break
+    
+    if not result['payment_method']:
+        result['payment_method'] = '미정'
+    
+    # 7. 전체 텍스트를 메모로
+    result['memo'] = text
+    
+    return result
+
+
+MEMOS = [
+    "북구청 방수 작업 끝나면 1000만원 잔금",
+    "강남 아파트 타일공사 중도금 500만원 다음주 수요일",
+    "김사장 인테리어 계약금 300만원 내일 현금",
+    "서초 빌라 미장 200만원 15일 계좌이체",
+    "판교 오피스텔 조적공사 450만원 완료후 받기",
+    "상가 전기공사 150만원 월말",
+    "이번달 말까지 도배 인건비 80만원",
+    "현장명 계약금 금액 오늘 받음",
+    "현장명 중도금 금액 날짜 예정",
+    "현장명 잔금 금액 완료시 받기",
+    "한솔건설 자재비 1,000,000원 3일 후 카드",
+    "분당 주택 철거작업 2억 3000만원 이번주 금요일 송금",
+    "잠실 현장 일당 15만원 어제 현금 지급",
+    "역삼 빌딩 샷시 1200만원 12/20 입금 예정",
+    "수원시청 청소 용역 35000000원 모레 후불",
+]
+
+# 공백 허용 키워드 (기존 함수는 사전에 띄어쓰기 변형이 따로 없으면 놓침)
+SPACED_MEMOS = [
+    ("강남 아파트 노무 비 500만원", "payment_type", "인건비"),
+    ("판교 빌라 착수 금 80만원", "payment_type", "계약금"),
+    ("북구청 방수 완료 되면 잔금", "expected_date", "작업 완료 후"),
+    ("서초 현장 100만원 다음  주 화요일", "expected_date", None),
+]
@@ -0,0 +1,33 @@
+# tests/test_charts.py - 대시보드 차트 테스트
+import json
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("plotly")
+
+from services.charts import create_payment_chart, figure_from_spec  # noqa: E402
+
+
+def site_table(count):
+    contract = pd.Series(range(count), dtype="int64") * 1000 + 5000
+    received = pd.Series(range(count), dtype="int64") * 500
+    return pd.DataFrame({"현장명": [f"현장{i}" for i in range(count)], "계약금액": contract,
+                         "받은금액": received, "잔금": contract - received})
+
+
+def test_payment_chart_has_two_traces_for_any_site_count():
+    for count in (0, 3, 300):
+        fig = create_payment_chart(site_table(count))
+        assert [trace.name for trace in fig.data] == ["받은 돈", "받을 돈"]
+        assert len(fig.data[0].x) == count
+
+
+def test_figure_from_spec_round_trips_and_does_not_share_state():
+    spec = create_payment_chart(site_table(3)).to_json()
+
+    fig = figure_from_spec(spec)
+    assert json.loads(fig.to_json()) == json.loads(spec)
+
+    fig.update_layout(height=100)   # 그린 쪽에서 고쳐도 캐시된 spec은 그대로
+    assert json.loads(figure_from_spec(spec).to_json())["layout"]["height"] == 400
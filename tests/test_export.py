@@ -0,0 +1,36 @@
+# tests/test_export.py - 수금 기록 내보내기 테스트
+import io
+
+import pytest
+
+from services.export import EXPORT_COLUMNS, export_bytes, export_format
+from services.local_store import LocalStore
+
+ROW = {"page_id": "p1", "site": "북구청", "work": "방수", "payment_type": "잔금", "amount": 1000000,
+       "due_date": "2026-10-20", "location": "북구청", "received": 1,
+       "created_time": "2026-10-17T00:00:00.000Z", "last_edited_time": "2026-10-17T00:00:00.000Z"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = LocalStore(path=str(tmp_path / "local_store.sqlite3"))
+    assert store.enabled
+    store.upsert([ROW, dict(ROW, page_id="p2", site="서초 빌라", received=0)])
+    return store
+
+
+def test_exports_xlsx_when_openpyxl_is_installed(store):
+    openpyxl = pytest.importorskip("openpyxl")
+    assert export_format() == "xlsx"
+
+    sheet = openpyxl.load_workbook(io.BytesIO(export_bytes("xlsx", store)))["수금현황"]
+    rows = list(sheet.iter_rows(values_only=True))
+
+    assert rows[0] == tuple(header for _, header in EXPORT_COLUMNS)
+    assert [(row[0], row[3], row[6]) for row in rows[1:]] == [("북구청", 1000000, "예"), ("서초 빌라", 1000000, None)]
+
+
+def test_csv_has_a_bom_for_excel(store):
+    text = export_bytes("csv", store).decode("utf-8")
+    assert text.startswith("\ufeff현장,")
+    assert len(text.splitlines()) == 3
@@ -0,0 +1,49 @@
+# tests/test_json_stream.py - 스트리밍 JSON 증분 파서 테스트
+import json
+
+import pytest
+
+from services.json_stream import JSONFieldStream
+
+BODY = json.dumps({
+    "site_name": "북구청 \"별관\"",
+    "amount": 10000000,
+    "received": False,
+    "memo": None,
+    "tags": ["방수", {"위치": "옥상, 2층"}],
+    "detail": {"a": [1, 2], "b": "}"},
+    "payment_type": "잔금",
+}, ensure_ascii=False)
+
+
+def feed_all(chunks):
+    stream = JSONFieldStream()
+    events = []
+    for chunk in chunks:
+        events.extend(stream.feed(chunk))
+    return stream, events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_any_chunking_gives_the_same_fields(size):
+    stream, events = feed_all(BODY[i:i + size] for i in range(0, len(BODY), size))
+
+    assert dict(events) == json.loads(BODY)
+    assert [key for key, _ in events] == list(json.loads(BODY))   # 완성된 순서대로 한 번씩
+    assert stream.done
+    assert json.loads(stream.buffer) == json.loads(BODY)
+
+
+def test_field_is_emitted_as_soon_as_it_closes():
+    stream = JSONFieldStream()
+    assert stream.feed('{"site_name": "북구') == []
+    assert stream.feed('청", "amount": 100') == [("site_name", "북구청")]
+    # 숫자는 뒤에 구분자가 와야 끝난 걸 안다
+    assert stream.feed('0') == []
+    assert stream.feed('}') == [("amount", 1000)]
+    assert stream.done
+
+
+def test_empty_and_none_chunks_are_ignored():
+    stream, events = feed_all(["", None, '{"a"', None, ': "b"}'])
+    assert events == [("a", "b")]
@@ -0,0 +1,139 @@
+# tests/test_llm.py - LLM 분석 경로 테스트 (DeepSeek는 가짜 함수로 대체)
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import services.llm as llm
+
+
+def test_hedge_latency_is_measured_from_its_own_submit(monkeypatch):
+    calls = []
+
+    def slow_primary(text, deadline):
+        calls.append(text)
+        time.sleep(0.6 if len(calls) == 1 else 0.05)
+        return {"attempt": len(calls)}
+
+    monkeypatch.setattr(llm, "_llm_analyze", slow_primary)
+    monkeypatch.setattr(llm, "HEDGE_DEFAULT_DELAY", 0.2)
+    monkeypatch.setattr(llm, "LLM_LATENCIES", llm.deque(maxlen=10))
+    monkeypatch.setattr(llm, "LLM_OUTCOMES", llm.Counter())
+
+    assert llm._llm_analyze_within_deadline("메모") == {"attempt": 2}
+    assert llm.LLM_OUTCOMES == {"hedge": 1}
+    assert llm.LLM_LATENCIES[0] < 0.2   # 헤지 요청 자체의 지연 (첫 요청 시작부터가 아님)
+
+
+class FakeStream:
+    """DeepSeek 스트리밍 응답 흉내 (content 조각 순서대로)"""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+
+    def __iter__(self):
+        for piece in self.pieces:
+            delta = type("Delta", (), {"content": piece})
+            yield type("Chunk", (), {"usage": None, "choices": [type("Choice", (), {"delta": delta})]})
+
+    def close(self):
+        pass
+
+
+class StalledStream:
+    """첫 조각 뒤로 응답이 멈춘 스트림 (close()가 불려야 읽기가 끝남)"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        delta = type("Delta", (), {"content": '{"site_name": "북'})
+        yield type("Chunk", (), {"usage": None, "choices": [type("Choice", (), {"delta": delta})]})
+        self.closed.wait(5)
+
+    def close(self):
+        self.closed.set()
+
+
+def fake_client(create, options=None):
+    """chat.completions.create만 있는 DeepSeek 클라이언트 흉내 (with_options 인자는 options에 기록)"""
+    client = type("Client", (), {})()
+    client.chat = type("Chat", (), {})()
+    client.chat.completions = type("Completions", (), {"create": staticmethod(create)})
+
+    def with_options(**kwargs):
+        if options is not None:
+            options.update(kwargs)
+        return client
+
+    client.with_options = with_options
+    return client
+
+
+def test_stream_yields_fields_as_they_close(monkeypatch):
+    body = '{"site_name": "북구청", "work_type": "방수", "amount": 10000000, "payment_type": "잔금"}'
+    pieces = [body[i:i + 7] for i in range(0, len(body), 7)]
+    client = fake_client(lambda **kwargs: FakeStream(pieces))
+
+    monkeypatch.setattr(llm, "get_deepseek_client", lambda: client)
+    monkeypatch.setattr(llm, "_route", lambda text, anchor: (None, "key", {"site_name": "북구"}, ["site_name"]))
+    monkeypatch.setattr(llm.analysis_cache, "put", lambda key, value: None)
+
+    events = list(llm.analyze_text("북구청 방수 천만원 잔금", stream=True))
+
+    assert [field for field, _ in events[:2]] == ["site_name", "work_type"]
+    assert dict(events[:-1])["amount"] == 10000000
+    field, result = events[-1]
+    assert field is None and result["site_name"] == "북구청" and result["source"] == "llm"
+
+
+def test_stalled_stream_is_closed_at_the_deadline(monkeypatch):
+    stream = StalledStream()
+    options = {}
+    monkeypatch.setattr(llm, "get_deepseek_client", lambda: fake_client(lambda **kwargs: stream, options))
+    monkeypatch.setattr(llm, "_route", lambda text, anchor: (None, "key", {"site_name": "북구"}, ["site_name"]))
+    monkeypatch.setattr(llm, "LLM_DEADLINE", 0.3)
+    monkeypatch.setattr(llm, "LLM_OUTCOMES", llm.Counter())
+
+    started = time.monotonic()
+    events = list(llm.analyze_text("북구청 방수", stream=True))
+
+    assert time.monotonic() - started < 2   # 조각 사이 대기가 아니라 전체 마감으로 끊김
+    assert stream.closed.is_set()
+    assert options["max_retries"] == 0 and options["timeout"] <= 0.3
+    field, result = events[-1]
+    assert field is None and result["source"] == "fallback"
+
+
+def test_queued_requests_are_cancelled_after_the_deadline(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def blocked(text, deadline):
+        calls.append(text)
+        release.wait(5)
+        return {}
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    pool.submit(release.wait, 5)   # 풀이 꽉 차서 요청이 대기열에 머무는 상황
+    monkeypatch.setattr(llm, "_get_llm_pool", lambda: pool)
+    monkeypatch.setattr(llm, "_llm_analyze", blocked)
+    monkeypatch.setattr(llm, "LLM_DEADLINE", 0.2)
+    monkeypatch.setattr(llm, "HEDGE_DEFAULT_DELAY", 0.05)
+    monkeypatch.setattr(llm, "LLM_OUTCOMES", llm.Counter())
+
+    with pytest.raises(TimeoutError):
+        llm._llm_analyze_within_deadline("메모")
+    release.set()
+    pool.shutdown(wait=True)
+
+    assert calls == []   # 마감 뒤에 풀이 비어도 버린 요청(primary, hedge)은 실행되지 않음
+    assert llm.LLM_OUTCOMES == {"fallback": 1}
+
+
+def test_single_prompt_anchors_today_after_the_cached_prefix():
+    system, user = llm._completion_args("내일 잔금")["messages"]
+
+    assert llm.date.today().isoformat() in user["content"]
+    assert llm.date.today().isoformat() not in system["content"]   # 공통 앞부분은 날마다 같아야 캐시됨
@@ -0,0 +1,69 @@
+# tests/test_notion_schema.py - 스키마 기반 저장 payload와 동기화 행 변환 테스트
+from services.notion_schema import DatabaseSchema, PayloadBuilder
+from services.notion_sync import page_to_row
+
+RECORD = {"who": "북구청", "what": "방수 (잔금)", "when": "2026-10-20", "where": "북구청 별관", "why": "잔금",
+          "how": "1,000,000원"}
+
+
+def schema(**properties):
+    return DatabaseSchema(db_id="db", title="장부", properties=properties, fetched_at=0)
+
+
+def test_builder_converts_by_property_type():
+    builder = PayloadBuilder(schema(
+        who="title", what="rich_text", when="date", where="select", why="status", how="number",
+    ))
+    payload = builder(RECORD)
+
+    assert payload["who"] == {"title": [{"text": {"content": "북구청"}}]}
+    assert payload["what"] == {"rich_text": [{"text": {"content": "방수 (잔금)"}}]}
+    assert payload["when"] == {"date": {"start": "2026-10-20"}}
+    assert payload["where"] == {"select": {"name": "북구청 별관"}}
+    assert payload["why"] == {"status": {"name": "잔금"}}
+    assert payload["how"] == {"number": 1000000}
+
+
+def test_builder_skips_missing_unsupported_and_unparseable_fields():
+    builder = PayloadBuilder(schema(**{"이름": "title", "when": "date", "how": "files"}))
+    payload = builder(dict(RECORD, when="다음주 수요일"))
+
+    assert set(payload) == {"이름"}   # when은 날짜가 아니고 how는 지원하지 않는 타입, 나머지는 없음
+    assert builder.names == {"who": "이름", "when": "when"}
+
+
+def test_builder_matches_korean_property_names_and_idempotency_key():
+    builder = PayloadBuilder(
+        schema(**{"발주처(Who)": "title", "금액(What)": "rich_text", "저장키": "rich_text"}),
+        idempotency_property="저장키",
+    )
+    payload = builder(RECORD, "key-1")
+
+    assert payload["발주처(Who)"]["title"][0]["text"]["content"] == "북구청"
+    assert payload["금액(What)"]["rich_text"][0]["text"]["content"] == "방수 (잔금)"
+    assert payload["저장키"] == {"rich_text": [{"text": {"content": "key-1"}}]}
+    assert "저장키" not in PayloadBuilder(builder.schema)(RECORD, "key-1")
+
+
+def test_saved_page_round_trips_through_page_to_row():
+    builder = PayloadBuilder(schema(
+        who="title", what="rich_text", when="date", where="rich_text", why="select", how="rich_text",
+        received="checkbox",
+    ))
+    properties = {name: dict(value, type=next(iter(value))) for name, value in builder(RECORD).items()}
+    properties["received"] = {"type": "checkbox", "checkbox": True}
+    page = {"id": "p1", "properties": properties,
+            "created_time": "2026-10-17T00:00:00.000Z", "last_edited_time": "2026-10-17T00:01:00.000Z"}
+
+    row = page_to_row(page)
+
+    assert row == {
+        "page_id": "p1", "site": "북구청", "work": "방수 (잔금)", "payment_type": "잔금", "amount": 1000000,
+        "due_date": "2026-10-20", "location": "북구청 별관", "received": 1,
+        "created_time": "2026-10-17T00:00:00.000Z", "last_edited_time": "2026-10-17T00:01:00.000Z",
+    }
+
+
+def test_page_to_row_defaults():
+    row = page_to_row({"id": "p2", "properties": {}})
+    assert (row["site"], row["payment_type"], row["due_date"], row["received"]) == ("", "기타", None, 0)
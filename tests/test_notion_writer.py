@@ -0,0 +1,174 @@
+# tests/test_notion_writer.py - outbox 재전송/중복 확인 테스트 (Notion API는 가짜 응답)
+import json
+import time
+
+import pytest
+
+import services.notion as notion
+from services.config import Settings
+from services.notion_outbox import NotionOutbox, SENT
+from services.notion_schema import DatabaseSchema, PayloadBuilder
+from services.notion_writer import NotionWriter
+
+RECORD = {"who": "북구청", "what": "방수 (잔금)", "when": "2026-10-20", "where": "북구청", "why": "잔금", "how": "1,000,000원"}
+
+SCHEMA = DatabaseSchema(
+    db_id="db",
+    title="장부",
+    properties={"who": "title", "what": "rich_text", "when": "date", "where": "rich_text",
+                "why": "rich_text", "how": "rich_text"},
+    fetched_at=0,
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code, body):
+        self.status_code = status_code
+        self._body = body
+        self.text = json.dumps(body, ensure_ascii=False)
+
+    def json(self):
+        return self._body
+
+
+class FakeNotion:
+    """pages 생성 / databases query만 흉내 (생성된 페이지는 self.pages)"""
+
+    def __init__(self):
+        self.pages = []
+        self.created = 0
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        if path == "pages":
+            self.created += 1
+            page = {"id": f"p{self.created}", "url": f"https://notion.so/p{self.created}",
+                    "properties": kwargs["json"]["properties"]}
+            self.pages.append(page)
+            return FakeResponse(200, page)
+        if path.endswith("/query"):
+            return FakeResponse(200, {"results": list(self.pages)})
+        raise AssertionError(path)
+
+
+@pytest.fixture
+def fake_notion(monkeypatch):
+    fake = FakeNotion()
+    # get_settings()는 프로세스당 한 번 읽어 캐시하므로 환경변수 대신 설정 자체를 바꿔 끼움
+    monkeypatch.setattr(notion, "get_settings", lambda: Settings(notion_api_key="x", notion_db_id="db"))
+    monkeypatch.setattr(notion, "notion_request", fake.request)
+    monkeypatch.setattr(notion, "get_payload_builder", lambda force=False: (200, PayloadBuilder(SCHEMA)))
+    return fake
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    box = NotionOutbox(path=str(tmp_path / "outbox.sqlite3"))
+    assert box.enabled
+    return box
+
+
+def run_replay(outbox):
+    writer = NotionWriter(save=notion.save_record, find=notion.find_page, outbox=outbox, rate=100, burst=100)
+    writer._replay_due()
+    writer._ensure_thread()
+    writer.join()
+    return writer
+
+
+def test_in_doubt_identical_records_do_not_share_a_page(fake_notion, outbox):
+    # 같은 내용 두 건 모두 전송 중 프로세스가 죽었고, Notion에는 한 페이지만 생겼다
+    first = outbox.enqueue(RECORD)
+    second = outbox.enqueue(RECORD)
+    outbox.begin(first)
+    outbox.begin(second)
+    notion.save_record(RECORD)
+
+    run_replay(outbox)
+
+    urls = {outbox.get(key)["page_url"] for key in (first, second)}
+    assert all(outbox.get(key)["status"] == SENT for key in (first, second))
+    assert len(urls) == 2                # 한 건은 기존 페이지, 다른 한 건은 새로 만듦
+    assert len(fake_notion.pages) == 2
+
+
+def test_in_doubt_record_reuses_its_own_page(fake_notion, outbox):
+    key = outbox.enqueue(RECORD)
+    outbox.begin(key)
+    notion.save_record(RECORD)
+
+    run_replay(outbox)
+
+    assert outbox.get(key)["page_url"] == "https://notion.so/p1"
+    assert len(fake_notion.pages) == 1   # 다시 만들지 않음
+
+
+def test_same_key_is_enqueued_once(outbox):
+    key = outbox.enqueue(RECORD, key="k1")
+    assert outbox.enqueue(RECORD, key="k1") == key
+    assert outbox.stats()["pending"] == 1
+
+
+def test_find_page_filters_on_the_title_column(monkeypatch):
+    monkeypatch.setattr(notion, "get_settings", lambda: Settings(notion_api_key="x", notion_db_id="db"))
+    # who가 rich_text이고 타이틀은 다른 컬럼인 DB
+    schema = DatabaseSchema(db_id="db", title="장부", properties={"이름": "title", "who": "rich_text", "what": "rich_text"},
+                            fetched_at=0)
+    builder = PayloadBuilder(schema)
+    assert builder(RECORD)["이름"] == {"title": [{"text": {"content": "북구청"}}]}
+
+    queries = []
+
+    def request(method, path, idempotent=None, **kwargs):
+        queries.append(kwargs["json"])
+        return FakeResponse(200, {"results": []})
+
+    monkeypatch.setattr(notion, "notion_request", request)
+    monkeypatch.setattr(notion, "get_payload_builder", lambda force=False: (200, builder))
+    assert notion.find_page(RECORD) is None
+    assert queries[0]["filter"]["and"][0] == {"property": "이름", "title": {"equals": "북구청"}}
+
+
+def test_replay_runs_while_the_queue_stays_busy(monkeypatch):
+    monkeypatch.setattr("services.notion_writer.REPLAY_INTERVAL", 0.05)
+
+    def slow_save(record, key=None):
+        time.sleep(0.01)
+        return 200, "https://notion.so/p"
+
+    writer = NotionWriter(save=slow_save, find=lambda *a, **k: None, rate=1000, burst=1000)
+    replays = []
+    monkeypatch.setattr(writer, "_replay_due", lambda: replays.append(time.monotonic()))
+    for i in range(60):
+        writer.submit(RECORD, label=str(i))
+    writer.join()
+
+    # 0.6초 동안 대기열이 한 번도 비지 않았어도 재전송 확인은 주기적으로
+    assert len(replays) >= 4
+
+
+def test_record_kept_only_in_the_outbox_is_not_ok(outbox):
+    writer = NotionWriter(save=lambda record, key=None: (503, "unavailable"), find=lambda *a, **k: None,
+                          outbox=outbox, rate=100, burst=100)
+    handle = writer.submit(RECORD)
+    writer.join()
+
+    assert handle.stored and not handle.ok
+    assert handle.status == "stored"
+    assert not 200 <= handle.result[0] < 300
+    assert outbox.stats()["pending"] == 1
+
+
+def test_in_doubt_replay_takes_a_token_per_notion_request(fake_notion, outbox):
+    key = outbox.enqueue(RECORD)
+    outbox.begin(key)   # 전송 중 종료 → 다시 보내기 전에 find_page로 확인
+
+    writer = NotionWriter(save=notion.save_record, find=notion.find_page, outbox=outbox, rate=100, burst=100)
+    acquired = []
+    original = writer._bucket.acquire
+    writer._bucket.acquire = lambda: acquired.append(1) or original()
+    writer._replay_due()
+    writer._ensure_thread()
+    writer.join()
+
+    assert outbox.get(key)["status"] == SENT
+    assert len(acquired) == 2   # databases/query + pages
@@ -0,0 +1,41 @@
+# tests/test_receivables.py - 현장별 잔금 집계 테스트
+import os
+
+import pandas as pd
+import pytest
+
+from services.receivables import KIND_DTYPE, UNASSIGNED_SITE, site_summary
+
+
+def test_site_summary_labels_records_without_a_site():
+    frame = pd.DataFrame({
+        "site": pd.Series(["", "북구청", " ", "서초 빌라"]).astype("category"),
+        "amount": [1_000_000, 3_000_000, 500_000, 2_000_000],
+        "received": [True, False, False, True],
+        "kind": pd.Categorical(["income"] * 4, dtype=KIND_DTYPE),
+    })
+
+    table = site_summary(frame).set_index("현장명")
+
+    assert list(table.index) == ["북구청", UNASSIGNED_SITE, "서초 빌라"]
+    assert table.loc[UNASSIGNED_SITE, "계약금액"] == 1_500_000
+    assert table.loc[UNASSIGNED_SITE, "잔금"] == 500_000
+
+
+def test_load_frame_reuses_the_parquet_snapshot(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    from services import receivables
+    from services.local_store import LocalStore
+
+    store = LocalStore(path=str(tmp_path / "local_store.sqlite3"))
+    assert store.enabled
+    store.upsert([{"page_id": "p1", "site": "북구청", "work": "방수", "payment_type": "잔금", "amount": 1000000,
+                   "due_date": "2026-10-20", "location": "북구청", "received": 0,
+                   "created_time": "2026-10-17T00:00:00.000Z", "last_edited_time": "2026-10-17T00:00:00.000Z"}])
+
+    first = receivables.load_frame(store)
+    assert os.path.exists(receivables._snapshot_path(store, store.revision()))
+
+    monkeypatch.setattr(receivables, "build_frame", lambda store=None: pytest.fail("스냅샷을 쓰지 않음"))
+    second = receivables.load_frame(store)
+    pd.testing.assert_frame_equal(first, second)
@@ -0,0 +1,76 @@
+# tests/test_rule_parser.py - 규칙 파서 회귀 테스트
+from datetime import date, datetime
+
+import pytest
+
+from tests.rule_parse_corpus import MEMOS, SPACED_MEMOS, legacy_rule_based_parse
+from services.rule_parser import KeywordAutomaton, parse_with_confidence, rule_based_parse
+
+
+def test_eok_with_cheonman():
+    # 억 뒤의 천만/백만을 만 단위로 잘못 더하면 100,020,000이 됨
+    assert rule_based_parse("강남아파트 1억 2천만원 잔금 내일")["amount"] == "120000000"
+    assert rule_based_parse("1억2천 잔금")["amount"] == "120000000"
+    assert rule_based_parse("1억 3백만원 중도금")["amount"] == "103000000"
+    assert rule_based_parse("분당 주택 2억 3000만원")["amount"] == "230000000"
+    assert rule_based_parse("2억원 계약금")["amount"] == "200000000"
+
+
+def test_eok_amount_served_by_rule_is_correct():
+    # 신뢰도 0.95로 LLM 없이 규칙 결과가 그대로 쓰이므로 값이 맞아야 함
+    result, confidence = parse_with_confidence("강남아파트 1억 2천만원 잔금 내일")
+    assert confidence["amount"] >= 0.95
+    assert result["amount"] == "120000000"
+
+
+def test_eok_analyze_text_rule_route():
+    from services.llm import analyze_text
+
+    result = analyze_text("강남아파트 1억 2천만원 잔금 내일")
+    assert result["source"] == "rule"
+    assert result["amount"] == "120000000"
+
+
+def test_today_accepts_date_and_datetime():
+    for today in (date(2025, 1, 23), datetime(2025, 1, 23, 9, 30)):
+        assert rule_based_parse("역삼 빌딩 샷시 1200만원 12/20 입금 예정", today)["expected_date"] == "2025-12-20"
+        assert rule_based_parse("서초 빌라 미장 200만원 1/10", today)["expected_date"] == "2026-01-10"
+        assert rule_based_parse("서초 빌라 미장 200만원 1월 23일", today)["expected_date"] == "2025-01-23"
+        assert rule_based_parse("김사장 계약금 300만원 내일", today)["expected_date"] == "2025-01-24"
+        assert rule_based_parse("강남 아파트 중도금 다음주 수요일", today)["expected_date"] == "2025-01-29"
+
+
+@pytest.mark.parametrize("memo", MEMOS)
+@pytest.mark.parametrize("today", [datetime(2025, 1, 23, 9, 30), datetime(2025, 12, 30, 18, 0)])
+def test_matches_legacy_parser(memo, today):
+    # 기존 파서는 datetime 기준일만 받으므로 date 기준일 결과도 같은 날의 기존 결과와 비교
+    expected = legacy_rule_based_parse(memo, today)
+    assert rule_based_parse(memo, today) == expected
+    assert rule_based_parse(memo, today.date()) == expected
+
+
+@pytest.mark.parametrize("memo, key, expected", SPACED_MEMOS)
+def test_spaced_keywords(memo, key, expected):
+    value = rule_based_parse(memo, date(2025, 1, 23))[key]
+    assert value == expected if expected is not None else value
+
+
+def test_automaton_matches_substring_search():
+    keywords = {"방수": "work", "인테리어": "work", "계약금": "payment", "금": "flag", "다음주": "week", "주": "flag2"}
+    automaton = KeywordAutomaton()
+    for keyword, category in keywords.items():
+        automaton.add(keyword, category, keyword)
+    automaton.build()
+
+    def found(text):
+        mask = automaton.scan(text)
+        return {value for bit, value in enumerate(automaton.values) if mask >> bit & 1}
+
+    # 기존 방식(키워드마다 in 검색)과 같은 결과
+    for text in ["북구청 방수 계약금", "김사장인테리어 다음주", "", "방방수수", "금주 계약"]:
+        assert found(text) == {keyword for keyword in keywords if keyword in text}, text
+
+    # 두 글자 이상 매칭된 뒤의 공백은 건너뜀
+    assert found("다음 주 금요일") == {"다음주", "주", "금"}
+    assert found("계약 금") == {"계약금", "금"}
+    assert found("방 수") == set()
@@ -0,0 +1,40 @@
+# tests/test_transcription.py - 음성 인식 서비스 테스트 (Whisper는 호출하지 않음)
+from services import transcription
+from services.transcription import WHISPER_MAX_BYTES, stitch_transcripts, transcribe
+
+
+class ExplodingClient:
+    """Whisper에 보내면 실패하는 클라이언트"""
+
+    class audio:
+        class transcriptions:
+            @staticmethod
+            def create(**kwargs):
+                raise AssertionError("Whisper에 보내면 안 됨")
+
+
+def test_undecodable_oversized_upload_is_not_sent(monkeypatch):
+    monkeypatch.setattr(transcription, "get_openai_client", lambda: ExplodingClient())
+    monkeypatch.setattr(transcription.transcription_cache, "get", lambda key: None)
+    monkeypatch.setattr("services.audio_preprocess._ffmpeg", lambda: None)
+
+    upload = b"\x1a\x45\xdf\xa3" + bytes(WHISPER_MAX_BYTES)
+    result = transcribe(upload, "recording")
+
+    assert not result.ok
+    assert "25MB" in result.error and "ffmpeg" in result.error
+    assert result.size == len(upload)
+
+
+def test_stitch_drops_the_overlap_once():
+    texts = [
+        "북구청 방수 작업 끝나면 천만원 잔금",
+        "천만원 잔금, 받기로 했고 다음주 수요일에",
+        "수요일에 서초 빌라 미장 이백만원",
+    ]
+    assert stitch_transcripts(texts) == "북구청 방수 작업 끝나면 천만원 잔금 받기로 했고 다음주 수요일에 서초 빌라 미장 이백만원"
+
+
+def test_stitch_without_overlap_and_empty_pieces():
+    assert stitch_transcripts(["계약금 삼백만원", "", "내일 현금"]) == "계약금 삼백만원 내일 현금"
+    assert stitch_transcripts(["잔금 잔금", "잔금 입금"], max_overlap_words=1) == "잔금 잔금 입금"